@@ -0,0 +1,659 @@
+"""HTTP/WebSocket API for controlling the smart home from scripts and other hosts.
+
+Usage:
+    python api_server.py [--host HOST] [--port PORT] [--shards N]
+
+Endpoints:
+    GET  /devices?offset=&limit=&type=&q=   Paginated device listing, optionally searched.
+    GET  /devices/<type>/<id>            State of one device.
+    POST /devices                        Bulk add: a list of devices, or {"devices": [...]}.
+    PATCH /devices                       Bulk update of device attributes, rooms and tags.
+    POST /devices/remove                 Bulk remove of devices given by type and id.
+    POST /groups                         Bulk command: {"room", "type", "tag", "id", "set": {...}}.
+    GET  /scenes                         Defined scenes.
+    POST /scenes                         Define a scene: {"name", "commands": [group commands]}.
+    POST /scenes/activate                Apply a scene: {"name"}.
+    GET  /energy?room=                   Power draw and hourly energy use of the home or a room.
+    POST /batch                          Several of the above in one request.
+    GET  /subscribe                      WebSocket stream of device change batches.
+    GET  /metrics?format=json            Metrics in the Prometheus text format, or JSON;
+                                         collected when HOMEMATE_METRICS is set.
+
+Bodies and responses are JSON, or msgpack when the request's Content-Type or
+Accept header is ``application/msgpack`` and the msgpack package is installed.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import struct
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+import metrics
+from automation_system import AutomationSystem
+from device_factory import create_device
+from device_registry import device_key
+from device_search import DeviceSearchIndex
+from energy import EnergyMonitor
+from scenes import DeviceGroup, GroupCommand, Scene, coerce_attributes
+from event_bus import DeviceAdded, DeviceRemoved, EventBus, EventPublisher
+from sharded_backend import ShardedAutomationSystem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_HEADERS = 100
+
+# Simulation ticks per second of a sharded backend
+SHARD_SIMULATION_HZ = 10
+
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 30
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WEBSOCKET_TEXT = 0x1
+WEBSOCKET_BINARY = 0x2
+WEBSOCKET_CLOSE = 0x8
+WEBSOCKET_PING = 0x9
+WEBSOCKET_PONG = 0xA
+
+# Device attributes reported and settable through the API
+DEVICE_ATTRIBUTES = ("status", "brightness", "temperature", "security_status")
+
+STATUS_REASONS = {
+    101: "Switching Protocols",
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    406: "Not Acceptable",
+    411: "Length Required",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ApiError(Exception):
+    """Error answered with an HTTP status code and a JSON error message."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def device_json(device):
+    """Return the API representation of a device."""
+    device_type, device_id = device_key(device)
+    state = {"type": device_type, "id": device_id, "status": bool(device.status)}
+    for attribute in DEVICE_ATTRIBUTES[1:]:
+        value = getattr(device, attribute, None)
+        if value is not None:
+            state[attribute] = value
+    return state
+
+
+def event_json(event, describe=device_json):
+    """Return the API representation of an event_bus event, describing devices with describe."""
+    if isinstance(event, DeviceRemoved):
+        return {"event": "removed", "type": event.device_type, "id": event.device_id}
+    if isinstance(event, DeviceAdded):
+        return {"event": "added", "device": describe(event.device)}
+    return {"event": "changed", "device": describe(event.device), "attributes": sorted(event.attributes)}
+
+
+def item_key(item):
+    """Return the (device_type, device_id) key of a device item of a request body."""
+    try:
+        return item["type"], str(item["id"])
+    except (KeyError, TypeError):
+        raise ValueError("Each device needs a 'type' and an 'id'.")
+
+
+def group_command(item):
+    """Return the GroupCommand described by a {"room", "type", "tag", "set": {...}} item."""
+    if not isinstance(item, dict) or not isinstance(item.get("set"), dict) or not item["set"]:
+        raise ApiError(400, "A group command needs a non-empty 'set' object.")
+    unknown = set(item["set"]) - set(DEVICE_ATTRIBUTES)
+    if unknown:
+        raise ApiError(400, f"Unknown attributes: {', '.join(sorted(map(str, unknown)))}.")
+    try:
+        return GroupCommand(DeviceGroup(item.get("room"), item.get("type"), item.get("tag"), item.get("id")),
+                            **item["set"])
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def body_items(body):
+    """Return the device items of a bulk request body: a list, or a dict with a "devices" list."""
+    if isinstance(body, dict):
+        body = body.get("devices")
+    if not isinstance(body, list):
+        raise ApiError(400, "Expected a list of devices.")
+    return body
+
+
+def encode(payload, content_type):
+    if content_type == MSGPACK_TYPE:
+        return msgpack.packb(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def decode(body, content_type):
+    if not body:
+        return None
+    try:
+        if content_type == MSGPACK_TYPE:
+            return msgpack.unpackb(body)
+        return json.loads(body)
+    except ValueError as e:
+        raise ApiError(400, f"Malformed request body: {e}")
+
+
+def media_type(header):
+    return header.split(";", 1)[0].strip().lower()
+
+
+async def read_request(reader):
+    """Read one HTTP/1.x request.
+
+    Returns:
+        A tuple (method, target, version, headers, body), or None when the client
+        closed the connection.
+
+    Raises:
+        ApiError: If the request is malformed or too large.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(400, "Malformed request line.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) == MAX_HEADERS:
+            raise ApiError(400, "Too many headers.")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise ApiError(411, "Chunked request bodies are not supported; send a Content-Length.")
+    length = headers.get("content-length") or "0"
+    if not length.isdigit():
+        raise ApiError(400, "Malformed Content-Length.")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version, headers, body
+
+
+def response_bytes(status, body=b"", content_type=JSON_TYPE, keep_alive=True, extra_headers=()):
+    lines = [f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}"]
+    if status != 101:
+        lines.append(f"Content-Type: {content_type}")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    lines.extend(extra_headers)
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def websocket_frame(payload, opcode):
+    """Return an unmasked, unfragmented server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """Read one client-to-server WebSocket frame and return (opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ConnectionError("WebSocket frame too large.")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i & 3] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+class ApiServer:
+    """Asyncio HTTP/1.1 server exposing an automation system.
+
+    Connections are kept alive between requests, and every mutating endpoint takes
+    a batch of devices so that clients can amortize a round trip over many devices.
+    With an event bus, ``/subscribe`` upgrades to a WebSocket that streams each
+    coalesced batch of device changes as one message; a slow client only delays
+    its own stream.
+
+    The server must run on the event bus loop, and it calls the automation system
+    from that loop, so the automation system must not be used from other threads
+    at the same time.
+    """
+    def __init__(self, automation_system, event_bus=None, device_factory=create_device, search_index=None,
+                 energy_monitor=None):
+        """Initialize an ApiServer.
+
+        Args:
+            automation_system: The automation system the API operates on.
+            event_bus: Optional EventBus the automation system publishes to; needed
+                for ``/subscribe``.
+            device_factory: Callable creating devices, with the signature of
+                ``device_factory.create_device``.
+            search_index: Optional DeviceSearchIndex; needed for the ``q`` parameter of
+                the device listing.
+            energy_monitor: Optional EnergyMonitor; needed for ``/energy``.
+        """
+        self.automation_system = automation_system
+        self.search_index = search_index
+        self.energy_monitor = energy_monitor
+        self.event_bus = event_bus
+        self.device_factory = device_factory
+        self.server = None
+        self._writers = set()
+        # Held while a request changes devices, so it never overlaps a sharded simulation step
+        self.state_lock = asyncio.Lock()
+        self.request_histogram = metrics.registry.histogram("homemate_api_request_seconds",
+                                                            "Duration of handling an API request.")
+        self.routes = {
+            "/devices": {"GET": self.list_devices, "POST": self.add_devices, "PATCH": self.update_devices},
+            "/devices/remove": {"POST": self.remove_devices},
+            "/groups": {"POST": self.command_group},
+            "/scenes": {"GET": self.list_scenes, "POST": self.define_scene},
+            "/scenes/activate": {"POST": self.activate_scene},
+            "/energy": {"GET": self.energy},
+            "/batch": {"POST": self.batch},
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening and return the (host, port) actually bound."""
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening and close every open connection."""
+        self.server.close()
+        for writer in list(self._writers):
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+        await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except ApiError as e:
+                    writer.write(response_bytes(e.status, encode({"error": str(e)}, JSON_TYPE), keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                url = urlsplit(target)
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if url.path == "/subscribe" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.stream_events(reader, writer, headers, query)
+                    break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                start = time.perf_counter()
+                if url.path == "/metrics" and method == "GET":
+                    status, payload, content_type = self.metrics_response(query)
+                elif method == "GET":
+                    status, payload, content_type = self.respond(method, url.path, query, headers, body)
+                else:
+                    async with self.state_lock:
+                        status, payload, content_type = self.respond(method, url.path, query, headers, body)
+                if metrics.enabled:
+                    self.request_histogram.observe(time.perf_counter() - start)
+                writer.write(response_bytes(status, payload, content_type, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def respond(self, method, path, query, headers, body):
+        """Handle a request and return (status, encoded payload, content type)."""
+        content_type = MSGPACK_TYPE if MSGPACK_TYPE in headers.get("accept", "") else JSON_TYPE
+        if content_type == MSGPACK_TYPE and msgpack is None:
+            return 406, encode({"error": "msgpack is not installed on the server."}, JSON_TYPE), JSON_TYPE
+        try:
+            request_type = media_type(headers.get("content-type", JSON_TYPE))
+            if request_type not in (JSON_TYPE, MSGPACK_TYPE) or (request_type == MSGPACK_TYPE and msgpack is None):
+                raise ApiError(415, f"Unsupported request body type '{request_type}'.")
+            status, payload = self.dispatch(method, path, query, decode(body, request_type))
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception:
+            logger.exception("Failed to handle %s %s", method, path)
+            status, payload = 500, {"error": "Internal server error."}
+        return status, encode(payload, content_type), content_type
+
+    def metrics_response(self, query):
+        """Return (status, payload, content type) of a metrics dump in the requested format."""
+        if query.get("format") == "json":
+            return 200, encode(metrics.registry.as_json(), JSON_TYPE), JSON_TYPE
+        return 200, metrics.registry.prometheus_text().encode(), metrics.PROMETHEUS_TYPE
+
+    def dispatch(self, method, path, query, body):
+        """Route a decoded request to its handler and return (status, payload).
+
+        The path is split into segments before they are percent-decoded, so IDs may
+        contain spaces or slashes.
+        """
+        handlers = self.routes.get(path)
+        if handlers is None:
+            parts = [unquote(part) for part in path.strip("/").split("/")]
+            if len(parts) == 3 and parts[0] == "devices":
+                handlers = {"GET": lambda query, body: self.get_device(parts[1], parts[2])}
+            else:
+                raise ApiError(404, f"No such endpoint '{path}'.")
+        handler = handlers.get(method)
+        if handler is None:
+            raise ApiError(405, f"Method {method} is not allowed on '{path}'.")
+        return 200, handler(query, body)
+
+    def list_devices(self, query, body):
+        try:
+            offset = max(0, int(query.get("offset", 0)))
+            limit = min(MAX_PAGE_SIZE, max(1, int(query.get("limit", DEFAULT_PAGE_SIZE))))
+        except ValueError:
+            raise ApiError(400, "offset and limit must be integers.")
+        if query.get("q"):
+            if self.search_index is None:
+                raise ApiError(400, "Search is not enabled.")
+            keys = self.search_index.search(query["q"])
+            if query.get("type"):
+                keys = [key for key in keys if key[0] == query["type"]]
+            keys = sorted(keys)
+            page = keys[offset:offset + limit]
+            # The index may still hold a device that has just been removed
+            devices = [device for device in (self.automation_system.get_device(*key) for key in page)
+                       if device is not None]
+            total = len(keys)
+            next_offset = offset + len(page)
+        else:
+            devices, total = self.automation_system.get_devices_page(offset, limit, query.get("type"))
+            next_offset = offset + len(devices)
+        return {"devices": [self.device_json(device) for device in devices], "total": total,
+                "next_offset": next_offset if next_offset < total else None}
+
+    def get_device(self, device_type, device_id):
+        device = self.automation_system.get_device(device_type, device_id)
+        if device is None:
+            raise ApiError(404, f"No device '{device_type}#{device_id}'.")
+        return self.device_json(device)
+
+    def device_json(self, device):
+        """Return the API representation of a device, including its room and tags."""
+        state = device_json(device)
+        room = self.automation_system.get_device_room(device)
+        if room is not None:
+            state["room"] = room
+        tags = self.automation_system.get_device_tags(device)
+        if tags:
+            state["tags"] = sorted(tags)
+        return state
+
+    def add_devices(self, query, body):
+        added, errors = 0, []
+        for index, item in enumerate(body_items(body)):
+            try:
+                device_type, device_id = item_key(item)
+                values = coerce_attributes({name: item[name] for name in DEVICE_ATTRIBUTES
+                                            if item.get(name) is not None})
+                device = self.device_factory(device_type, device_id, status=values.get("status", False),
+                                             brightness=values.get("brightness"),
+                                             temperature=values.get("temperature"),
+                                             security_status=values.get("security_status"))
+                if self.automation_system.has_device(device_type, device_id):
+                    raise ValueError(f"Device '{device_type}#{device_id}' is already registered.")
+                try:
+                    self.automation_system.add_device(device)
+                except Exception:
+                    # A listener failed after the device was registered; don't leave it half added
+                    if self.automation_system.has_device(device_type, device_id):
+                        self.automation_system.remove_device(device_id, device_type)
+                    raise
+                added += 1
+            except (TypeError, ValueError) as e:
+                errors.append({"index": index, "error": str(e)})
+        return {"added": added, "errors": errors}
+
+    def update_devices(self, query, body):
+        items = body_items(body)
+        for index, item in enumerate(items):
+            # A room that isn't a string fails inside the registry's listeners, so reject the request up front
+            if isinstance(item, dict) and item.get("room") is not None and not isinstance(item["room"], str):
+                raise ApiError(400, f"Device {index}: room must be a string or null.")
+        updated, errors = 0, []
+        for index, item in enumerate(items):
+            try:
+                device_type, device_id = item_key(item)
+                device = self.automation_system.get_device(device_type, device_id)
+                if device is None:
+                    raise ValueError(f"No device '{device_type}#{device_id}'.")
+                attributes = coerce_attributes({name: item[name] for name in DEVICE_ATTRIBUTES if name in item})
+                for name in attributes:
+                    if not hasattr(device, name):
+                        raise ValueError(f"A {device_type} has no attribute '{name}'.")
+                if "tags" in item and not isinstance(item["tags"], list):
+                    raise ValueError("tags must be a list.")
+                if attributes:
+                    self.automation_system.update_device(device, **attributes)
+                if "room" in item:
+                    self.automation_system.set_device_room(device, item["room"])
+                if "tags" in item:
+                    self.automation_system.set_device_tags(device, [str(tag) for tag in item["tags"]])
+                updated += 1
+            except (TypeError, ValueError) as e:
+                errors.append({"index": index, "error": str(e)})
+        return {"updated": updated, "errors": errors}
+
+    def remove_devices(self, query, body):
+        removed, errors = 0, []
+        for index, item in enumerate(body_items(body)):
+            try:
+                device_type, device_id = item_key(item)
+                if not self.automation_system.has_device(device_type, device_id):
+                    raise ValueError(f"No device '{device_type}#{device_id}'.")
+                self.automation_system.remove_device(device_id, device_type)
+                removed += 1
+            except (TypeError, ValueError) as e:
+                errors.append({"index": index, "error": str(e)})
+        return {"removed": removed, "errors": errors}
+
+    def command_group(self, query, body):
+        return {"updated": len(group_command(body).apply(self.automation_system.registry))}
+
+    def list_scenes(self, query, body):
+        return {"scenes": [scene.as_json() for scene in self.automation_system.get_scenes()]}
+
+    def define_scene(self, query, body):
+        if not isinstance(body, dict) or not isinstance(body.get("name"), str) \
+                or not isinstance(body.get("commands"), list):
+            raise ApiError(400, "Expected {\"name\": ..., \"commands\": [...]}.")
+        self.automation_system.add_scene(Scene(body["name"], [group_command(item) for item in body["commands"]]))
+        return {"name": body["name"]}
+
+    def activate_scene(self, query, body):
+        name = body.get("name") if isinstance(body, dict) else None
+        try:
+            return {"updated": self.automation_system.activate_scene(name)}
+        except ValueError as e:
+            raise ApiError(404, str(e))
+
+    def energy(self, query, body):
+        if self.energy_monitor is None:
+            raise ApiError(400, "Energy monitoring is not enabled.")
+        if not query.get("room"):
+            return self.energy_monitor.as_json()
+        room = query["room"]
+        return {"room": room, "watts": self.energy_monitor.watts(room),
+                "hourly_kwh": [{"hour": hour, "kwh": kwh} for hour, kwh in self.energy_monitor.hourly_kwh(room)]}
+
+    def batch(self, query, body):
+        """Run several requests, given as {"requests": [{"method", "path", "body"}, ...]}, in order."""
+        requests = body.get("requests") if isinstance(body, dict) else None
+        if not isinstance(requests, list):
+            raise ApiError(400, "Expected {\"requests\": [...]}.")
+        responses = []
+        for request in requests:
+            try:
+                if not isinstance(request, dict):
+                    raise ApiError(400, "Each request needs a 'method' and a 'path'.")
+                url = urlsplit(request.get("path", ""))
+                sub_query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                status, payload = self.dispatch(request.get("method", "GET").upper(), url.path, sub_query,
+                                                request.get("body"))
+            except ApiError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception:
+                logger.exception("Failed to handle batched request %r", request)
+                status, payload = 500, {"error": "Internal server error."}
+            responses.append({"status": status, "body": payload})
+        return {"responses": responses}
+
+    async def stream_events(self, reader, writer, headers, query):
+        """Upgrade the connection to a WebSocket streaming device change batches.
+
+        Each message is a JSON array (or a msgpack array with ``?format=msgpack``)
+        of events as returned by ``event_json``.
+        """
+        binary = query.get("format") == "msgpack"
+        if self.event_bus is None or (binary and msgpack is None) or "sec-websocket-key" not in headers:
+            status, message = ((503, "Event streaming is not enabled.") if self.event_bus is None else
+                               (406, "msgpack is not installed on the server.") if binary and msgpack is None else
+                               (400, "Missing Sec-WebSocket-Key."))
+            writer.write(response_bytes(status, encode({"error": message}, JSON_TYPE), keep_alive=False))
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest())
+        writer.write(response_bytes(101, extra_headers=("Upgrade: websocket", "Connection: Upgrade",
+                                                        f"Sec-WebSocket-Accept: {accept.decode()}")))
+        await writer.drain()
+
+        content_type, opcode = (MSGPACK_TYPE, WEBSOCKET_BINARY) if binary else (JSON_TYPE, WEBSOCKET_TEXT)
+
+        async def send(events):
+            payload = encode([event_json(event, self.device_json) for event in events], content_type)
+            writer.write(websocket_frame(payload, opcode))
+            await writer.drain()
+
+        subscription = self.event_bus.subscribe(send, name="websocket")
+        try:
+            while True:
+                frame_opcode, payload = await read_websocket_frame(reader)
+                if frame_opcode == WEBSOCKET_CLOSE:
+                    writer.write(websocket_frame(payload[:2], WEBSOCKET_CLOSE))
+                    await writer.drain()
+                    break
+                if frame_opcode == WEBSOCKET_PING:
+                    writer.write(websocket_frame(payload, WEBSOCKET_PONG))
+        finally:
+            subscription.cancel()
+
+
+async def simulate_shards(automation_system, rate_hz, state_lock):
+    """Step a ShardedAutomationSystem in real time without blocking the event loop.
+
+    Each step holds state_lock, the ApiServer's, so requests changing devices are
+    applied between steps instead of racing the workers' writes.
+    """
+    loop = asyncio.get_running_loop()
+    last = loop.time()
+    while True:
+        await asyncio.sleep(1.0 / rate_hz)
+        async with state_lock:
+            now = loop.time()
+            await loop.run_in_executor(None, automation_system.step, now - last)
+        last = now
+
+
+async def serve(host, port, shards=0):
+    """Run an API server over a new, empty automation system until cancelled.
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on.
+        shards: Number of worker processes of a ShardedAutomationSystem, or 0 to
+            keep every device in this process.
+    """
+    event_bus = EventBus()
+    event_bus.start(asyncio.get_running_loop())
+    simulation = None
+    automation_system = ShardedAutomationSystem(shards=shards) if shards else AutomationSystem()
+    automation_system.add_listener(EventPublisher(event_bus))
+    server = ApiServer(automation_system, event_bus, search_index=DeviceSearchIndex(automation_system.registry),
+                       energy_monitor=EnergyMonitor(automation_system.registry))
+    if shards:
+        simulation = asyncio.ensure_future(simulate_shards(automation_system, SHARD_SIMULATION_HZ,
+                                                           server.state_lock))
+    host, port = await server.start(host, port)
+    print(f"Serving on http://{host}:{port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        if simulation is not None:
+            simulation.cancel()
+            automation_system.close()
+        await event_bus.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on; 0 picks a free port.")
+    parser.add_argument("--shards", type=int, default=0, help="Simulate devices in N worker processes.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.shards))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
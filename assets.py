@@ -0,0 +1,92 @@
+import os
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QImage, QPixmap
+
+# Image files are looked up next to this module, independent of the working directory
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+THUMBNAIL_DIR = os.path.join(ASSET_DIR, '.cache', 'thumbnails')
+
+# Sizes of the pre-scaled images used for window icons and the login logo
+ICON_SIZE = 64
+LOGO_WIDTH = 480
+
+
+class AssetManager:
+    """Loads image assets once and serves cached, pre-scaled pixmaps and icons.
+
+    Scaled versions of an image are written to a thumbnail cache the first time they
+    are requested, so later runs decode the small file instead of the original.
+    """
+    def __init__(self, asset_dir=ASSET_DIR, thumbnail_dir=THUMBNAIL_DIR):
+        """Initialize an AssetManager.
+
+        Args:
+            asset_dir: Directory the image files are resolved against.
+            thumbnail_dir: Directory scaled copies are cached in.
+        """
+        self.asset_dir = asset_dir
+        self.thumbnail_dir = thumbnail_dir
+        self._pixmaps = {}
+        self._icons = {}
+
+    def path(self, name):
+        """Return the absolute path of an asset file."""
+        return os.path.join(self.asset_dir, name)
+
+    def pixmap(self, name, width=None, height=None):
+        """Return the decoded image, scaled to fit within width x height if given.
+
+        Args:
+            name: File name of the asset.
+            width: Maximum width in pixels, or None to keep the original width.
+            height: Maximum height in pixels, or None to keep the aspect ratio.
+        """
+        key = (name, width, height)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            if width is None and height is None:
+                pixmap = QPixmap(self.path(name))
+            else:
+                pixmap = QPixmap.fromImage(self._scaled_image(name, width, height))
+            self._pixmaps[key] = pixmap
+        return pixmap
+
+    def icon(self, name):
+        """Return a window icon made from a pre-scaled copy of the asset."""
+        icon = self._icons.get(name)
+        if icon is None:
+            icon = QIcon(self.pixmap(name, ICON_SIZE, ICON_SIZE))
+            self._icons[name] = icon
+        return icon
+
+    def _scaled_image(self, name, width, height):
+        source = self.path(name)
+        base, _ = os.path.splitext(name)
+        thumbnail = os.path.join(self.thumbnail_dir, f'{base}_{width or 0}x{height or 0}.png')
+        if os.path.exists(thumbnail) and os.path.getmtime(thumbnail) >= os.path.getmtime(source):
+            image = QImage(thumbnail)
+            if not image.isNull():
+                return image
+
+        image = QImage(source)
+        if image.isNull():
+            return image
+        if height is None:
+            image = image.scaledToWidth(min(width, image.width()), Qt.SmoothTransformation)
+        elif width is None:
+            image = image.scaledToHeight(min(height, image.height()), Qt.SmoothTransformation)
+        else:
+            image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        try:
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            image.save(thumbnail)
+        except OSError:
+            # A read-only install still works, it just scales on every start
+            pass
+        return image
+
+
+# Shared instance used by the application windows
+assets = AssetManager()
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AsyncDatabase(QObject):
+    """Runs DatabaseManager queries on worker threads and reports results through Qt signals.
+
+    Signals are emitted from the worker threads; slots connected from the GUI thread
+    are invoked there through Qt's queued connections, so the GUI never waits on
+    the database.
+    """
+    authentication_finished = pyqtSignal(str, bool)
+    registration_finished = pyqtSignal(str, bool)
+    database_error = pyqtSignal(str)
+
+    def __init__(self, db_manager, parent=None):
+        """Initialize an AsyncDatabase.
+
+        Args:
+            db_manager: The DatabaseManager whose methods are run off the GUI thread.
+            parent: The parent QObject.
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._executor = ThreadPoolExecutor(max_workers=db_manager.pool.size,
+                                            thread_name_prefix="database")
+
+    def authenticate(self, username, password):
+        """Check a username and password; emits authentication_finished with the result."""
+        self._submit(self.authentication_finished, username, self.db_manager.authenticate, username, password)
+
+    def register_user(self, username, password):
+        """Register a new user; emits registration_finished with the result."""
+        self._submit(self.registration_finished, username, self.db_manager.register_user, username, password)
+
+    def _submit(self, signal, username, function, *args):
+        future = self._executor.submit(function, *args)
+
+        def done(future):
+            error = future.exception()
+            if error is not None:
+                self.database_error.emit(str(error))
+            else:
+                signal.emit(username, future.result())
+
+        future.add_done_callback(done)
+
+    def shutdown(self):
+        """Wait for queued queries to finish and stop the worker threads."""
+        self._executor.shutdown(wait=True)
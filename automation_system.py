@@ -0,0 +1,108 @@
+import metrics
+from device_registry import DeviceRegistry
+from scenes import DeviceGroup, GroupCommand
+
+
+class AutomationSystem:
+    """Central automation system holding the devices of the smart home in a DeviceRegistry."""
+    def __init__(self):
+        self.registry = DeviceRegistry()
+        self.scenes = {}
+
+    @property
+    def devices(self):
+        return list(self.registry)
+
+    def add_listener(self, listener):
+        self.registry.add_listener(listener)
+
+    def add_device(self, device):
+        self.registry.add(device)
+
+    def add_devices(self, devices):
+        return self.registry.add_many(devices)
+
+    @metrics.timed("homemate_remove_device_seconds", "Duration of removing a device and notifying listeners.")
+    def remove_device(self, device_id, device_type=None):
+        """Remove the device with the given ID, of any type if device_type is None, and return the removed devices."""
+        types = [device_type] if device_type is not None else self.registry.types()
+        removed = [self.registry.remove(registered_type, device_id) for registered_type in types]
+        return [device for device in removed if device is not None]
+
+    def has_device(self, device_type, device_id):
+        return self.registry.contains(device_type, device_id)
+
+    def get_device(self, device_type, device_id):
+        return self.registry.get(device_type, device_id)
+
+    def get_device_version(self, device):
+        return self.registry.version(device)
+
+    def mark_device_changed(self, device, *attributes):
+        self.registry.mark_changed(device, *attributes)
+
+    def update_device(self, device, **attributes):
+        self.registry.update(device, **attributes)
+
+    def update_devices(self, devices, **attributes):
+        return self.registry.update_many(devices, **attributes)
+
+    def get_group_devices(self, room=None, device_type=None, tag=None):
+        return DeviceGroup(room, device_type, tag).devices(self.registry)
+
+    def command_group(self, room=None, device_type=None, tag=None, **attributes):
+        """Set attributes on every device of a room, type and/or tag group that has them, in one bulk update.
+
+        Returns:
+            The number of devices updated.
+        """
+        return len(GroupCommand(DeviceGroup(room, device_type, tag), **attributes).apply(self.registry))
+
+    def add_scene(self, scene):
+        self.scenes[scene.name] = scene
+
+    def remove_scene(self, name):
+        self.scenes.pop(name, None)
+
+    def get_scenes(self):
+        return list(self.scenes.values())
+
+    def activate_scene(self, name):
+        """Apply the commands of a scene and return the number of device updates.
+
+        Raises:
+            ValueError: If no scene has the given name.
+        """
+        scene = self.scenes.get(name)
+        if scene is None:
+            raise ValueError(f"Unknown scene '{name}'.")
+        return scene.apply(self.registry)
+
+    def set_device_tags(self, device, tags):
+        self.registry.set_tags(device, tags)
+
+    def set_devices_tags(self, devices, tag_sets):
+        self.registry.set_tag_sets(devices, tag_sets)
+
+    def get_device_tags(self, device):
+        return self.registry.tags(device)
+
+    def set_device_room(self, device, room):
+        self.registry.set_room(device, room)
+
+    def set_devices_rooms(self, devices, rooms):
+        self.registry.set_rooms(devices, rooms)
+
+    def get_device_room(self, device):
+        return self.registry.room(device)
+
+    def get_rooms(self):
+        return self.registry.rooms()
+
+    def get_devices(self, device_type=None):
+        if device_type is not None:
+            return self.registry.devices_of_type(device_type)
+        return list(self.registry)
+
+    def get_devices_page(self, offset, limit, device_type=None):
+        return self.registry.page(offset, limit, device_type)
@@ -0,0 +1,56 @@
+"""Throughput benchmark of concurrent DatabaseManager.authenticate calls.
+
+Usage:
+    python benchmarks/bench_authenticate.py [--users N] [--logins N] [--threads 1,2,4,8] [--iterations N]
+
+The default hashing work factor is kept low so the numbers reflect the database layer;
+see bench_credentials.py for the cost of password hashing itself.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credentials import CredentialVerifier
+from database import DatabaseManager
+
+
+def run(db_manager, logins, threads, users):
+    """Run the given number of logins over a pool of threads and return logins/second."""
+    def login(i):
+        return db_manager.authenticate(f"user{i % users}", f"password{i % users}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--logins", type=int, default=20000)
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--iterations", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        thread_counts = [int(count) for count in args.threads.split(",")]
+        db_manager = DatabaseManager(os.path.join(directory, "bench.db"), pool_size=max(thread_counts),
+                                     hash_iterations=args.iterations, verifier=CredentialVerifier(processes=0))
+        db_manager.register_users_bulk((f"user{i}", f"password{i}") for i in range(args.users))
+
+        print(f"{'threads':>8} {'logins/s':>12}")
+        for threads in thread_counts:
+            print(f"{threads:>8} {run(db_manager, args.logins, threads, args.users):>12.0f}")
+        db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
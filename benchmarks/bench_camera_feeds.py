@@ -0,0 +1,64 @@
+"""Number of synthetic camera feeds one host can monitor for motion in real time.
+
+Usage:
+    python benchmarks/bench_camera_feeds.py [--cameras N] [--workers 0,1,2,4] [--fps N] [--steps N]
+                                            [--height N] [--width N]
+
+For every worker count the camera pipeline renders and analyses --steps frames of
+every camera as fast as it can. The frame rate divided by --fps is the number of
+feeds that could be monitored at that frame rate; 0 workers runs in-process.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation_system import AutomationSystem
+from camera_pipeline import DEFAULT_FRAME_HEIGHT, DEFAULT_FRAME_WIDTH, CameraPipeline
+from device_factory import create_device
+
+
+def measure(cameras, workers, steps, height, width):
+    automation_system = AutomationSystem()
+    automation_system.add_devices(create_device("SecurityCamera", f"camera{i}", status=True) for i in range(cameras))
+    pipeline = CameraPipeline(automation_system, workers=workers, height=height, width=width, seed=1)
+    try:
+        pipeline.step(2)
+        updates = 0
+        start = time.perf_counter()
+        for _ in range(steps):
+            updates += pipeline.step()
+        elapsed = time.perf_counter() - start
+        return cameras * steps / elapsed, updates / steps
+    finally:
+        pipeline.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=1000)
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts; default 0, then 1 up to "
+                                                        "the CPU count.")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frame rate each feed is monitored at.")
+    parser.add_argument("--steps", type=int, default=50, help="Frames analysed per camera.")
+    parser.add_argument("--height", type=int, default=DEFAULT_FRAME_HEIGHT)
+    parser.add_argument("--width", type=int, default=DEFAULT_FRAME_WIDTH)
+    args = parser.parse_args()
+    if args.workers:
+        worker_counts = [int(count) for count in args.workers.split(",")]
+    else:
+        worker_counts = [0, 1]
+        while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+            worker_counts.append(worker_counts[-1] * 2)
+
+    print(f"{args.cameras} cameras, {args.width}x{args.height} frames, on {os.cpu_count()} CPUs")
+    for workers in worker_counts:
+        rate, updates = measure(args.cameras, workers, args.steps, args.height, args.width)
+        print(f"  {workers:>3} workers: {rate:9.0f} frames/s = {rate / args.fps:7.0f} feeds at {args.fps:g} fps "
+              f"({updates:.1f} status updates per frame)")
+
+
+if __name__ == "__main__":
+    main()
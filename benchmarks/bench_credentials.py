@@ -0,0 +1,56 @@
+"""Logins per second at different password hashing work factors.
+
+Usage:
+    python benchmarks/bench_credentials.py [--logins N] [--iterations 10000,50000,100000,200000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credentials import CredentialVerifier
+from database import DatabaseManager
+
+
+def run(db_manager, logins, threads):
+    """Run the given number of logins concurrently and return logins/second."""
+    def login(i):
+        return db_manager.authenticate(f"user{i % 10}", f"password{i % 10}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--iterations", default="10000,50000,100000,200000")
+    args = parser.parse_args()
+    threads = os.cpu_count() or 1
+
+    print(f"{'iterations':>10} {'in-thread/s':>12} {'process pool/s':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for iterations in [int(count) for count in args.iterations.split(",")]:
+            results = []
+            for processes in (0, None):
+                verifier = CredentialVerifier(processes=processes)
+                db_manager = DatabaseManager(os.path.join(directory, f"bench{iterations}_{processes}.db"),
+                                             hash_iterations=iterations, verifier=verifier)
+                db_manager.register_users_bulk((f"user{i}", f"password{i}") for i in range(10))
+                # Warm up the worker processes before timing
+                run(db_manager, threads, threads)
+                results.append(run(db_manager, args.logins, threads))
+                db_manager.close()
+            print(f"{iterations:>10} {results[0]:>12.1f} {results[1]:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
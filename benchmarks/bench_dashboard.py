@@ -0,0 +1,181 @@
+"""Headless latency benchmark of the dashboard and login hot paths at increasing scale.
+
+Usage:
+    python benchmarks/bench_dashboard.py [--sizes 10,1000,10000,100000] [--repeats N]
+                                         [--output results.json] [--compare previous.json]
+
+Each size is the number of devices registered before the dashboard is built, and
+the number of users in the database for DatabaseManager.authenticate. The
+dashboard runs on Qt's offscreen platform unless QT_QPA_PLATFORM is set, and
+message boxes are suppressed. Results are written as JSON together with the
+commit they were measured at; passing an earlier results file to --compare
+prints the change of every median.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+
+from automation_system import AutomationSystem
+from credentials import CredentialVerifier
+from database import DatabaseManager
+from device_factory import create_device
+from login_window import SmartHomeGUI
+
+DEVICE_TYPES = ("SmartLight", "Thermostat", "SecurityCamera")
+
+# Device types as named in the dashboard's dropdown
+DROPDOWN_NAMES = {"SmartLight": "Smart Light", "Thermostat": "Thermostat", "SecurityCamera": "Security Camera"}
+
+
+def summarize(durations):
+    """Return latency statistics in milliseconds of a list of durations in seconds."""
+    durations = sorted(duration * 1000 for duration in durations)
+    return {
+        "min_ms": durations[0],
+        "median_ms": statistics.median(durations),
+        "p95_ms": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+        "mean_ms": statistics.fmean(durations),
+    }
+
+
+def time_calls(call, repeats, prepare=None):
+    """Return the durations of repeats calls of call(i), running prepare(i) untimed before each."""
+    durations = []
+    for i in range(repeats):
+        if prepare:
+            prepare(i)
+        start = time.perf_counter()
+        call(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_dashboard(app, devices, repeats):
+    """Build a dashboard over the given number of devices and time its hot paths."""
+    automation_system = AutomationSystem()
+    automation_system.add_devices(create_device(DEVICE_TYPES[i % 3], f"device{i}", status=bool(i % 2))
+                                  for i in range(devices))
+    start = time.perf_counter()
+    gui = SmartHomeGUI(automation_system)
+    gui.show_message = lambda title, message: None
+    gui.show()
+    app.processEvents()
+    results = {"build_dashboard": summarize([time.perf_counter() - start])}
+
+    def add(i):
+        gui.device_type_dropdown.setCurrentText(DROPDOWN_NAMES[DEVICE_TYPES[i % 3]])
+        gui.device_id_textfield.setText(f"added{i}")
+
+    results["add_new_device"] = summarize(time_calls(lambda i: gui.add_new_device(), repeats, add))
+
+    def select(i):
+        gui.remove_device_dropdown.setCurrentIndex(gui.remove_device_dropdown.count() // 2)
+
+    results["remove_selected_device"] = summarize(time_calls(lambda i: gui.remove_selected_device(), repeats, select))
+    results["update_remove_device_dropdown"] = summarize(
+        time_calls(lambda i: gui.update_remove_device_dropdown(), repeats))
+
+    def change(i):
+        # Give the refresh something to do: a panel device and a table row changed
+        if gui.smart_light:
+            automation_system.update_device(gui.smart_light, status=bool(i % 2))
+        automation_system.mark_device_changed(automation_system.get_devices()[0], "status")
+
+    results["update_device_status"] = summarize(time_calls(lambda i: gui.update_device_status(), repeats, change))
+    gui.close()
+    gui.deleteLater()
+    app.processEvents()
+    return results
+
+
+def bench_authenticate(users, repeats):
+    """Time DatabaseManager.authenticate against a database of the given number of users."""
+    with tempfile.TemporaryDirectory() as directory:
+        # A minimal work factor keeps the numbers about the lookup rather than hashing
+        db_manager = DatabaseManager(os.path.join(directory, "bench.db"), hash_iterations=1,
+                                     verifier=CredentialVerifier(processes=0))
+        try:
+            db_manager.register_users_bulk((f"user{i}", f"password{i}") for i in range(users))
+
+            def login(i):
+                user = i * 7919 % users
+                assert db_manager.authenticate(f"user{user}", f"password{user}")
+
+            return {"authenticate": summarize(time_calls(login, repeats))}
+        finally:
+            db_manager.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """Print the change of every median against an earlier results document."""
+    print(f"\nCompared with {previous.get('commit') or 'unknown commit'}:", file=sys.stderr)
+    for operation, by_size in results["results"].items():
+        for size, stats in by_size.items():
+            old = previous.get("results", {}).get(operation, {}).get(size)
+            if old:
+                change = stats["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+                print(f"  {operation:<30} {size:>7}: {old['median_ms']:9.3f} -> {stats['median_ms']:9.3f} ms "
+                      f"({change:+.0%})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed calls per operation and size.")
+    parser.add_argument("--output", help="Path of the JSON results file; printed to stdout if omitted.")
+    parser.add_argument("--compare", help="JSON results file of an earlier run to compare against.")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "qpa_platform": os.environ["QT_QPA_PLATFORM"],
+        "repeats": args.repeats,
+        "results": {},
+    }
+    for size in sizes:
+        measured = bench_dashboard(app, size, args.repeats)
+        measured.update(bench_authenticate(size, args.repeats))
+        for operation, stats in measured.items():
+            results["results"].setdefault(operation, {})[str(size)] = stats
+            print(f"{operation:<30} {size:>7}: median {stats['median_ms']:9.3f} ms, p95 {stats['p95_ms']:9.3f} ms",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Bytes per device of regular device objects versus compact, array-backed devices.
+
+Usage:
+    python benchmarks/bench_device_memory.py [--devices N]
+
+Compact devices are measured twice: stored only as table rows, with handles
+created on demand, and with a handle kept for every device, as a registry does.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compact_devices
+
+try:
+    from smart_home.smart_light import SmartLight
+    from smart_home.thermostat import Thermostat
+    from smart_home.security_camera import SecurityCamera
+except ImportError:
+    # Stand-ins with the same dict-backed attribute layout as the smart_home classes
+    class SmartLight:
+        def __init__(self, id, status=False, brightness=0.0):
+            self.id = id
+            self.status = status
+            self.brightness = brightness
+
+    class Thermostat:
+        def __init__(self, id, status=False, temperature=0.0):
+            self.id = id
+            self.status = status
+            self.temperature = temperature
+
+    class SecurityCamera:
+        def __init__(self, id, status=False, security_status=""):
+            self.id = id
+            self.status = status
+            self.security_status = security_status
+
+
+def measure(create, ids, setup=None):
+    """Return the bytes allocated per device while creating one device per ID."""
+    tracemalloc.start()
+    if setup is not None:
+        setup()
+    devices = [create(i, device_id) for i, device_id in enumerate(ids)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(devices) == len(ids)
+    return size / len(ids)
+
+
+def measure_rows(ids):
+    """Return the bytes allocated per device while storing one compact device per ID as table rows."""
+    tracemalloc.start()
+    # The shared arrays are counted as part of the compact devices' memory
+    table = compact_devices.CompactDeviceTable(capacity=len(ids))
+    rows = [
+        compact_devices.SmartLight.store_many(ids[0::3], [True] * len(ids[0::3]),
+                                              [float(i % 100) for i in range(0, len(ids), 3)], table),
+        compact_devices.Thermostat.store_many(ids[1::3], [False] * len(ids[1::3]), [21.5] * len(ids[1::3]), table),
+        compact_devices.SecurityCamera.store_many(ids[2::3], [True] * len(ids[2::3]),
+                                                  ["All Clear"] * len(ids[2::3]), table),
+    ]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert sum(map(len, rows)) == len(table) == len(ids)
+    return size / len(ids)
+
+
+def make_factory(light, thermostat, camera):
+    def create(i, device_id):
+        kind = i % 3
+        if kind == 0:
+            return light(id=device_id, status=True, brightness=float(i % 100))
+        if kind == 1:
+            return thermostat(id=device_id, status=False, temperature=21.5)
+        return camera(id=device_id, status=True, security_status="All Clear")
+    return create
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100000)
+    args = parser.parse_args()
+    # IDs are created up front so both measurements exclude them
+    ids = [str(i) for i in range(args.devices)]
+
+    regular = measure(make_factory(SmartLight, Thermostat, SecurityCamera), ids)
+
+    def setup():
+        # The shared arrays are counted as part of the compact devices' memory
+        compact_devices.default_table = compact_devices.CompactDeviceTable(capacity=args.devices)
+
+    handles = measure(make_factory(compact_devices.SmartLight, compact_devices.Thermostat,
+                                   compact_devices.SecurityCamera), ids, setup)
+    rows = measure_rows(ids)
+    print(f"regular devices:               {regular:.1f} bytes/device")
+    print(f"compact devices, rows only:    {rows:.1f} bytes/device")
+    print(f"compact devices, handles kept: {handles:.1f} bytes/device")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Rule evaluations per second with many rules and a high rate of state updates.
+
+Usage:
+    python benchmarks/bench_rules.py [--devices N] [--rules N] [--updates N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_devices import SmartLight, Thermostat, SecurityCamera
+from device_registry import DeviceRegistry
+from rules import Clamp, Rule, RuleEngine, SetAttribute, Trigger, devices_by_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--updates", type=int, default=200000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    registry = DeviceRegistry()
+    per_type = args.devices // 3
+    for i in range(per_type):
+        registry.add(SmartLight(str(i)))
+        registry.add(Thermostat(str(i), temperature=20.0))
+        registry.add(SecurityCamera(str(i), status=True))
+
+    engine = RuleEngine(registry)
+    for i in range(args.rules):
+        device_id = str(rng.randrange(per_type))
+        if i % 2:
+            engine.add_rule(Rule(f"comfort-{i}", Trigger("Thermostat", "temperature", "changed", device_id=device_id),
+                                 [Clamp("temperature", 19.0, 22.0)]))
+        else:
+            light_id = str(rng.randrange(per_type))
+            engine.add_rule(Rule(f"intrusion-{i}",
+                                 Trigger("SecurityCamera", "security_status", "==", "Intrusion Detected",
+                                         device_id=device_id),
+                                 [SetAttribute("status", True, devices_by_key(("SmartLight", light_id)))]))
+
+    thermostats = registry.devices_of_type("Thermostat")
+    cameras = registry.devices_of_type("SecurityCamera")
+    statuses = SecurityCamera.RANDOM_SECURITY_STATUSES
+    start = time.perf_counter()
+    for i in range(args.updates):
+        if i % 2:
+            registry.update(thermostats[i % len(thermostats)], temperature=rng.uniform(15.0, 26.0))
+        else:
+            registry.update(cameras[i % len(cameras)], security_status=statuses[i % len(statuses)])
+    elapsed = time.perf_counter() - start
+    print(f"{args.rules} rules, {args.updates} updates in {elapsed:.2f} s: "
+          f"{args.updates / elapsed:.0f} updates/s, {engine.evaluations / elapsed:.0f} rule evaluations/s "
+          f"({engine.evaluations} evaluations)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Simulation throughput of the sharded backend for increasing numbers of shards.
+
+Usage:
+    python benchmarks/bench_sharded.py [--devices N] [--shards 1,2,4,8] [--steps N] [--ticks N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_devices import SmartLight, Thermostat, SecurityCamera
+from sharded_backend import ShardedAutomationSystem
+
+
+def measure(devices, shards, steps, ticks):
+    system = ShardedAutomationSystem(shards=shards, capacity_per_shard=devices // shards + devices // 8 + 1024,
+                                     seed=1)
+    try:
+        start = time.perf_counter()
+        for i in range(devices):
+            kind = i % 3
+            if kind == 0:
+                system.add_device(SmartLight(str(i), status=bool(i % 2)))
+            elif kind == 1:
+                system.add_device(Thermostat(str(i), status=bool(i % 2), temperature=18.0))
+            else:
+                system.add_device(SecurityCamera(str(i), status=True))
+        populate = time.perf_counter() - start
+        system.step(1 / 60, ticks)
+        start = time.perf_counter()
+        for _ in range(steps):
+            system.step(1 / 60, ticks)
+        elapsed = time.perf_counter() - start
+        return populate, devices * steps * ticks / elapsed
+    finally:
+        system.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=300000)
+    parser.add_argument("--shards", default=None, help="Comma-separated shard counts; default 1 up to the CPU count.")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=10, help="Ticks simulated per step round trip.")
+    args = parser.parse_args()
+    if args.shards:
+        shard_counts = [int(count) for count in args.shards.split(",")]
+    else:
+        shard_counts = [1]
+        while shard_counts[-1] * 2 <= (os.cpu_count() or 1):
+            shard_counts.append(shard_counts[-1] * 2)
+
+    print(f"{args.devices} devices on {os.cpu_count()} CPUs")
+    baseline = None
+    for shards in shard_counts:
+        populate, rate = measure(args.devices, shards, args.steps, args.ticks)
+        baseline = baseline or rate
+        print(f"  {shards:>3} shards: {rate / 1e6:8.1f} M device-ticks/s  "
+              f"(x{rate / baseline:.2f}, {rate / baseline / shards:.0%} efficiency; populated in {populate:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Ticks per second of the headless simulation engine on a large fleet.
+
+Usage:
+    python benchmarks/bench_simulation.py [--devices N] [--ticks N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import SimulationEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = SimulationEngine(seed=1)
+    start = time.perf_counter()
+    for i in range(args.devices):
+        device_type = ("SmartLight", "Thermostat", "SecurityCamera")[i % 3]
+        engine.add_simulated_device(device_type, str(i), status=i % 2 == 0)
+    print(f"populated {args.devices} devices in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        engine.step(0.1)
+    elapsed = time.perf_counter() - start
+    print(f"{args.ticks / elapsed:.1f} ticks/s ({elapsed / args.ticks * 1000:.2f} ms per tick)")
+
+
+if __name__ == "__main__":
+    main()
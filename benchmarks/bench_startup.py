@@ -0,0 +1,53 @@
+"""Time from process start to the first shown login window.
+
+Each run starts a fresh interpreter with the Qt offscreen platform, so the numbers
+include interpreter start-up, imports, image decoding and window construction.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, time
+start = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+from smart_home_application import SmartHomeApplication
+application = SmartHomeApplication()
+application.login_window.show()
+application.app.processEvents()
+print(time.time() - start)
+"""
+
+
+def time_to_first_window(directory):
+    """Start the application once and return the seconds until the login window was shown."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    # Run from a scratch directory so the benchmark doesn't touch smart_home.db
+    output = subprocess.run([sys.executable, "-c", CHILD, repr(time.time()), REPO_DIR],
+                            cwd=directory, env=env, check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        timings = [time_to_first_window(directory) for _ in range(args.runs)]
+    print(f"time to first window over {args.runs} runs: "
+          f"min {min(timings) * 1000:.1f} ms, median {statistics.median(timings) * 1000:.1f} ms, "
+          f"max {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Load test of the HTTP API: requests per second and latency percentiles.
+
+Starts ``api_server.py`` on a free localhost port (or uses --port), seeds it with
+devices through bulk adds, then runs keep-alive clients issuing a mix of paginated
+listings, single-device reads and bulk updates for the given duration.
+
+Usage:
+    python benchmarks/load_test_api.py [--port N] [--devices N] [--connections N] [--duration S] [--msgpack]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEVICE_TYPES = ("SmartLight", "Thermostat", "SecurityCamera")
+
+
+class Client:
+    """Minimal HTTP/1.1 client holding one keep-alive connection."""
+    def __init__(self, host, port, use_msgpack=False):
+        self.host = host
+        self.port = port
+        self.content_type = "application/msgpack" if use_msgpack else "application/json"
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def encode(self, payload):
+        if self.content_type == "application/msgpack":
+            return msgpack.packb(payload)
+        return json.dumps(payload).encode()
+
+    def decode(self, body):
+        if self.content_type == "application/msgpack":
+            return msgpack.unpackb(body)
+        return json.loads(body)
+
+    async def request(self, method, path, payload=None):
+        body = b"" if payload is None else self.encode(payload)
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: {self.content_type}\r\nAccept: {self.content_type}\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, self.decode(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+async def seed(client, devices, batch_size=1000):
+    for start in range(0, devices, batch_size):
+        batch = [{"type": DEVICE_TYPES[i % 3], "id": str(i), "status": bool(i % 2)}
+                 for i in range(start, min(devices, start + batch_size))]
+        await client.request("POST", "/devices", batch)
+
+
+async def worker(client, devices, deadline, latencies, rng):
+    while time.perf_counter() < deadline:
+        choice = rng.random()
+        if choice < 0.6:
+            path, payload, method = f"/devices?offset={rng.randrange(devices)}&limit=50", None, "GET"
+        elif choice < 0.8:
+            i = rng.randrange(devices)
+            path, payload, method = f"/devices/{DEVICE_TYPES[i % 3]}/{i}", None, "GET"
+        else:
+            ids = [rng.randrange(devices) for _ in range(20)]
+            payload = [{"type": DEVICE_TYPES[i % 3], "id": str(i), "status": rng.random() < 0.5} for i in ids]
+            path, method = "/devices", "PATCH"
+        start = time.perf_counter()
+        status, _ = await client.request(method, path, payload)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"{method} {path} returned {status}")
+
+
+async def run(args, port):
+    seeder = Client(args.host, port, args.msgpack)
+    await seeder.connect()
+    await seed(seeder, args.devices)
+    seeder.close()
+
+    clients = [Client(args.host, port, args.msgpack) for _ in range(args.connections)]
+    await asyncio.gather(*(client.connect() for client in clients))
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(worker(client, args.devices, deadline, latencies, random.Random(i))
+                           for i, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+    return latencies, elapsed
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Port of a running server; default starts one.")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--msgpack", action="store_true", help="Encode requests and responses with msgpack.")
+    args = parser.parse_args()
+    if args.msgpack and msgpack is None:
+        parser.error("--msgpack needs the msgpack package.")
+
+    server = None
+    port = args.port
+    if port is None:
+        server = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, "api_server.py"), "--host", args.host,
+                                   "--port", "0"], stdout=subprocess.PIPE, text=True)
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+    try:
+        latencies, elapsed = asyncio.run(run(args, port))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {args.connections} connections in {elapsed:.1f} s")
+    print(f"  {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"  p50 {percentile(latencies, 0.50) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
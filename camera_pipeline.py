@@ -0,0 +1,364 @@
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation import SECURITY_STATUSES
+
+# Size of the synthetic grayscale frames in pixels
+DEFAULT_FRAME_HEIGHT = 120
+DEFAULT_FRAME_WIDTH = 160
+
+# Frames kept per camera in the ring buffer
+DEFAULT_RING_SLOTS = 4
+
+# Brightness difference between frames above which a pixel counts as changed
+DEFAULT_PIXEL_THRESHOLD = 25
+
+# Fractions of changed pixels reported as motion and as an intrusion
+DEFAULT_MOTION_FRACTION = 0.002
+DEFAULT_INTRUSION_FRACTION = 0.02
+
+# Probability per frame that something starts moving in front of a camera
+DEFAULT_EVENT_RATE = 0.01
+
+# Sensor noise added to every frame; it stays below the pixel threshold
+NOISE_LEVEL = 12
+
+# Noise frames generated up front and cycled through
+NOISE_BANK_SIZE = 8
+
+# Side lengths in pixels of a small moving object (a pet) and a large one (a person)
+SMALL_OBJECT_SIZE = 8
+LARGE_OBJECT_SIZE = 32
+
+# Status code of cameras that have not been analysed yet
+UNPUBLISHED = 255
+
+
+def status_code(changed_fraction, motion_fraction=DEFAULT_MOTION_FRACTION,
+                intrusion_fraction=DEFAULT_INTRUSION_FRACTION):
+    """Return the index in SECURITY_STATUSES of the status for a fraction of changed pixels."""
+    if changed_fraction >= intrusion_fraction:
+        return 2
+    if changed_fraction >= motion_fraction:
+        return 1
+    return 0
+
+
+class MotionDetector:
+    """Frame-differencing motion detector for a batch of cameras.
+
+    The absolute difference of consecutive frames is thresholded and the changed
+    pixels of each camera counted. Every step writes into scratch arrays allocated
+    once, so detection allocates nothing per frame.
+    """
+    def __init__(self, cameras, height, width, pixel_threshold=DEFAULT_PIXEL_THRESHOLD,
+                 motion_fraction=DEFAULT_MOTION_FRACTION, intrusion_fraction=DEFAULT_INTRUSION_FRACTION):
+        """Initialize a MotionDetector.
+
+        Args:
+            cameras: Number of cameras in a batch.
+            height: Frame height in pixels.
+            width: Frame width in pixels.
+            pixel_threshold: Brightness difference above which a pixel counts as changed.
+            motion_fraction: Fraction of changed pixels reported as motion.
+            intrusion_fraction: Fraction of changed pixels reported as an intrusion.
+        """
+        self.pixel_threshold = pixel_threshold
+        self.motion_count = motion_fraction * height * width
+        self.intrusion_count = intrusion_fraction * height * width
+        self._high = np.empty((cameras, height, width), np.uint8)
+        self._low = np.empty((cameras, height, width), np.uint8)
+        self._changed = np.empty((cameras, height, width), bool)
+
+    def changed_pixels(self, previous, current):
+        """Return the number of changed pixels of every camera between two (cameras, height, width) batches."""
+        np.maximum(previous, current, out=self._high)
+        np.minimum(previous, current, out=self._low)
+        np.subtract(self._high, self._low, out=self._high)
+        np.greater(self._high, self.pixel_threshold, out=self._changed)
+        return np.count_nonzero(self._changed.reshape(len(self._changed), -1), axis=1)
+
+    def detect(self, previous, current, out):
+        """Write the SECURITY_STATUSES index of every camera into out."""
+        changed = self.changed_pixels(previous, current)
+        out[:] = 0
+        out[changed >= self.motion_count] = 1
+        out[changed >= self.intrusion_count] = 2
+
+
+def frame_layout(cameras, slots, height, width):
+    """Return {name: (offset, dtype, shape)} and the total size of a camera pipeline's shared memory."""
+    layout = {}
+    offset = 0
+    for name, dtype, shape in (("sequence", np.int64, (1,)),
+                               ("status_codes", np.uint8, (cameras,)),
+                               ("frames", np.uint8, (cameras, slots, height, width))):
+        layout[name] = (offset, dtype, shape)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += (size + 7) // 8 * 8
+    return layout, offset
+
+
+def frame_arrays(buffer, layout):
+    """Return NumPy views of the arrays of a camera pipeline's shared memory block.
+
+    The views hold an export of the buffer, so the block cannot be unmapped while
+    any of them, or any view derived from them, is alive.
+    """
+    return {name: np.frombuffer(buffer, dtype, int(np.prod(shape)), offset).reshape(shape)
+            for name, (offset, dtype, shape) in layout.items()}
+
+
+class SyntheticCameras:
+    """Synthetic frame streams of a contiguous range of cameras, with motion detection.
+
+    Every camera films a static background of its own plus sensor noise, and now
+    and then a small or large object starts moving across the picture. Frames are
+    rendered straight into the slots of the shared ring buffer, then compared
+    with the previous slot to update the cameras' status codes.
+    """
+    def __init__(self, arrays, start, stop, seed=None, event_rate=DEFAULT_EVENT_RATE, **detector_options):
+        """Initialize the streams of cameras start..stop-1.
+
+        Args:
+            arrays: Views of the shared memory block, from frame_arrays.
+            start: Index of the first camera.
+            stop: Index after the last camera.
+            seed: Seed of the random number generator.
+            event_rate: Probability per frame that an object starts moving.
+            **detector_options: Thresholds passed to the MotionDetector.
+        """
+        self.frames = arrays["frames"][start:stop]
+        self.status_codes = arrays["status_codes"][start:stop]
+        cameras, self.slots, height, width = self.frames.shape
+        self.event_rate = event_rate
+        self.rng = np.random.default_rng(seed)
+        self.backgrounds = self.rng.integers(0, 256 - NOISE_LEVEL, (cameras, height, width), np.uint8)
+        self.noise = self.rng.integers(0, NOISE_LEVEL, (NOISE_BANK_SIZE, height, width), np.uint8)
+        self.detector = MotionDetector(cameras, height, width, **detector_options)
+        # Moving object of each camera: size (0 if none), position and velocity
+        self.object_size = np.zeros(cameras, np.int32)
+        self.position = np.zeros((cameras, 2))
+        self.velocity = np.zeros((cameras, 2))
+
+    def render(self, out, sequence):
+        """Render the next frame of every camera into out, a (cameras, height, width) view."""
+        np.add(self.backgrounds, self.noise[sequence % NOISE_BANK_SIZE], out=out)
+        cameras, height, width = out.shape
+        starting = np.flatnonzero((self.object_size == 0) & (self.rng.random(cameras) < self.event_rate))
+        if starting.size:
+            self.object_size[starting] = np.where(self.rng.random(starting.size) < 0.5, SMALL_OBJECT_SIZE,
+                                                  LARGE_OBJECT_SIZE)
+            self.position[starting] = self.rng.random((starting.size, 2)) * (height, width)
+            self.velocity[starting] = self.rng.normal(0.0, 4.0, (starting.size, 2))
+        moving = np.flatnonzero(self.object_size)
+        if not moving.size:
+            return
+        self.position[moving] += self.velocity[moving]
+        for camera in moving.tolist():
+            y, x = self.position[camera]
+            size = self.object_size[camera]
+            if not (-size < y < height and -size < x < width):
+                self.object_size[camera] = 0
+                continue
+            out[camera, max(0, int(y)):max(0, int(y) + size), max(0, int(x)):max(0, int(x) + size)] = 255
+
+    def step(self, sequence, frames=1):
+        """Produce and analyse frames sequence..sequence+frames-1 of every camera."""
+        for frame in range(sequence, sequence + frames):
+            current = self.frames[:, frame % self.slots]
+            self.render(current, frame)
+            if frame:
+                self.detector.detect(self.frames[:, (frame - 1) % self.slots], current, self.status_codes)
+
+
+def run_camera_worker(shm_name, cameras, slots, height, width, start, stop, connection, seed, options):
+    """Worker process loop producing and analysing the frames of cameras start..stop-1.
+
+    Commands arrive on the connection as ``("step", sequence, frames)`` or
+    ``("stop",)``; every step is answered with the number of frames processed.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    layout, _ = frame_layout(cameras, slots, height, width)
+    arrays = frame_arrays(shm.buf, layout)
+    streams = SyntheticCameras(arrays, start, stop, seed, **options)
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == "stop":
+                break
+            _, sequence, frames = command
+            streams.step(sequence, frames)
+            connection.send((stop - start) * frames)
+    finally:
+        del streams, arrays
+        shm.close()
+
+
+class CameraPipeline:
+    """Synthetic frame streams and motion detection for the security cameras of a home.
+
+    Frames of every camera are written into a ring buffer in one shared memory
+    block, which the coordinator (this object) and the worker processes map: the
+    workers render and analyse frames in place, and ``latest_frame`` returns a
+    view of a frame without copying it. Each worker handles a contiguous range of
+    cameras. After every step, cameras whose detected status changed are updated
+    with one bulk update per status, and only if they are switched on.
+
+    The cameras are those registered when the pipeline is created. Use the
+    pipeline as a context manager, or call ``close``, to stop the workers and free
+    the shared memory.
+    """
+    def __init__(self, automation_system, workers=None, height=DEFAULT_FRAME_HEIGHT, width=DEFAULT_FRAME_WIDTH,
+                 slots=DEFAULT_RING_SLOTS, seed=None, event_rate=DEFAULT_EVENT_RATE, **detector_options):
+        """Allocate the ring buffer and start the workers.
+
+        Args:
+            automation_system: The automation system whose SecurityCameras are simulated.
+            workers: Number of worker processes; defaults to the CPU count, and 0
+                processes the frames in this process.
+            height: Frame height in pixels.
+            width: Frame width in pixels.
+            slots: Frames kept per camera; at least 2.
+            seed: Seed of the random number generators.
+            event_rate: Probability per frame that an object starts moving in front of a camera.
+            **detector_options: pixel_threshold, motion_fraction and intrusion_fraction
+                of the MotionDetector.
+        """
+        if slots < 2:
+            raise ValueError("A camera ring buffer needs at least 2 slots.")
+        self.automation_system = automation_system
+        self.cameras = automation_system.get_devices("SecurityCamera")
+        self.rows = {id(camera): row for row, camera in enumerate(self.cameras)}
+        count = len(self.cameras)
+        layout, size = frame_layout(count, slots, height, width)
+        self.shm = None
+        self._unlinked = False
+        self._connections = []
+        self._workers = []
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.arrays = frame_arrays(self.shm.buf, layout)
+        self.arrays["sequence"][0] = 0
+        self.arrays["status_codes"][:] = UNPUBLISHED
+        # Status codes last published; no camera has one until its first detection
+        self._published = np.full(count, UNPUBLISHED, np.uint8)
+        self.frames_processed = 0
+        options = dict(detector_options, event_rate=event_rate)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._streams = None
+        if not workers:
+            self._streams = SyntheticCameras(self.arrays, 0, count, seed, **options)
+            return
+        bounds = np.linspace(0, count, min(workers, max(count, 1)) + 1).astype(int)
+        context = multiprocessing.get_context('spawn')
+        seeds = np.random.SeedSequence(seed).spawn(len(bounds) - 1)
+        for start, stop, worker_seed in zip(bounds[:-1], bounds[1:], seeds):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=run_camera_worker, name=f"cameras-{start}", daemon=True,
+                                     args=(self.shm.name, count, slots, height, width, int(start), int(stop),
+                                           worker_connection, worker_seed, options))
+            worker.start()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def step(self, frames=1):
+        """Produce and analyse frames of every camera, then publish changed statuses.
+
+        Returns:
+            The number of cameras whose security status was updated.
+        """
+        sequence = int(self.arrays["sequence"][0])
+        if self._streams is not None:
+            self._streams.step(sequence, frames)
+        else:
+            for connection in self._connections:
+                connection.send(("step", sequence, frames))
+            for connection in self._connections:
+                connection.recv()
+        self.arrays["sequence"][0] = sequence + frames
+        self.frames_processed += len(self.cameras) * frames
+        return self.publish()
+
+    def publish(self):
+        """Update the cameras that are on and whose detected status changed since the last publish."""
+        codes = self.arrays["status_codes"]
+        changed = [row for row in np.flatnonzero(codes != self._published).tolist() if self.cameras[row].status]
+        if not changed:
+            return 0
+        changed = np.array(changed)
+        codes = codes[changed]
+        self._published[changed] = codes
+        updated = 0
+        for code in np.unique(codes).tolist():
+            cameras = [self.cameras[row] for row in changed[codes == code].tolist()]
+            updated += len(self.automation_system.update_devices(cameras, security_status=SECURITY_STATUSES[code]))
+        return updated
+
+    def latest_frame(self, camera):
+        """Return a read-only view of the latest frame of a camera.
+
+        The view is overwritten by later steps, and must be released before the
+        pipeline is closed.
+        """
+        sequence = int(self.arrays["sequence"][0])
+        if not sequence:
+            return None
+        frames = self.arrays["frames"]
+        frame = frames[self.rows[id(camera)], (sequence - 1) % frames.shape[1]]
+        frame.flags.writeable = False
+        return frame
+
+    def run(self, fps, duration):
+        """Step the pipeline in real time at fps frames per second for duration seconds."""
+        interval = 1.0 / fps
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            frame_start = time.perf_counter()
+            self.step()
+            time.sleep(max(0.0, interval - (time.perf_counter() - frame_start)))
+
+    def close(self):
+        """Stop the workers and free the shared memory.
+
+        Raises:
+            BufferError: If frames returned by ``latest_frame`` are still referenced;
+                the workers are stopped and the block is unlinked regardless, and
+                calling close again once the frames are released unmaps it.
+        """
+        if self.shm is None:
+            return
+        for connection in self._connections:
+            connection.send(("stop",))
+        for worker in self._workers:
+            worker.join()
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        self._workers = []
+        self._streams = None
+        self.arrays = None
+        if not self._unlinked:
+            self.shm.unlink()
+            self._unlinked = True
+        try:
+            self.shm.close()
+        except BufferError:
+            raise BufferError("Frames returned by latest_frame are still referenced.") from None
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "shm", None) is not None:
+            self.close()
@@ -0,0 +1,294 @@
+import random
+from array import array
+
+# Device kind codes stored per row; 0 marks a free row
+KINDS = {"SmartLight": 1, "Thermostat": 2, "SecurityCamera": 3}
+
+
+class CompactDeviceTable:
+    """Shared typed-array storage for the state of many devices.
+
+    Every device is one row: its ID, a one-byte kind code, its on/off status as a
+    bit in a bitset, brightness and temperature as float32 values, and security
+    statuses as one-byte codes into a table of distinct status strings. The table
+    is the device store; device objects are lightweight handles created on demand
+    by ``device`` and ``devices``. Rows are kept until they are released.
+    """
+    def __init__(self, capacity=1024):
+        """Initialize an empty CompactDeviceTable.
+
+        Args:
+            capacity: Number of rows allocated up front; the table grows as needed.
+        """
+        self.capacity = capacity
+        self.ids = [None] * capacity
+        self.kind = array('B', bytes(capacity))
+        self.status_bits = bytearray((capacity + 7) // 8)
+        self.brightness = array('f', bytes(4 * capacity))
+        self.temperature = array('f', bytes(4 * capacity))
+        self.security_codes = array('B', bytes(capacity))
+        self.security_statuses = [""]
+        self._security_status_codes = {"": 0}
+        self._next_row = 0
+        self._free_rows = []
+
+    def allocate(self, kind, device_id):
+        """Return a cleared row for a new device of the given kind code."""
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self._next_row == self.capacity:
+                self._grow()
+            row = self._next_row
+            self._next_row += 1
+        self.ids[row] = device_id
+        self.kind[row] = kind
+        self.set_status(row, False)
+        self.brightness[row] = 0.0
+        self.temperature[row] = 0.0
+        self.security_codes[row] = 0
+        return row
+
+    def allocate_many(self, kind, device_ids):
+        """Return cleared rows for new devices of one kind, as a range when they are contiguous."""
+        if self._free_rows:
+            return [self.allocate(kind, device_id) for device_id in device_ids]
+        count = len(device_ids)
+        while self._next_row + count > self.capacity:
+            self._grow()
+        rows = range(self._next_row, self._next_row + count)
+        self._next_row += count
+        # Rows past _next_row have never been used, so their state is already cleared
+        self.ids[rows.start:rows.stop] = device_ids
+        self.kind[rows.start:rows.stop] = array('B', [kind]) * count
+        return rows
+
+    def release(self, row):
+        """Make a row available to the next allocated device; handles of it become invalid."""
+        self.ids[row] = None
+        self.kind[row] = 0
+        self._free_rows.append(row)
+
+    def _grow(self):
+        added = self.capacity
+        self.ids.extend([None] * added)
+        self.kind.extend(array('B', bytes(added)))
+        self.status_bits.extend(bytes((added + 7) // 8))
+        self.brightness.extend(array('f', bytes(4 * added)))
+        self.temperature.extend(array('f', bytes(4 * added)))
+        self.security_codes.extend(array('B', bytes(added)))
+        self.capacity += added
+
+    def device(self, row):
+        """Return a handle of the device stored in a row."""
+        return KIND_CLASSES[self.kind[row]].view(self, row)
+
+    def devices(self):
+        """Yield a handle of every device in the table."""
+        kind = self.kind
+        for row in range(self._next_row):
+            if kind[row]:
+                yield KIND_CLASSES[kind[row]].view(self, row)
+
+    def get_status(self, row):
+        return bool(self.status_bits[row >> 3] & (1 << (row & 7)))
+
+    def set_status(self, row, status):
+        if status:
+            self.status_bits[row >> 3] |= 1 << (row & 7)
+        else:
+            self.status_bits[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+    def security_status_code(self, security_status):
+        """Return the code of a security status string, adding it to the table if it is new."""
+        code = self._security_status_codes.get(security_status)
+        if code is None:
+            if len(self.security_statuses) == 256:
+                raise ValueError("A CompactDeviceTable holds at most 256 distinct security statuses.")
+            code = len(self.security_statuses)
+            self.security_statuses.append(security_status)
+            self._security_status_codes[security_status] = code
+        return code
+
+    def __len__(self):
+        return self._next_row - len(self._free_rows)
+
+
+# Table used by compact devices created without an explicit table
+default_table = CompactDeviceTable()
+
+
+class _CompactDevice:
+    """Handle of one row of a CompactDeviceTable.
+
+    A handle holds nothing but its table and row, so any number of handles of the
+    same device can be created and dropped; they compare equal. The row stays
+    allocated until ``release`` is called.
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, id, status, table):
+        self.table = table if table is not None else default_table
+        self.row = self.table.allocate(self.KIND, id)
+        self.status = status
+
+    @classmethod
+    def view(cls, table, row):
+        """Return a handle of an allocated row without touching its state."""
+        device = object.__new__(cls)
+        device.table = table
+        device.row = row
+        return device
+
+    @classmethod
+    def store_many(cls, ids, statuses, values, table=None):
+        """Store many devices at once, writing their state to the table column by column.
+
+        Args:
+            ids: Device IDs.
+            statuses: On/off status of each device.
+            values: Brightness, temperature or security status of each device.
+            table: CompactDeviceTable the devices are stored in; defaults to the shared table.
+
+        Returns:
+            The rows of the devices, in the order of ids.
+        """
+        table = table if table is not None else default_table
+        rows = table.allocate_many(cls.KIND, ids)
+        for row, status in zip(rows, statuses):
+            if status:
+                table.set_status(row, True)
+        cls._write_values(table, rows, values)
+        return rows
+
+    @classmethod
+    def create_many(cls, ids, statuses, values, table=None):
+        """Store many devices at once like store_many and return handles of them, in the order of ids."""
+        table = table if table is not None else default_table
+        view = cls.view
+        return [view(table, row) for row in cls.store_many(ids, statuses, values, table)]
+
+    @classmethod
+    def _write_values(cls, table, rows, values):
+        column = getattr(table, cls.VALUE_COLUMN)
+        if isinstance(rows, range):
+            column[rows.start:rows.stop] = array(column.typecode, values)
+        else:
+            for row, value in zip(rows, values):
+                column[row] = value
+
+    def get_id(self):
+        return self.table.ids[self.row]
+
+    @property
+    def status(self):
+        return self.table.get_status(self.row)
+
+    @status.setter
+    def status(self, status):
+        self.table.set_status(self.row, status)
+
+    def release(self):
+        """Free the device's row for reuse.
+
+        This handle moves to a private one-row table holding a copy of the device,
+        so whoever still holds it, e.g. a queued removal event, keeps seeing the
+        removed device. Other handles of the row become invalid.
+        """
+        table, row = self.table, self.row
+        detached = CompactDeviceTable(capacity=1)
+        detached_row = detached.allocate(self.KIND, table.ids[row])
+        detached.set_status(detached_row, table.get_status(row))
+        detached.brightness[detached_row] = table.brightness[row]
+        detached.temperature[detached_row] = table.temperature[row]
+        detached.security_codes[detached_row] = detached.security_status_code(
+            table.security_statuses[table.security_codes[row]])
+        table.release(row)
+        self.table, self.row = detached, detached_row
+
+    def __eq__(self, other):
+        if not isinstance(other, _CompactDevice):
+            return NotImplemented
+        return self.table is other.table and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.table), self.row))
+
+
+class SmartLight(_CompactDevice):
+    """SmartLight whose state is stored in a CompactDeviceTable."""
+    __slots__ = ()
+    KIND = KINDS["SmartLight"]
+    VALUE_COLUMN = 'brightness'
+
+    def __init__(self, id, status=False, brightness=0.0, table=None):
+        super().__init__(id, status, table)
+        self.brightness = brightness
+
+    @property
+    def brightness(self):
+        return self.table.brightness[self.row]
+
+    @brightness.setter
+    def brightness(self, brightness):
+        self.table.brightness[self.row] = brightness
+
+
+class Thermostat(_CompactDevice):
+    """Thermostat whose state is stored in a CompactDeviceTable."""
+    __slots__ = ()
+    KIND = KINDS["Thermostat"]
+    VALUE_COLUMN = 'temperature'
+
+    def __init__(self, id, status=False, temperature=0.0, table=None):
+        super().__init__(id, status, table)
+        self.temperature = temperature
+
+    @property
+    def temperature(self):
+        return self.table.temperature[self.row]
+
+    @temperature.setter
+    def temperature(self, temperature):
+        self.table.temperature[self.row] = temperature
+
+
+class SecurityCamera(_CompactDevice):
+    """SecurityCamera whose state is stored in a CompactDeviceTable."""
+    __slots__ = ()
+    KIND = KINDS["SecurityCamera"]
+    VALUE_COLUMN = 'security_codes'
+
+    # Statuses picked by set_random_security_status
+    RANDOM_SECURITY_STATUSES = ("All Clear", "Motion Detected", "Intrusion Detected")
+
+    def __init__(self, id, status=False, security_status="", table=None):
+        super().__init__(id, status, table)
+        self.security_status = security_status
+
+    @property
+    def security_status(self):
+        return self.table.security_statuses[self.table.security_codes[self.row]]
+
+    @security_status.setter
+    def security_status(self, security_status):
+        self.table.security_codes[self.row] = self.table.security_status_code(security_status)
+
+    @classmethod
+    def _write_values(cls, table, rows, values):
+        codes = [table.security_status_code(value) for value in values]
+        super()._write_values(table, rows, codes)
+
+    def set_random_security_status(self):
+        self.security_status = random.choice(self.RANDOM_SECURITY_STATUSES)
+
+
+# Compact device classes by registry type name, for device_factory.create_device
+COMPACT_DEVICE_CLASSES = {
+    "SmartLight": SmartLight,
+    "Thermostat": Thermostat,
+    "SecurityCamera": SecurityCamera,
+}
+
+# Compact device classes by kind code
+KIND_CLASSES = {device_class.KIND: device_class for device_class in COMPACT_DEVICE_CLASSES.values()}
@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+import multiprocessing
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HASH_SCHEME = 'pbkdf2_sha256'
+
+# PBKDF2 iterations for newly stored passwords; each doubling doubles the cost of a login
+DEFAULT_HASH_ITERATIONS = 100000
+
+SALT_BYTES = 16
+
+# Seconds a verified session stays valid
+DEFAULT_SESSION_TTL = 15 * 60
+
+
+def hash_password(password, iterations=DEFAULT_HASH_ITERATIONS, salt=None):
+    """Hash a password with a per-user random salt.
+
+    Args:
+        password: The plaintext password.
+        iterations: PBKDF2 work factor.
+        salt: Salt bytes; a random salt is generated if omitted.
+
+    Returns:
+        The encoded hash ``pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>``.
+    """
+    if salt is None:
+        salt = secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f'{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}'
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash.
+
+    Passwords stored before hashing was introduced are compared as plaintext, so
+    existing accounts keep working until their hash is upgraded.
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    _, iterations, salt, expected = stored.split('$')
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def is_hashed(stored):
+    """Return True if a stored password is a salted hash rather than legacy plaintext."""
+    return stored.startswith(HASH_SCHEME + '$')
+
+
+def needs_rehash(stored, iterations=DEFAULT_HASH_ITERATIONS):
+    """Return True if a stored password should be re-hashed with the given work factor.
+
+    Hashes stored with more iterations than configured are kept, so lowering the
+    setting never weakens existing passwords.
+    """
+    return not is_hashed(stored) or int(stored.split('$')[1]) < iterations
+
+
+class CredentialVerifier:
+    """Hashes and verifies passwords in a pool of worker processes.
+
+    Key stretching is CPU bound; running it in separate processes keeps it from
+    holding the GIL while the GUI thread is trying to paint. With ``processes=0``
+    the work runs in the calling thread instead.
+    """
+    def __init__(self, processes=None):
+        """Initialize a CredentialVerifier.
+
+        Args:
+            processes: Number of worker processes; defaults to the CPU count.
+        """
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawn rather than fork so workers don't inherit the Qt application state
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def verify(self, password, stored):
+        """Return True if the password matches the stored hash."""
+        if self.processes == 0:
+            return verify_password(password, stored)
+        return self._pool().submit(verify_password, password, stored).result()
+
+    def hash_passwords(self, passwords, iterations=DEFAULT_HASH_ITERATIONS):
+        """Return salted hashes for a list of passwords, computed in parallel."""
+        if self.processes == 0:
+            return [hash_password(password, iterations) for password in passwords]
+        return list(self._pool().map(hash_password, passwords, [iterations] * len(passwords), chunksize=16))
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class SessionCache:
+    """Short-lived tokens for users whose password has already been verified.
+
+    Holding a valid token lets the application reopen the dashboard without
+    hashing the password again.
+    """
+    def __init__(self, ttl=DEFAULT_SESSION_TTL):
+        """Initialize an empty SessionCache.
+
+        Args:
+            ttl: Seconds a token stays valid after it is created.
+        """
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, username):
+        """Create a session for a verified user and return its token."""
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (username, time.monotonic() + self.ttl)
+        return token
+
+    def validate(self, token):
+        """Return the username of a valid session token, or None if it is unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session[1] < time.monotonic():
+                del self._sessions[token]
+                return None
+            return session[0]
+
+    def revoke(self, token):
+        """Invalidate a session token."""
+        with self._lock:
+            self._sessions.pop(token, None)
@@ -1,37 +1,192 @@
+import queue
+import secrets
 import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+import metrics
+from credentials import CredentialVerifier, DEFAULT_HASH_ITERATIONS, needs_rehash
+
+DEFAULT_DB_PATH = 'smart_home.db'
+
+# Number of users inserted per transaction by register_users_bulk
+BULK_CHUNK_SIZE = 500
+
+# Bound parameters per statement allowed by SQLite before 3.32, used when the limit can't be queried
+SQLITE_DEFAULT_VARIABLE_LIMIT = 999
+
+
+def variable_limit(conn):
+    """Return the maximum number of bound parameters in one statement on a connection."""
+    if hasattr(conn, 'getlimit'):
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    return SQLITE_DEFAULT_VARIABLE_LIMIT
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections that can be shared between threads."""
+    def __init__(self, db_path, size=4):
+        """Open the pooled connections.
+
+        Args:
+            db_path: Path of the SQLite database file.
+            size: Number of connections in the pool.
+        """
+        self.size = size
+        self._connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            # WAL lets readers run concurrently with a writer
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block."""
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        """Close every connection currently in the pool."""
+        while True:
+            try:
+                conn = self._connections.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
 
 class DatabaseManager:
-    def __init__(self):
-        self.conn = sqlite3.connect('smart_home.db')
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_path=DEFAULT_DB_PATH, pool_size=4, hash_iterations=DEFAULT_HASH_ITERATIONS,
+                 verifier=None):
+        self.pool = ConnectionPool(db_path, pool_size)
+        self.hash_iterations = hash_iterations
+        self.verifier = verifier or CredentialVerifier()
+        # Unknown usernames are checked against this hash so they take as long to reject as wrong passwords
+        self._dummy_hash = None
+        self._dummy_hash_lock = threading.Lock()
         self.create_user_table()
 
+    def dummy_hash(self):
+        """Return the hash unknown usernames are verified against, computing it in the verifier on first use."""
+        with self._dummy_hash_lock:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.verifier.hash_passwords([secrets.token_urlsafe(16)], self.hash_iterations)[0]
+            return self._dummy_hash
+
     def create_user_table(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT
-            )
-        ''')
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE,
+                    password TEXT
+                )
+            ''')
+            conn.commit()
 
     def register_user(self, username, password):
-        try:
-            self.cursor.execute('''
-                INSERT INTO users (username, password) VALUES (?, ?)
-            ''', (username, password))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        with self.pool.connection() as conn:
+            try:
+                with conn:
+                    conn.execute('''
+                        INSERT INTO users (username, password) VALUES (?, ?)
+                    ''', (username, self.verifier.hash_passwords([password], self.hash_iterations)[0]))
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def register_users_bulk(self, users, chunk_size=BULK_CHUNK_SIZE):
+        """Register many users, committing one transaction per chunk.
+
+        Usernames that already exist, or that appear more than once in the input,
+        are skipped and reported instead of aborting the import. They are filtered
+        out before hashing, so no time is spent hashing their passwords.
 
+        Args:
+            users: Iterable of (username, password) pairs; consumed lazily.
+            chunk_size: Number of users inserted per transaction; capped at SQLite's
+                limit of bound parameters per statement.
+
+        Returns:
+            A (registered_count, duplicate_usernames) tuple.
+        """
+        registered_count = 0
+        duplicates = []
+        users = iter(users)
+        with self.pool.connection() as conn:
+            # Every username of a chunk is bound as one parameter of the duplicate check
+            chunk_size = max(1, min(chunk_size, variable_limit(conn)))
+            while True:
+                chunk = list(islice(users, chunk_size))
+                if not chunk:
+                    break
+                existing = self._existing_usernames(conn, [username for username, _ in chunk])
+                candidates = []
+                for username, password in chunk:
+                    if username in existing:
+                        duplicates.append(username)
+                    else:
+                        existing.add(username)
+                        candidates.append((username, password))
+                if not candidates:
+                    continue
+                # Hash before taking the write lock so other writers aren't held up
+                hashes = self.verifier.hash_passwords([password for _, password in candidates],
+                                                      self.hash_iterations)
+                with conn:
+                    # Take the write lock, then catch users another writer registered while we hashed
+                    conn.execute('BEGIN IMMEDIATE')
+                    taken = self._existing_usernames(conn, [username for username, _ in candidates])
+                    new_users = []
+                    for (username, _), stored in zip(candidates, hashes):
+                        if username in taken:
+                            duplicates.append(username)
+                        else:
+                            new_users.append((username, stored))
+                    conn.executemany('''
+                        INSERT INTO users (username, password) VALUES (?, ?)
+                    ''', new_users)
+                registered_count += len(new_users)
+        return registered_count, duplicates
+
+    @staticmethod
+    def _existing_usernames(conn, usernames):
+        placeholders = ', '.join('?' * len(usernames))
+        return {row[0] for row in conn.execute(
+            f'SELECT username FROM users WHERE username IN ({placeholders})', usernames)}
+
+    @metrics.timed("homemate_authenticate_seconds", "Duration of a login check, including password hashing.")
     def authenticate(self, username, password):
-        self.cursor.execute('''
-            SELECT * FROM users WHERE username = ? AND password = ?
-        ''', (username, password))
-        user = self.cursor.fetchone()
-        return user is not None
+        # Taken before the lookup, so the first login pays for it whether or not the user exists
+        dummy_hash = self.dummy_hash()
+        with self.pool.connection() as conn:
+            user = conn.execute('''
+                SELECT id, password FROM users WHERE username = ?
+            ''', (username,)).fetchone()
+        verified = self.verifier.verify(password, user[1] if user is not None else dummy_hash)
+        if user is None or not verified:
+            metrics.increment("homemate_authentication_failures_total", help="Rejected logins.")
+            return False
+        if needs_rehash(user[1], self.hash_iterations):
+            # Upgrade plaintext passwords and outdated work factors on successful login
+            with self.pool.connection() as conn:
+                with conn:
+                    conn.execute('''
+                        UPDATE users SET password = ? WHERE id = ?
+                    ''', (self.verifier.hash_passwords([password], self.hash_iterations)[0], user[0]))
+        return True
+
+    def close(self):
+        self.pool.close()
+        self.verifier.shutdown()
 
     def __del__(self):
-        self.conn.close()
+        # __init__ may have failed before the pool was opened
+        if getattr(self, 'pool', None) is not None:
+            self.close()
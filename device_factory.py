@@ -0,0 +1,80 @@
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+from smart_home.security_camera import SecurityCamera
+
+# Security status of a camera that has not reported one yet
+DEFAULT_SECURITY_STATUS = "Click 'Show Security Status' to get the status"
+
+# State attribute passed to the constructor of each device type, and its default
+STATE_ATTRIBUTES = {
+    "SmartLight": ("brightness", 0.0),
+    "Thermostat": ("temperature", 0.0),
+    "SecurityCamera": ("security_status", DEFAULT_SECURITY_STATUS),
+}
+
+# Device classes by the type name used as the first part of a registry key
+DEVICE_CLASSES = {
+    "SmartLight": SmartLight,
+    "Thermostat": Thermostat,
+    "SecurityCamera": SecurityCamera,
+}
+
+
+def create_device(device_type, device_id, status=False, brightness=None, temperature=None, security_status=None,
+                  device_classes=DEVICE_CLASSES):
+    """Construct a device from its registry type name and stored state.
+
+    Args:
+        device_type: The class name of the device.
+        device_id: The ID of the device.
+        status: Whether the device is switched on.
+        brightness: Brightness of a SmartLight.
+        temperature: Temperature of a Thermostat.
+        security_status: Last security status of a SecurityCamera.
+        device_classes: Mapping of type name to device class, e.g.
+            ``compact_devices.COMPACT_DEVICE_CLASSES`` for array-backed devices.
+
+    Raises:
+        ValueError: If the device type is unknown.
+    """
+    if device_type not in device_classes:
+        raise ValueError(f"Unknown device type '{device_type}'.")
+    device_class = device_classes[device_type]
+    if device_type == "SmartLight":
+        return device_class(id=device_id, status=status, brightness=brightness if brightness is not None else 0.0)
+    if device_type == "Thermostat":
+        return device_class(id=device_id, status=status, temperature=temperature if temperature is not None else 0.0)
+    if security_status is None:
+        security_status = DEFAULT_SECURITY_STATUS
+    return device_class(id=device_id, status=status, security_status=security_status)
+
+
+def create_devices(device_type, device_ids, statuses, values, device_classes=DEVICE_CLASSES):
+    """Construct many devices of one type from columns of stored state.
+
+    Classes with a ``create_many`` classmethod, like the compact devices, build
+    the whole batch at once; others are constructed one by one.
+
+    Args:
+        device_type: The class name of the devices.
+        device_ids: The IDs of the devices.
+        statuses: Whether each device is switched on.
+        values: Brightness, temperature or security status of each device, by type; None for the default.
+        device_classes: Mapping of type name to device class.
+
+    Returns:
+        The list of devices, in the order of device_ids.
+
+    Raises:
+        ValueError: If the device type is unknown.
+    """
+    if device_type not in device_classes:
+        raise ValueError(f"Unknown device type '{device_type}'.")
+    attribute, default = STATE_ATTRIBUTES[device_type]
+    values = [default if value is None else value for value in values]
+    create_many = getattr(device_classes[device_type], "create_many", None)
+    if create_many is not None:
+        return create_many(device_ids, statuses, values)
+    device_class = device_classes[device_type]
+    return [device_class(id=device_id, status=status, **{attribute: value})
+            for device_id, status, value in zip(device_ids, statuses, values)]
@@ -0,0 +1,234 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+
+from device_registry import RegistryListener, device_key
+from device_search import INDEXED_ATTRIBUTES
+
+# Item data role holding the device class name; Qt.UserRole holds the device ID
+DEVICE_TYPE_ROLE = Qt.UserRole + 1
+
+
+class FilteredDeviceRows(RegistryListener):
+    """Rows of the registered devices shared by the device item models.
+
+    Mixed into a Qt item model, it keeps the registry keys shown as rows in
+    registration order and narrowed down by a case-insensitive filter. Added
+    devices are appended, and removed devices are collected and their rows removed
+    together once control returns to the event loop, one signal per run of
+    adjacent rows. Models customize row insertion and removal through
+    ``_append`` and ``_remove_rows``.
+    """
+    def _init_rows(self, search_index):
+        self.search_index = search_index
+        self._keys = []
+        self._rows = {}
+        self._filter = ""
+        # Ordered like a list, with O(1) removal
+        self._all_keys = {}
+        self._removed_keys = set()
+
+    def reset(self, devices):
+        """Replace the contents of the model with the given devices."""
+        self.beginResetModel()
+        self._all_keys = dict.fromkeys(device_key(device) for device in devices)
+        self._apply_filter()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Only show devices matching the given text."""
+        self.beginResetModel()
+        self._filter = text.lower()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _apply_filter(self):
+        if self._filter and self.search_index is not None:
+            matches = self.search_index.search(self._filter)
+            self._keys = list(filter(matches.__contains__, self._all_keys))
+        elif self._filter:
+            self._keys = [key for key in self._all_keys if self._filter in device_label(key).lower()]
+        else:
+            self._keys = list(self._all_keys)
+        self._rows = dict(zip(self._keys, range(len(self._keys))))
+        self._removed_keys.clear()
+        self._rows_reset()
+
+    def _rows_reset(self):
+        """Called after the rows were rebuilt by a reset or a new filter."""
+
+    def _matches_filter(self, device, key):
+        if self.search_index is not None:
+            return self.search_index.matches(device, self._filter)
+        return self._filter in device_label(key).lower()
+
+    def device_added(self, device):
+        """Append the row of the new device if it matches the filter."""
+        key = device_key(device)
+        if key in self._removed_keys:
+            # A device re-added under the same key must not be taken for the removed one
+            self.remove_pending_rows()
+        self._all_keys[key] = None
+        if self._filter and not self._matches_filter(device, key):
+            return
+        self._append(key)
+
+    def _append(self, key):
+        row = len(self._keys)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.append(key)
+        self._rows[key] = row
+        self.endInsertRows()
+
+    def device_removed(self, device):
+        """Queue the row of the removed device for removal."""
+        key = device_key(device)
+        self._all_keys.pop(key, None)
+        self._queue_removal(key)
+
+    def _queue_removal(self, key):
+        if key not in self._rows:
+            return
+        if not self._removed_keys:
+            QTimer.singleShot(0, self.remove_pending_rows)
+        self._removed_keys.add(key)
+
+    def remove_pending_rows(self):
+        """Remove the rows queued for removal, one signal per run of adjacent rows."""
+        if not self._removed_keys:
+            return
+        removed_rows = sorted(self._rows[key] for key in self._removed_keys)
+        self._removed_keys.clear()
+        for first, last in descending_runs(removed_rows):
+            self._remove_rows(first, last)
+        self._rows = dict(zip(self._keys, range(len(self._keys))))
+        self._rows_removed(removed_rows)
+
+    def _remove_rows(self, first, last):
+        self.beginRemoveRows(QModelIndex(), first, last)
+        del self._keys[first:last + 1]
+        self.endRemoveRows()
+
+    def _rows_removed(self, removed_rows):
+        """Called after queued rows were removed, with their sorted former row numbers."""
+
+
+class DeviceListModel(QAbstractListModel, FilteredDeviceRows):
+    """List model of the devices registered in the automation system.
+
+    The model is kept up to date by the registry's add/remove notifications, so
+    only the affected row is inserted or removed. Removed devices are collected
+    and their rows removed together once control returns to the event loop. Rows
+    are handed to the view in batches through ``canFetchMore``/``fetchMore`` and
+    can be narrowed down with a case-insensitive filter, which devices enter or
+    leave as their room or tags change.
+    """
+    FETCH_BATCH_SIZE = 256
+
+    def __init__(self, parent=None, search_index=None):
+        """Initialize an empty DeviceListModel.
+
+        Args:
+            parent: The parent QObject.
+            search_index: Optional DeviceSearchIndex used to apply the filter; without
+                one the filter is a substring match on the device label.
+        """
+        super().__init__(parent)
+        self._init_rows(search_index)
+        self._fetched = 0
+
+    def _rows_reset(self):
+        self._fetched = min(len(self._keys), self.FETCH_BATCH_SIZE)
+
+    def _append(self, key):
+        # A row is only inserted if the view has fetched up to it
+        row = len(self._keys)
+        if self._fetched < row:
+            self._rows[key] = row
+            self._keys.append(key)
+            return
+        # The key is appended inside the insert so views can't fetch it before it is announced
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows[key] = row
+        self._keys.append(key)
+        self._fetched += 1
+        self.endInsertRows()
+
+    def device_changed(self, device, attributes):
+        """Add or remove the row of a device whose room or tags moved it into or out of the filter."""
+        if not self._filter or self.search_index is None:
+            return
+        if attributes and INDEXED_ATTRIBUTES.isdisjoint(attributes):
+            return
+        key = device_key(device)
+        if key not in self._all_keys:
+            return
+        shown = key in self._rows and key not in self._removed_keys
+        if self._matches_filter(device, key) == shown:
+            return
+        if shown:
+            self._queue_removal(key)
+        elif key in self._removed_keys:
+            self._removed_keys.discard(key)
+        else:
+            self._append(key)
+
+    def _remove_rows(self, first, last):
+        # Only rows the view has fetched are announced
+        if first < self._fetched:
+            fetched_last = min(last, self._fetched - 1)
+            self.beginRemoveRows(QModelIndex(), first, fetched_last)
+            del self._keys[first:last + 1]
+            self._fetched -= fetched_last - first + 1
+            self.endRemoveRows()
+        else:
+            del self._keys[first:last + 1]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def canFetchMore(self, parent):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self._keys)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH_SIZE, len(self._keys) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._fetched:
+            return None
+        key = self._keys[index.row()]
+        if role == Qt.DisplayRole:
+            return device_label(key)
+        if role == Qt.UserRole:
+            return key[1]
+        if role == DEVICE_TYPE_ROLE:
+            return key[0]
+        return None
+
+
+def descending_runs(rows):
+    """Yield (first, last) runs of consecutive numbers in a sorted list of rows, the last run first.
+
+    Removing the runs in this order leaves the numbers of the rows before each run unchanged.
+    """
+    end = len(rows)
+    while end:
+        start = end - 1
+        while start and rows[start - 1] == rows[start] - 1:
+            start -= 1
+        yield rows[start], rows[end - 1]
+        end = start
+
+
+def device_label(key):
+    """Return the ``SmartLight#<id>``-style label of a registry key."""
+    return f"{key[0]}#{key[1]}"
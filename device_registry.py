@@ -0,0 +1,399 @@
+from itertools import islice
+
+
+class DeviceRegistry:
+    """Indexed store of smart home devices.
+
+    Devices are keyed by ``(device_type, device_id)`` where ``device_type`` is the
+    class name of the device (``SmartLight``, ``Thermostat``, ``SecurityCamera``).
+    Secondary indexes by type, on/off status, room and tag keep lookups and group
+    listings independent of the size of the fleet.
+    """
+    def __init__(self):
+        """Initialize an empty DeviceRegistry."""
+        self._devices = {}
+        self._by_type = {}
+        self._by_status = {True: {}, False: {}}
+        self._versions = {}
+        self._tags = {}
+        self._rooms = {}
+        self._tag_members = {}
+        self._room_members = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Register a RegistryListener to be notified when devices are added or removed."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop notifying a previously registered RegistryListener."""
+        self._listeners.remove(listener)
+
+    def add(self, device):
+        """Add a device to the registry.
+
+        Args:
+            device: The device to add.
+
+        Returns:
+            The ``(device_type, device_id)`` key of the added device.
+
+        Raises:
+            ValueError: If a device with the same type and ID is already registered.
+        """
+        key = device_key(device)
+        if key in self._devices:
+            raise ValueError(f"Device '{key[0]}#{key[1]}' is already registered.")
+        self._devices[key] = device
+        self._by_type.setdefault(key[0], {})[key[1]] = device
+        self._by_status[bool(device.status)][key] = device
+        self._versions[key] = 0
+        for listener in self._listeners:
+            listener.device_added(device)
+        return key
+
+    def add_many(self, devices):
+        """Add many devices at once, e.g. when restoring a saved home.
+
+        Either every device is added or, if any key is a duplicate, none is.
+        Listeners are notified once all devices are registered.
+
+        Args:
+            devices: Iterable of devices to add.
+
+        Returns:
+            The number of devices added.
+
+        Raises:
+            ValueError: If a device is already registered or appears twice.
+        """
+        devices = list(devices)
+        keys = list(map(device_key, devices))
+        if len(set(keys)) != len(keys) or not self._devices.keys().isdisjoint(keys):
+            duplicate = next(key for i, key in enumerate(keys) if key in self._devices or key in keys[:i])
+            raise ValueError(f"Device '{duplicate[0]}#{duplicate[1]}' is already registered.")
+        self._devices.update(zip(keys, devices))
+        self._versions.update(dict.fromkeys(keys, 0))
+        by_type = self._by_type
+        on, off = self._by_status[True], self._by_status[False]
+        for key, device in zip(keys, devices):
+            same_type = by_type.get(key[0])
+            if same_type is None:
+                same_type = by_type[key[0]] = {}
+            same_type[key[1]] = device
+            if device.status:
+                on[key] = device
+            else:
+                off[key] = device
+        for listener in self._listeners:
+            for device in devices:
+                listener.device_added(device)
+        return len(devices)
+
+    def remove(self, device_type, device_id):
+        """Remove a device from the registry.
+
+        Args:
+            device_type: The class name of the device.
+            device_id: The ID of the device.
+
+        Returns:
+            The removed device, or None if no such device was registered.
+        """
+        key = (device_type, device_id)
+        device = self._devices.pop(key, None)
+        if device is None:
+            return None
+        same_type = self._by_type[device_type]
+        del same_type[device_id]
+        if not same_type:
+            del self._by_type[device_type]
+        self._by_status[True].pop(key, None)
+        self._by_status[False].pop(key, None)
+        del self._versions[key]
+        for tag in self._tags.pop(key, ()):
+            self._discard_member(self._tag_members, tag, key)
+        room = self._rooms.pop(key, None)
+        if room is not None:
+            self._discard_member(self._room_members, room, key)
+        for listener in self._listeners:
+            listener.device_removed(device)
+        return device
+
+    def get(self, device_type, device_id):
+        """Return the device registered under the given type and ID, or None."""
+        return self._devices.get((device_type, device_id))
+
+    def contains(self, device_type, device_id):
+        """Return True if a device with the given type and ID is registered."""
+        return (device_type, device_id) in self._devices
+
+    def types(self):
+        """Return the device types that currently have registered devices."""
+        return list(self._by_type)
+
+    def devices_of_type(self, device_type):
+        """Return all devices of the given type."""
+        return list(self._by_type.get(device_type, {}).values())
+
+    def page(self, offset, limit, device_type=None):
+        """Return a slice of the devices, in registration order, without copying the rest.
+
+        Args:
+            offset: Number of devices to skip.
+            limit: Maximum number of devices to return.
+            device_type: Optional class name to restrict the devices to.
+
+        Returns:
+            A tuple of the devices and the total number of matching devices.
+        """
+        devices = self._devices if device_type is None else self._by_type.get(device_type, {})
+        return list(islice(devices.values(), offset, offset + limit)), len(devices)
+
+    def devices_with_status(self, status):
+        """Return all devices that are switched on (True) or off (False)."""
+        return list(self._by_status[bool(status)].values())
+
+    def set_status(self, device, status):
+        """Switch a registered device on or off and keep the status index current.
+
+        Args:
+            device: A registered device.
+            status: The new on/off status.
+        """
+        device.status = status
+        self.mark_changed(device, "status")
+
+    def update(self, device, **attributes):
+        """Set attributes of a registered device and record the change.
+
+        Args:
+            device: A registered device.
+            **attributes: New attribute values, e.g. ``brightness=40``.
+        """
+        for name, value in attributes.items():
+            setattr(device, name, value)
+        self.mark_changed(device, *attributes)
+
+    def update_many(self, devices, **attributes):
+        """Set the same attributes on many registered devices in one pass and record the change.
+
+        Versions and the status index are updated for the whole batch,
+        then listeners get a single ``devices_changed`` notification.
+
+        Args:
+            devices: Registered devices; unregistered ones are skipped.
+            **attributes: New attribute values, e.g. ``brightness=40``.
+
+        Returns:
+            The list of updated devices.
+        """
+        registered = self._devices
+        keys = []
+        updated = []
+        for device in devices:
+            key = device_key(device)
+            if key in registered:
+                keys.append(key)
+                updated.append(device)
+        if not updated:
+            return updated
+        for name, value in attributes.items():
+            for device in updated:
+                setattr(device, name, value)
+        versions = self._versions
+        for key in keys:
+            versions[key] += 1
+        if "status" in attributes:
+            status = bool(attributes["status"])
+            on_status, other_status = self._by_status[status], self._by_status[not status]
+            for key, device in zip(keys, updated):
+                other_status.pop(key, None)
+                on_status[key] = device
+        attribute_names = tuple(attributes)
+        for listener in self._listeners:
+            listener.devices_changed(updated, attribute_names)
+        return updated
+
+    def set_tags(self, device, tags):
+        """Assign user-defined tags to a registered device, replacing its previous tags.
+
+        Args:
+            device: A registered device.
+            tags: Iterable of tag strings; an empty iterable clears the tags.
+        """
+        key = device_key(device)
+        if key not in self._devices:
+            return
+        self._assign_tags(key, device, tags)
+        self.mark_changed(device, "tags")
+
+    def set_tag_sets(self, devices, tag_sets):
+        """Assign tags to many registered devices, notifying listeners once, e.g. when restoring a saved home.
+
+        Args:
+            devices: Registered devices; unregistered ones are skipped.
+            tag_sets: Iterable of tags for each device, in the order of devices.
+        """
+        changed = []
+        for device, tags in zip(devices, tag_sets):
+            key = device_key(device)
+            if key in self._devices:
+                self._assign_tags(key, device, tags)
+                changed.append((key, device))
+        self._changed_many(changed, ("tags",))
+
+    def _assign_tags(self, key, device, tags):
+        tags = frozenset(tags)
+        for tag in self._tags.pop(key, frozenset()) - tags:
+            self._discard_member(self._tag_members, tag, key)
+        if tags:
+            self._tags[key] = tags
+            for tag in tags:
+                self._tag_members.setdefault(tag, {})[key] = device
+
+    def tags(self, device):
+        """Return the tags of a device as a frozenset."""
+        return self._tags.get(device_key(device), frozenset())
+
+    def set_room(self, device, room):
+        """Assign a registered device to a room.
+
+        Args:
+            device: A registered device.
+            room: Name of the room, or None to unassign the device.
+        """
+        key = device_key(device)
+        if key not in self._devices:
+            return
+        self._assign_room(key, device, room)
+        self.mark_changed(device, "room")
+
+    def set_rooms(self, devices, rooms):
+        """Assign many registered devices to rooms, notifying listeners once, e.g. when restoring a saved home.
+
+        Args:
+            devices: Registered devices; unregistered ones are skipped.
+            rooms: Name of the room of each device, or None, in the order of devices.
+        """
+        changed = []
+        for device, room in zip(devices, rooms):
+            key = device_key(device)
+            if key in self._devices:
+                self._assign_room(key, device, room)
+                changed.append((key, device))
+        self._changed_many(changed, ("room",))
+
+    def _assign_room(self, key, device, room):
+        previous = self._rooms.pop(key, None)
+        if previous is not None:
+            self._discard_member(self._room_members, previous, key)
+        if room:
+            self._rooms[key] = room
+            self._room_members.setdefault(room, {})[key] = device
+
+    def _changed_many(self, changed, attributes):
+        """Bump the versions of (key, device) pairs whose attributes changed and notify listeners once."""
+        if not changed:
+            return
+        versions = self._versions
+        for key, _ in changed:
+            versions[key] += 1
+        devices = [device for _, device in changed]
+        for listener in self._listeners:
+            listener.devices_changed(devices, attributes)
+
+    def room(self, device):
+        """Return the room of a device, or None if it is not assigned to one."""
+        return self._rooms.get(device_key(device))
+
+    def rooms(self):
+        """Return the names of the rooms that have devices assigned, sorted."""
+        return sorted(self._room_members)
+
+    def devices_in_room(self, room):
+        """Return all devices assigned to a room."""
+        return list(self._room_members.get(room, {}).values())
+
+    def devices_with_tag(self, tag):
+        """Return all devices carrying a tag."""
+        return list(self._tag_members.get(tag, {}).values())
+
+    def _discard_member(self, index, name, key):
+        members = index[name]
+        del members[key]
+        if not members:
+            del index[name]
+
+    def mark_changed(self, device, *attributes):
+        """Record that the state of a registered device has changed.
+
+        Bumps the device's version counter, keeps the status index current and
+        notifies listeners.
+
+        Args:
+            device: A registered device.
+            *attributes: Names of the attributes that changed, if known.
+        """
+        key = device_key(device)
+        if key not in self._devices:
+            return
+        self._versions[key] += 1
+        if key not in self._by_status[bool(device.status)]:
+            self._by_status[not device.status].pop(key, None)
+            self._by_status[bool(device.status)][key] = device
+        for listener in self._listeners:
+            listener.device_changed(device, attributes)
+
+    def version(self, device):
+        """Return the version counter of a registered device, or None if it is not registered.
+
+        The counter starts at 0 and is bumped on every ``mark_changed`` call.
+        """
+        return self._versions.get(device_key(device))
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __contains__(self, device):
+        return device_key(device) in self._devices
+
+
+class RegistryListener:
+    """Base class for objects that observe a DeviceRegistry.
+
+    Subclasses override the notifications they are interested in.
+    """
+    def device_added(self, device):
+        """Called after a device has been added to the registry."""
+
+    def device_removed(self, device):
+        """Called after a device has been removed from the registry."""
+
+    def device_changed(self, device, attributes):
+        """Called after the state of a registered device has changed.
+
+        Args:
+            device: The changed device.
+            attributes: Names of the attributes that changed; empty if unknown.
+        """
+
+    def devices_changed(self, devices, attributes):
+        """Called after the same attributes of many registered devices changed in one bulk update.
+
+        Calls ``device_changed`` for every device unless overridden.
+
+        Args:
+            devices: The changed devices.
+            attributes: Names of the attributes that changed.
+        """
+        for device in devices:
+            self.device_changed(device, attributes)
+
+
+def device_key(device):
+    """Return the ``(device_type, device_id)`` registry key of a device."""
+    return type(device).__name__, device.get_id()
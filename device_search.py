@@ -0,0 +1,145 @@
+import re
+
+from device_registry import RegistryListener, device_key
+
+# Device attributes whose changes alter the indexed tokens of a device
+INDEXED_ATTRIBUTES = frozenset(("tags", "room"))
+
+# Characters separating the terms of a query; '#' splits "SmartLight#12"-style labels
+TERM_SEPARATORS = re.compile(r"[\s#]+")
+
+# Terms shorter than a trigram are matched as token prefixes
+MAX_PREFIX_LENGTH = 2
+
+
+def trigrams(token):
+    """Return the set of three-character substrings of a token."""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def query_terms(query):
+    """Split a search query into lower-case terms."""
+    return [term for term in TERM_SEPARATORS.split(query.lower()) if term]
+
+
+def term_matches(term, tokens):
+    """Return True if a term matches any of the tokens of a device."""
+    if len(term) <= MAX_PREFIX_LENGTH:
+        return any(token.startswith(term) for token in tokens)
+    return any(term in token for token in tokens)
+
+
+class DeviceSearchIndex(RegistryListener):
+    """Incremental search index over device IDs, types, rooms and tags.
+
+    Each device is described by a few lower-case tokens: its ID, its type, its
+    room and its tags. Devices are indexed by token, and the distinct tokens are
+    indexed by trigram and by their first characters. A query is split into terms
+    that must all match. A term of three or more characters matches any token
+    containing it, found by intersecting the token sets of its trigrams. A shorter
+    term matches the tokens starting with it. Since types, rooms and tags are
+    shared by many devices, a broad term like "light" resolves to a handful of
+    tokens and one posting set instead of a scan over devices. Adding or removing a
+    device, or changing its room or tags, only updates the entries of that device.
+    """
+    def __init__(self, registry):
+        """Initialize a DeviceSearchIndex, index the registered devices and start listening.
+
+        Args:
+            registry: The DeviceRegistry whose devices are indexed.
+        """
+        self.registry = registry
+        self._tokens = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._prefixes = {}
+        for device in registry:
+            self._index(device)
+        registry.add_listener(self)
+
+    def device_tokens(self, device):
+        """Return the lower-case tokens a device is found by."""
+        device_type, device_id = device_key(device)
+        tokens = [str(device_id).lower(), device_type.lower()]
+        room = self.registry.room(device)
+        if room:
+            tokens.append(str(room).lower())
+        tokens.extend(str(tag).lower() for tag in self.registry.tags(device))
+        return tuple(dict.fromkeys(tokens))
+
+    def _index(self, device):
+        key = device_key(device)
+        tokens = self.device_tokens(device)
+        self._tokens[key] = tokens
+        for token in tokens:
+            keys = self._postings.get(token)
+            if keys is None:
+                keys = self._postings[token] = set()
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+                for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                    self._prefixes.setdefault(token[:length], set()).add(token)
+            keys.add(key)
+
+    def _unindex(self, key):
+        for token in self._tokens.pop(key, ()):
+            keys = self._postings[token]
+            keys.discard(key)
+            if keys:
+                continue
+            del self._postings[token]
+            for trigram in trigrams(token):
+                self._discard(self._trigrams, trigram, token)
+            for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                self._discard(self._prefixes, token[:length], token)
+
+    def _discard(self, index, entry, token):
+        tokens = index[entry]
+        tokens.discard(token)
+        if not tokens:
+            del index[entry]
+
+    def device_added(self, device):
+        self._index(device)
+
+    def device_removed(self, device):
+        self._unindex(device_key(device))
+
+    def device_changed(self, device, attributes):
+        if not attributes or INDEXED_ATTRIBUTES.intersection(attributes):
+            self._unindex(device_key(device))
+            self._index(device)
+
+    def matching_tokens(self, term):
+        """Return the indexed tokens a single lower-case term matches."""
+        if len(term) <= MAX_PREFIX_LENGTH:
+            return self._prefixes.get(term, set())
+        candidates = sorted((self._trigrams.get(trigram, set()) for trigram in trigrams(term)), key=len)
+        tokens = candidates[0].intersection(*candidates[1:])
+        # Sharing every trigram doesn't guarantee the term occurs as a substring
+        return {token for token in tokens if term in token}
+
+    def _term_keys(self, term):
+        postings = [self._postings[token] for token in self.matching_tokens(term)]
+        if len(postings) == 1:
+            return postings[0]
+        return set().union(*postings)
+
+    def search(self, query):
+        """Return the set of (device_type, device_id) keys of the devices matching every term of a query.
+
+        An empty query matches every device.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return set(self._tokens)
+        key_sets = sorted((self._term_keys(term) for term in dict.fromkeys(terms)), key=len)
+        return key_sets[0].intersection(*key_sets[1:])
+
+    def matches(self, device, query):
+        """Return True if a device matches every term of a query, without consulting the index."""
+        tokens = self.device_tokens(device)
+        return all(term_matches(term, tokens) for term in query_terms(query))
+
+    def __len__(self):
+        return len(self._tokens)
@@ -0,0 +1,162 @@
+import logging
+import threading
+
+from database import ConnectionPool, DEFAULT_DB_PATH
+from device_registry import RegistryListener, device_key
+
+# Seconds between write-behind flushes
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceStore(RegistryListener):
+    """Persists the device registry in the ``devices`` table of the smart home database.
+
+    The store listens to the registry and queues every added, changed or removed
+    device. Repeated changes to the same device are coalesced, and a background
+    thread writes the queue in one transaction per flush interval, so the cost of
+    a state change on the caller's thread is a dictionary update. A failed flush
+    puts its changes back in the queue, and the thread retries them on the next
+    interval.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Open the device tables and start the write-behind thread.
+
+        Args:
+            db_path: Path of the SQLite database file.
+            flush_interval: Seconds between flushes of queued changes.
+        """
+        self.pool = ConnectionPool(db_path, size=1)
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.create_device_table()
+        self._thread = threading.Thread(target=self._run, name="device-store", daemon=True)
+        self._thread.start()
+
+    def create_device_table(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS devices (
+                    device_type TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    status INTEGER NOT NULL DEFAULT 0,
+                    brightness REAL,
+                    temperature REAL,
+                    security_status TEXT,
+                    PRIMARY KEY (device_type, device_id)
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+
+    def load_all(self):
+        """Return the state of every stored device with a single query.
+
+        Returns:
+            A list of (device_type, device_id, status, brightness, temperature, security_status) rows.
+        """
+        with self.pool.connection() as conn:
+            return conn.execute('''
+                SELECT device_type, device_id, status, brightness, temperature, security_status FROM devices
+            ''').fetchall()
+
+    def load_into(self, automation_system, factory=None):
+        """Recreate every stored device and add them to the automation system in one bulk add.
+
+        Call this before registering the store as a listener or attaching an
+        EventPublisher, otherwise every loaded device would be queued to be written
+        back. Rows of device types the factory doesn't know are skipped and logged.
+
+        Args:
+            automation_system: The automation system to populate.
+            factory: Callable building a device from a stored row; defaults to
+                ``device_factory.create_device``.
+
+        Returns:
+            The number of devices loaded.
+        """
+        if factory is None:
+            from device_factory import create_device as factory
+        devices = []
+        for device_type, device_id, status, brightness, temperature, security_status in self.load_all():
+            try:
+                device = factory(device_type, device_id, bool(status), brightness, temperature, security_status)
+            except ValueError:
+                logger.warning("Skipping stored device %s of unknown type %r", device_id, device_type)
+                continue
+            devices.append(device)
+        automation_system.add_devices(devices)
+        return len(devices)
+
+    def device_added(self, device):
+        self._queue(device_key(device), device)
+
+    def device_changed(self, device, attributes):
+        self._queue(device_key(device), device)
+
+    def device_removed(self, device):
+        self._queue(device_key(device), None)
+
+    def _queue(self, key, device):
+        with self._lock:
+            self._pending[key] = device
+
+    def flush(self):
+        """Write all queued changes in one transaction.
+
+        If the write fails the changes are queued again, behind any made since,
+        and the error is raised.
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        if not pending:
+            return
+        try:
+            upserts = []
+            deletes = []
+            for key, device in pending.items():
+                if device is None:
+                    deletes.append(key)
+                else:
+                    upserts.append(key + device_state(device))
+            with self.pool.connection() as conn:
+                with conn:
+                    conn.executemany('''
+                        DELETE FROM devices WHERE device_type = ? AND device_id = ?
+                    ''', deletes)
+                    conn.executemany('''
+                        INSERT OR REPLACE INTO devices
+                            (device_type, device_id, status, brightness, temperature, security_status)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', upserts)
+        except BaseException:
+            with self._lock:
+                # Changes queued since the flush started are newer and take precedence
+                for key, device in pending.items():
+                    self._pending.setdefault(key, device)
+            raise
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write device changes; retrying in %.1f s", self.flush_interval)
+
+    def close(self):
+        """Stop the write-behind thread, write any remaining changes and close the database."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+        self.pool.close()
+
+
+def device_state(device):
+    """Return the (status, brightness, temperature, security_status) state of a device for storage."""
+    return (int(bool(device.status)), getattr(device, 'brightness', None), getattr(device, 'temperature', None),
+            getattr(device, 'security_status', None))
@@ -0,0 +1,227 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QEvent, QModelIndex, QRect
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QApplication, QDoubleSpinBox, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+
+from device_list_model import DEVICE_TYPE_ROLE, FilteredDeviceRows, descending_runs, device_label
+from device_registry import device_key
+
+DEVICE_COLUMN = 0
+STATUS_COLUMN = 1
+VALUE_COLUMN = 2
+COLUMN_TITLES = ("Device", "Status", "Value")
+
+# Height of every row in pixels; fixed heights let the view skip measuring rows
+ROW_HEIGHT = 24
+
+# Attribute shown and edited in the value column, by device type
+VALUE_ATTRIBUTES = {
+    "SmartLight": "brightness",
+    "Thermostat": "temperature",
+    "SecurityCamera": "security_status",
+}
+
+# Ranges of the value editor, by attribute
+VALUE_RANGES = {
+    "brightness": (0.0, 100.0),
+    "temperature": (-50.0, 100.0),
+}
+
+STATUS_ON_COLOR = QColor("#4CAF50")
+STATUS_OFF_COLOR = QColor("#9E9E9E")
+
+
+class DeviceTableModel(QAbstractTableModel, FilteredDeviceRows):
+    """Table model with one row per registered device and its status and value.
+
+    The model only stores the registry key of each row and reads device state
+    when the view asks for a cell, so memory does not grow with the number of
+    columns or the amount of state shown, and the view only queries the rows it
+    paints. State changes are collected and announced on each refresh through
+    ``flush_changes``, with one ``dataChanged`` per run of adjacent rows, so rows
+    between changed ones aren't repainted. Removed devices are collected too and
+    their rows removed together once control returns to the event loop, so
+    removing many devices re-indexes the rows once rather than once per device.
+    """
+    def __init__(self, automation_system, parent=None, search_index=None):
+        """Initialize an empty DeviceTableModel.
+
+        Args:
+            automation_system: The automation system the devices are read from and updated through.
+            parent: The parent QObject.
+            search_index: Optional DeviceSearchIndex used to apply the filter; without
+                one the filter is a substring match on the device label.
+        """
+        super().__init__(parent)
+        self.automation_system = automation_system
+        self._changed_rows = set()
+        self._init_rows(search_index)
+
+    def _rows_reset(self):
+        self._changed_rows.clear()
+
+    def _rows_removed(self, removed_rows):
+        removed = set(removed_rows)
+        self._changed_rows = {row - bisect_left(removed_rows, row) for row in self._changed_rows if row not in removed}
+
+    def device_changed(self, device, attributes):
+        row = self._rows.get(device_key(device))
+        if row is not None:
+            self._changed_rows.add(row)
+
+    def flush_changes(self):
+        """Announce the rows changed since the last flush, one dataChanged signal per run of adjacent rows."""
+        self.remove_pending_rows()
+        if not self._changed_rows:
+            return
+        changed_rows = sorted(self._changed_rows)
+        self._changed_rows.clear()
+        for first, last in descending_runs(changed_rows):
+            self.dataChanged.emit(self.index(first, STATUS_COLUMN), self.index(last, VALUE_COLUMN))
+
+    def device(self, row):
+        """Return the device shown in the given row, or None if it was removed since the last flush."""
+        return self.automation_system.get_device(*self._keys[row])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMN_TITLES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMN_TITLES[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == VALUE_COLUMN and self._value_attribute(index.row()) in VALUE_RANGES:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def _value_attribute(self, row):
+        return VALUE_ATTRIBUTES.get(self._keys[row][0])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self._keys[index.row()]
+        if role == Qt.UserRole:
+            return key[1]
+        if role == DEVICE_TYPE_ROLE:
+            return key[0]
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        column = index.column()
+        if column == DEVICE_COLUMN:
+            return device_label(key)
+        device = self.automation_system.get_device(*key)
+        if device is None:
+            return None
+        if column == STATUS_COLUMN:
+            return bool(device.status) if role == Qt.EditRole else ("ON" if device.status else "OFF")
+        attribute = self._value_attribute(index.row())
+        value = getattr(device, attribute, None) if attribute else None
+        if role == Qt.EditRole or value is None:
+            return value
+        if attribute == "brightness":
+            return f"{value:.0f}%"
+        if attribute == "temperature":
+            return f"{value:.1f}℃"
+        return value
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or index.column() == DEVICE_COLUMN:
+            return False
+        device = self.device(index.row())
+        if device is None:
+            return False
+        if index.column() == STATUS_COLUMN:
+            self.automation_system.update_device(device, status=bool(value))
+        else:
+            attribute = self._value_attribute(index.row())
+            if attribute not in VALUE_RANGES:
+                return False
+            self.automation_system.update_device(device, **{attribute: value})
+        self._changed_rows.discard(index.row())
+        self.dataChanged.emit(index.siblingAtColumn(STATUS_COLUMN), index.siblingAtColumn(VALUE_COLUMN))
+        return True
+
+
+class DeviceItemDelegate(QStyledItemDelegate):
+    """Paints device controls in a DeviceTableModel view without creating widgets per row.
+
+    The status column is painted as an ON/OFF pill that toggles when clicked, and
+    light brightness as a progress bar. Only the cell being edited gets a real
+    editor widget.
+    """
+    def paint(self, painter, option, index):
+        column = index.column()
+        if column == STATUS_COLUMN:
+            self.paint_status(painter, option, index)
+        elif column == VALUE_COLUMN and index.data(DEVICE_TYPE_ROLE) == "SmartLight":
+            self.paint_brightness(painter, option, index)
+        else:
+            super().paint(painter, option, index)
+
+    def paint_status(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        status = index.data(Qt.EditRole)
+        pill = QRect(0, 0, 44, option.rect.height() - 6)
+        pill.moveCenter(option.rect.center())
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(STATUS_ON_COLOR if status else STATUS_OFF_COLOR)
+        painter.drawRoundedRect(pill, pill.height() / 2, pill.height() / 2)
+        painter.setPen(Qt.white)
+        painter.drawText(pill, Qt.AlignCenter, "ON" if status else "OFF")
+        painter.restore()
+
+    def paint_brightness(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        brightness = index.data(Qt.EditRole) or 0.0
+        progress = QStyleOptionProgressBar()
+        progress.rect = option.rect.adjusted(4, 3, -4, -3)
+        progress.minimum = 0
+        progress.maximum = 100
+        progress.progress = int(round(brightness))
+        progress.text = f"{brightness:.0f}%"
+        progress.textVisible = True
+        QApplication.style().drawControl(QStyle.CE_ProgressBar, progress, painter)
+
+    def editorEvent(self, event, model, option, index):
+        if index.column() == STATUS_COLUMN and event.type() == QEvent.MouseButtonRelease \
+                and event.button() == Qt.LeftButton:
+            return model.setData(index, not index.data(Qt.EditRole), Qt.EditRole)
+        return super().editorEvent(event, model, option, index)
+
+    def createEditor(self, parent, option, index):
+        attribute = VALUE_ATTRIBUTES.get(index.data(DEVICE_TYPE_ROLE))
+        if attribute not in VALUE_RANGES:
+            return None
+        editor = QDoubleSpinBox(parent)
+        editor.setRange(*VALUE_RANGES[attribute])
+        editor.setDecimals(0 if attribute == "brightness" else 1)
+        editor.setSuffix("%" if attribute == "brightness" else "℃")
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setValue(index.data(Qt.EditRole) or 0.0)
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.EditRole)
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setHeight(ROW_HEIGHT)
+        return size
@@ -0,0 +1,203 @@
+import time
+
+from device_registry import RegistryListener, device_key
+
+# Power draw in watts of a light that is on, at zero and at full brightness
+LIGHT_STANDBY_WATTS = 0.5
+LIGHT_FULL_WATTS = 10.0
+
+# Power draw in watts of a thermostat that is on, plus its heating or cooling per degree
+# between its temperature and the outdoor temperature
+THERMOSTAT_STANDBY_WATTS = 2.0
+THERMOSTAT_WATTS_PER_DEGREE = 120.0
+
+DEFAULT_OUTDOOR_TEMPERATURE = 10.0
+
+# Hours of energy use kept per rollup
+DEFAULT_HISTORY_HOURS = 48
+
+# Device attributes the power draw depends on, besides the room
+POWER_ATTRIBUTES = frozenset(("status", "brightness", "temperature", "room"))
+
+HOUR = 3600
+
+
+def light_watts(device):
+    """Return the power draw of a SmartLight, proportional to its brightness (0-100)."""
+    if not device.status:
+        return 0.0
+    brightness = min(100.0, max(0.0, float(getattr(device, "brightness", 0) or 0)))
+    return LIGHT_STANDBY_WATTS + (LIGHT_FULL_WATTS - LIGHT_STANDBY_WATTS) * brightness / 100.0
+
+
+def thermostat_watts(device, outdoor_temperature=DEFAULT_OUTDOOR_TEMPERATURE):
+    """Return the power draw of a Thermostat, proportional to the distance between its and the outdoor temperature."""
+    if not device.status:
+        return 0.0
+    temperature = getattr(device, "temperature", None)
+    if temperature is None:
+        return THERMOSTAT_STANDBY_WATTS
+    return THERMOSTAT_STANDBY_WATTS + THERMOSTAT_WATTS_PER_DEGREE * abs(float(temperature) - outdoor_temperature)
+
+
+class EnergyRollup:
+    """Current power draw and hourly energy use of a set of devices, such as a room.
+
+    Energy is integrated whenever the draw changes or is read, so between changes
+    the rollup costs nothing. Hours are aligned to the epoch.
+    """
+    def __init__(self, since, history=DEFAULT_HISTORY_HOURS):
+        """Initialize an EnergyRollup drawing no power.
+
+        Args:
+            since: Time from which energy is accumulated, in seconds since the epoch.
+            history: Number of hours of energy use kept.
+        """
+        self.watts = 0.0
+        self.devices = 0
+        self.history = history
+        self.hourly_wh = {}
+        self._since = since
+
+    def accumulate(self, now):
+        """Add the energy used at the current draw up to now to the hourly totals."""
+        start = self._since
+        if now <= start:
+            return
+        hourly_wh = self.hourly_wh
+        while start < now:
+            hour = int(start - start % HOUR)
+            end = min(now, hour + HOUR)
+            hourly_wh[hour] = hourly_wh.get(hour, 0.0) + self.watts * (end - start) / HOUR
+            start = end
+        self._since = now
+        while len(hourly_wh) > self.history:
+            del hourly_wh[next(iter(hourly_wh))]
+
+    def change(self, watts, devices, now):
+        """Add watts (negative to subtract) to the draw from now on, and devices to the device count."""
+        self.accumulate(now)
+        self.watts += watts
+        self.devices += devices
+        if not self.devices:
+            # Summing many positive and negative changes leaves rounding errors behind
+            self.watts = 0.0
+
+    def hourly_kwh(self, now):
+        """Return [(hour start, kWh)] of the kept hours, oldest first, including the current hour so far."""
+        self.accumulate(now)
+        return [(hour, wh / 1000.0) for hour, wh in self.hourly_wh.items()]
+
+    def as_json(self, now):
+        return {"watts": self.watts, "devices": self.devices,
+                "hourly_kwh": [{"hour": hour, "kwh": kwh} for hour, kwh in self.hourly_kwh(now)]}
+
+
+class EnergyMonitor(RegistryListener):
+    """Incrementally maintained power draw of the home and of each of its rooms.
+
+    Lights draw power according to their brightness and thermostats according to
+    the distance between their temperature and the outdoor temperature. The draw
+    of every device is remembered together with its room, and each change of a
+    device only moves the difference between the old and the new draw between the
+    rollups of its rooms and of the home. Reading the draw of a room or of the
+    home is O(1) however many devices there are.
+    """
+    def __init__(self, registry, outdoor_temperature=DEFAULT_OUTDOOR_TEMPERATURE, history=DEFAULT_HISTORY_HOURS,
+                 clock=time.time):
+        """Initialize an EnergyMonitor, account for the registered devices and start listening.
+
+        Args:
+            registry: The DeviceRegistry whose devices are monitored.
+            outdoor_temperature: Outdoor temperature in degrees Celsius thermostats heat or cool against.
+            history: Number of hours of energy use kept per rollup.
+            clock: Callable returning the current time in seconds since the epoch.
+        """
+        self.registry = registry
+        self.outdoor_temperature = outdoor_temperature
+        self.history = history
+        self.clock = clock
+        self.home = EnergyRollup(clock(), history)
+        self._rooms = {}
+        # (room, watts) of every device that draws power, by registry key
+        self._draws = {}
+        self.power_models = {"SmartLight": light_watts, "Thermostat": self._thermostat_watts}
+        self.devices_changed(list(registry), ())
+        registry.add_listener(self)
+
+    def _thermostat_watts(self, device):
+        return thermostat_watts(device, self.outdoor_temperature)
+
+    def device_watts(self, device):
+        """Return the current power draw of a device, or None if its type draws no modelled power."""
+        model = self.power_models.get(type(device).__name__)
+        return model(device) if model is not None else None
+
+    def watts(self, room=None):
+        """Return the current power draw of a room, or of the whole home if room is None."""
+        if room is None:
+            return self.home.watts
+        rollup = self._rooms.get(room)
+        return rollup.watts if rollup is not None else 0.0
+
+    def rooms(self):
+        """Return {room: watts} of every room that has had devices drawing power."""
+        return {room: rollup.watts for room, rollup in self._rooms.items()}
+
+    def hourly_kwh(self, room=None):
+        """Return [(hour start, kWh)] of a room, or of the whole home if room is None."""
+        rollup = self.home if room is None else self._rooms.get(room)
+        return rollup.hourly_kwh(self.clock()) if rollup is not None else []
+
+    def set_outdoor_temperature(self, temperature):
+        """Change the outdoor temperature and recompute the draw of every thermostat."""
+        self.outdoor_temperature = temperature
+        self.devices_changed(self.registry.devices_of_type("Thermostat"), ("temperature",))
+
+    def as_json(self):
+        now = self.clock()
+        return dict(self.home.as_json(now), outdoor_temperature=self.outdoor_temperature,
+                    rooms={room: rollup.as_json(now) for room, rollup in sorted(self._rooms.items())})
+
+    def _rollup(self, room):
+        rollup = self._rooms.get(room)
+        if rollup is None:
+            rollup = self._rooms[room] = EnergyRollup(self.clock(), self.history)
+        return rollup
+
+    def _move(self, key, previous, draw, now):
+        """Replace the (room, watts) draw of a device in the rollups; either may be None."""
+        if previous == draw:
+            return
+        if previous is not None:
+            del self._draws[key]
+            self.home.change(-previous[1], -1, now)
+            if previous[0] is not None:
+                self._rooms[previous[0]].change(-previous[1], -1, now)
+        if draw is not None:
+            self._draws[key] = draw
+            self.home.change(draw[1], 1, now)
+            if draw[0] is not None:
+                self._rollup(draw[0]).change(draw[1], 1, now)
+
+    def device_added(self, device):
+        self.devices_changed((device,), ())
+
+    def device_removed(self, device):
+        key = device_key(device)
+        if key in self._draws:
+            self._move(key, self._draws[key], None, self.clock())
+
+    def device_changed(self, device, attributes):
+        self.devices_changed((device,), attributes)
+
+    def devices_changed(self, devices, attributes):
+        if attributes and POWER_ATTRIBUTES.isdisjoint(attributes):
+            return
+        now = self.clock()
+        for device in devices:
+            watts = self.device_watts(device)
+            if watts is None:
+                continue
+            key = device_key(device)
+            self._move(key, self._draws.get(key), (self.registry.room(device), watts), now)
@@ -0,0 +1,286 @@
+import asyncio
+import inspect
+import logging
+import threading
+from typing import NamedTuple
+
+from device_registry import RegistryListener, device_key
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceAdded(NamedTuple):
+    device_type: str
+    device_id: str
+    device: object
+
+
+class DeviceRemoved(NamedTuple):
+    device_type: str
+    device_id: str
+    device: object
+
+
+class DeviceChanged(NamedTuple):
+    device_type: str
+    device_id: str
+    device: object
+    attributes: frozenset
+
+
+def coalesce(pending, event):
+    """Merge an event into a dict of pending events keyed by (device_type, device_id).
+
+    Only the net effect per device is kept: repeated changes merge their attribute
+    sets, a change after an addition stays an addition, and an addition or removal
+    replaces whatever was pending. The number of pending events is therefore
+    bounded by the number of devices, however fast events arrive.
+    """
+    key = (event.device_type, event.device_id)
+    previous = pending.get(key)
+    if isinstance(event, DeviceChanged) and previous is not None:
+        if isinstance(previous, DeviceAdded):
+            return
+        if isinstance(previous, DeviceChanged):
+            pending[key] = previous._replace(attributes=previous.attributes | event.attributes)
+            return
+    pending.pop(key, None)
+    pending[key] = event
+
+
+class Subscription:
+    """A subscriber of an EventBus with its own coalescing backlog and consumer task."""
+    def __init__(self, bus, handler, name):
+        self.bus = bus
+        self.handler = handler
+        self.name = name
+        self.delivered = 0
+        self._pending = {}
+        self._ready = asyncio.Event()
+        self._task = None
+        self._delivery = None
+
+    def _offer(self, events):
+        for event in events:
+            coalesce(self._pending, event)
+        self._ready.set()
+
+    async def _consume(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            # Shielded so that stopping the subscription waits for the batch instead of abandoning it
+            self._delivery = asyncio.ensure_future(self._deliver())
+            await asyncio.shield(self._delivery)
+
+    async def _deliver(self):
+        batch = list(self._pending.values())
+        self._pending = {}
+        if not batch:
+            return
+        try:
+            if inspect.iscoroutinefunction(self.handler):
+                result = self.handler(batch)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(None, self.handler, batch)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Event subscriber '%s' failed", self.name)
+        self.delivered += len(batch)
+
+    async def _stop(self):
+        """Cancel the consumer task, finish the batch being delivered and deliver the rest."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._delivery is not None:
+            await self._delivery
+            self._delivery = None
+        await self._deliver()
+
+    def cancel(self):
+        """Stop delivering events to this subscriber."""
+        self.bus.unsubscribe(self)
+
+    def close(self):
+        """Deliver the events published so far to this subscriber, then stop delivering to it."""
+        self.bus.drain(self)
+
+
+class EventBus:
+    """Asyncio publish/subscribe bus for device events.
+
+    ``publish`` is thread-safe and never blocks: events are coalesced per device
+    into a pending batch that the bus loop hands to every subscriber once per loop
+    iteration. Each subscriber consumes its own coalesced backlog in its own task,
+    so a slow subscriber sees fewer, larger batches but never delays publishers or
+    other subscribers. Plain function handlers, which may block on I/O, run in the
+    loop's default executor rather than on the loop itself.
+    """
+    def __init__(self):
+        """Initialize a stopped EventBus."""
+        self.loop = None
+        self._thread = None
+        self._subscriptions = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+
+    def start(self, loop=None):
+        """Start delivering events.
+
+        Args:
+            loop: Running asyncio loop to use; if omitted, the bus runs its own loop
+                in a background thread.
+        """
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="event-bus", daemon=True)
+            self._thread.start()
+        self.loop = loop
+        for subscription in self._subscriptions:
+            self._start_subscription(subscription)
+        with self._lock:
+            if self._pending and not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_soon_threadsafe(self._flush)
+
+    def stop(self):
+        """Deliver pending events, cancel the subscriber tasks and stop the bus loop.
+
+        A bus started on an external loop is shut down with ``await bus.shutdown()``
+        from that loop instead.
+        """
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+            asyncio.run_coroutine_threadsafe(self.loop.shutdown_default_executor(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+            self.loop.close()
+        self.loop = None
+
+    def subscribe(self, handler, name=None):
+        """Call handler with lists of events; it may be a plain function or a coroutine function.
+
+        Coroutine functions run on the bus loop, plain functions in its default
+        executor. Either way a subscriber gets one batch at a time, in order.
+
+        Returns:
+            The Subscription, which can be cancelled.
+        """
+        subscription = Subscription(self, handler, name or getattr(handler, "__name__", "subscriber"))
+        self._subscriptions.append(subscription)
+        if self.loop is not None:
+            self._start_subscription(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering events to a subscription."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            if subscription._task is not None and self.loop is not None:
+                self.loop.call_soon_threadsafe(subscription._task.cancel)
+
+    def drain(self, subscription):
+        """Deliver the events published so far to a subscription, then unsubscribe it.
+
+        Blocks until the subscriber has handled them, so it must not be called on
+        the bus loop.
+        """
+        async def drain():
+            self._flush()
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+            await subscription._stop()
+
+        if self.loop is None:
+            self.unsubscribe(subscription)
+            return
+        asyncio.run_coroutine_threadsafe(drain(), self.loop).result()
+
+    def _start_subscription(self, subscription):
+        def create_task():
+            # asyncio.Event binds to the running loop, so create it there
+            subscription._ready = asyncio.Event()
+            if subscription._pending:
+                subscription._ready.set()
+            subscription._task = self.loop.create_task(subscription._consume())
+
+        self.loop.call_soon_threadsafe(create_task)
+
+    async def shutdown(self):
+        """Deliver pending events and cancel the subscriber tasks."""
+        self._flush()
+        for subscription in self._subscriptions:
+            await subscription._stop()
+
+    def publish(self, event):
+        """Queue an event for delivery; safe to call from any thread."""
+        with self._lock:
+            coalesce(self._pending, event)
+            if self._flush_scheduled or self.loop is None:
+                return
+            self._flush_scheduled = True
+        self.loop.call_soon_threadsafe(self._flush)
+
+    def publish_many(self, events):
+        """Queue several events for delivery in the same batch; safe to call from any thread."""
+        with self._lock:
+            for event in events:
+                coalesce(self._pending, event)
+            if self._flush_scheduled or self.loop is None:
+                return
+            self._flush_scheduled = True
+        self.loop.call_soon_threadsafe(self._flush)
+
+    def _flush(self):
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending = {}
+            self._flush_scheduled = False
+        for subscription in list(self._subscriptions):
+            subscription._offer(events)
+
+
+class EventPublisher(RegistryListener):
+    """Publishes the changes of a device registry as events on an EventBus."""
+    def __init__(self, bus):
+        """Initialize an EventPublisher.
+
+        Args:
+            bus: The EventBus events are published to.
+        """
+        self.bus = bus
+
+    def device_added(self, device):
+        self.bus.publish(DeviceAdded(*device_key(device), device))
+
+    def device_removed(self, device):
+        self.bus.publish(DeviceRemoved(*device_key(device), device))
+
+    def device_changed(self, device, attributes):
+        self.bus.publish(DeviceChanged(*device_key(device), device, frozenset(attributes)))
+
+    def devices_changed(self, devices, attributes):
+        attributes = frozenset(attributes)
+        self.bus.publish_many([DeviceChanged(*device_key(device), device, attributes) for device in devices])
+
+
+def replay_to(listener):
+    """Return an event handler that forwards events to a RegistryListener.
+
+    This lets existing listeners such as DeviceStore consume events from the bus
+    instead of being called synchronously by the registry.
+    """
+    def handle(events):
+        for event in events:
+            if isinstance(event, DeviceAdded):
+                listener.device_added(event.device)
+            elif isinstance(event, DeviceRemoved):
+                listener.device_removed(event.device)
+            else:
+                listener.device_changed(event.device, tuple(event.attributes))
+    handle.__name__ = type(listener).__name__
+    return handle
@@ -0,0 +1,57 @@
+import argparse
+import csv
+import json
+import sys
+
+from credentials import DEFAULT_HASH_ITERATIONS
+from database import DatabaseManager, DEFAULT_DB_PATH, BULK_CHUNK_SIZE
+
+
+def read_users_csv(path):
+    """Yield (username, password) pairs from a CSV file with username and password columns."""
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield row['username'], row['password']
+
+
+def read_users_jsonl(path):
+    """Yield (username, password) pairs from a file of JSON objects, one per line."""
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                user = json.loads(line)
+                yield user['username'], user['password']
+
+
+def read_users(path, file_format=None):
+    """Yield (username, password) pairs from a CSV or JSONL file, guessing the format from its extension."""
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    return read_users_csv(path) if file_format == 'csv' else read_users_jsonl(path)
+
+
+def main(argv=None):
+    """Import users from a CSV or JSONL file into the user database."""
+    parser = argparse.ArgumentParser(description="Bulk import HomeMate users from a CSV or JSONL file.")
+    parser.add_argument('path', help="CSV file with username,password columns or JSONL file of user objects")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="input format (default: from the file extension)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database file")
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE, help="users inserted per transaction")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_HASH_ITERATIONS, help="password hashing work factor")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.db, hash_iterations=args.iterations)
+    registered_count, duplicates = db_manager.register_users_bulk(read_users(args.path, args.format),
+                                                                  chunk_size=args.chunk_size)
+    db_manager.close()
+
+    print(f"Registered {registered_count} users.")
+    if duplicates:
+        print(f"Skipped {len(duplicates)} duplicate usernames:")
+        for username in duplicates:
+            print(f"  {username}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
-from PyQt5.QtGui import QColor, QIcon
+import os
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor, QTextCursor
 from PyQt5.QtWidgets import QMainWindow, QWidget, QPushButton, QLabel, QSlider, QTextEdit, QVBoxLayout, \
-    QLineEdit, QComboBox, QMessageBox
-from PyQt5.QtCore import QTimer
+    QLineEdit, QComboBox, QMessageBox, QTableView, QHeaderView, QAbstractItemView
 
 # Importing additional modules for enhanced styling
 from PyQt5.QtGui import QFont
@@ -10,34 +12,155 @@ from PyQt5.QtGui import QFont
 from smart_home.smart_light import SmartLight
 from smart_home.thermostat import Thermostat
 from smart_home.security_camera import SecurityCamera
+from automation_system import AutomationSystem
+from device_list_model import DeviceListModel, DEVICE_TYPE_ROLE
+from device_table_model import DeviceTableModel, DeviceItemDelegate, ROW_HEIGHT
+from device_search import DeviceSearchIndex
+from energy import EnergyMonitor
+from refresh_scheduler import RefreshScheduler, AnimationClock
+from device_store import DeviceStore
+from telemetry import TelemetryStore, TelemetryRecorder
+from event_bus import EventBus, EventPublisher, replay_to
+from qt_event_bridge import QtEventBridge
+from qt_metrics import EventLoopLagMonitor, MetricsPanel
+from scenes import DeviceGroup
+from scheduler import Scheduler, DailyAt, EVERY_DAY, WEEKDAYS, WEEKENDS
+import metrics
+from assets import assets
+
+# Maps the names shown in the device type dropdown to device class names
+DEVICE_TYPE_NAMES = {
+    "Smart Light": "SmartLight",
+    "Thermostat": "Thermostat",
+    "Security Camera": "SecurityCamera",
+}
+
+# Device types the room controls can be restricted to; None controls every type
+GROUP_TYPE_NAMES = {"All Devices": None, **DEVICE_TYPE_NAMES}
+
+# Days a scheduled room command can recur on
+SCHEDULE_DAYS = {"Every Day": EVERY_DAY, "Weekdays": WEEKDAYS, "Weekends": WEEKENDS}
+
+# Histogram of the time taken to register a device added from the dashboard
+ADD_DEVICE_METRIC = "homemate_gui_add_device_seconds"
+
+# Temperature range of the thermostat slider in ℃
+THERMOSTAT_SLIDER_RANGE = (0, 40)
+
+# Number of lines shown in the monitoring panel
+STATUS_LINE_COUNT = 4
+
+LIGHT_SLIDER_ENABLED_STYLE = """
+    QSlider {
+        height: 20px;
+    }
+    QSlider::groove:horizontal {
+        background-color: #e0e0e0;
+        border: 1px solid #cccccc;
+        height: 4px;
+        margin: 2px 0;
+    }
+    QSlider::handle:horizontal {
+        background-color: green;
+        border: 1px solid #cccccc;
+        width: 16px;
+        margin: -7px 0;
+        border-radius: 8px;
+    }
+    """
+
+LIGHT_SLIDER_DISABLED_STYLE = """
+    QSlider {
+        height: 20px; /* Height of the slider track */
+    }
+    QSlider::groove:horizontal {
+        background-color: #e0e0e0;
+        border: 1px solid #cccccc;
+        height: 4px;
+        margin: 2px 0;
+    }
+    QSlider::handle:horizontal {
+        background-color: gray;
+        border: 1px solid #cccccc;
+        width: 16px;
+        margin: -7px 0;
+        border-radius: 8px;
+    }
+    """
 
 
 class SmartHomeGUI(QMainWindow):
     """Class representing the Smart Home Monitoring Dashboard."""
-    def __init__(self, automation_system):
+    def __init__(self, automation_system, device_store=None, event_bus=None, scheduler=None):
         """Initialize a SmartHomeGUI instance.
 
                 Args:
                     automation_system: The central automation system for the smart home.
+                    device_store: Optional DeviceStore the devices are saved to. Load the stored
+                        devices with ``DeviceStore.load_into`` before passing it, and before an
+                        EventPublisher is attached, so loading isn't written back.
+                    event_bus: Optional EventBus carrying device changes; persistence then
+                        consumes them from the bus and the dashboard refreshes on every batch.
+                    scheduler: Optional Scheduler of timed actions; the dashboard drives its
+                        clock and offers controls to schedule room commands.
                 """
         super().__init__()
         self.automation_system = automation_system
+        self.device_store = device_store
+        self.event_bus = event_bus
+        self.scheduler = scheduler
+        self.event_bridge = None
+        self.persistence_subscription = None
+        self.lag_monitor = None
         self.smart_light = None
         self.thermostat = None
         self.security_camera = None
+        self.search_index = DeviceSearchIndex(automation_system.registry)
+        self.energy_monitor = EnergyMonitor(automation_system.registry)
+        self.device_list_model = DeviceListModel(search_index=self.search_index)
+        self.device_table_model = DeviceTableModel(automation_system, search_index=self.search_index)
+        self.rendered_device_states = {}
+        self.light_slider_enabled = None
+        self.refresh_scheduler = RefreshScheduler(self)
 
         self.setWindowTitle("Smart Home Dashboard")
 
-        self.setWindowIcon(QIcon('icon.png'))
+        self.setWindowIcon(assets.icon('icon.png'))
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
 
+        if self.device_store:
+            if self.event_bus:
+                self.persistence_subscription = self.event_bus.subscribe(replay_to(self.device_store),
+                                                                         name="persistence")
+            else:
+                self.automation_system.add_listener(self.device_store)
+
         self.create_widgets()
+        self.update_remove_device_dropdown()
+        self.automation_system.add_listener(self.device_list_model)
+        self.automation_system.add_listener(self.device_table_model)
         self.update_device_status()
 
-        self.toggle_timer = QTimer()
-        self.toggle_timer.timeout.connect(self.update_brightness_slider)
+        if self.event_bus:
+            # Changes made off the GUI thread (simulation, API) reach the dashboard as event batches
+            self.event_bridge = QtEventBridge(self.event_bus, self)
+            self.event_bridge.events_received.connect(self.schedule_status_update)
+
+        if metrics.enabled or os.environ.get(metrics.PROFILE_SLOW_FRAME_ENV):
+            self.lag_monitor = EventLoopLagMonitor(self)
+            self.lag_monitor.start()
+
+        if self.scheduler:
+            # One timer fires every due action of the scheduler
+            self.scheduler_timer = QTimer(self)
+            self.scheduler_timer.setInterval(int(self.scheduler.tick * 1000))
+            self.scheduler_timer.timeout.connect(self.run_scheduled_actions)
+            self.scheduler_timer.start()
+
+        # A single clock drives every running light fade
+        self.animation_clock = AnimationClock(self)
 
         self.setAutoFillBackground(True)
         p = self.palette()
@@ -127,8 +250,20 @@ class SmartHomeGUI(QMainWindow):
         self.remove_device_label = QLabel("Remove Device:")
         layout.addWidget(self.remove_device_label)
 
+        self.device_filter_textfield = QLineEdit()
+        self.device_filter_textfield.setPlaceholderText("Search devices by ID, type, room or tag")
+        self.device_filter_textfield.textChanged.connect(self.device_list_model.set_filter)
+        self.device_filter_textfield.textChanged.connect(self.device_table_model.set_filter)
+        layout.addWidget(self.device_filter_textfield)
+
         self.remove_device_dropdown = QComboBox()
-        self.remove_device_dropdown.addItem("Select Device to Remove")
+        self.remove_device_dropdown.setModel(self.device_list_model)
+        self.remove_device_dropdown.setPlaceholderText("Select Device to Remove")
+        self.remove_device_dropdown.setCurrentIndex(-1)
+        # Avoid measuring every item to size the combo box and its popup
+        self.remove_device_dropdown.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.remove_device_dropdown.setMinimumContentsLength(24)
+        self.remove_device_dropdown.view().setUniformItemSizes(True)
         layout.addWidget(self.remove_device_dropdown)
 
         self.remove_device_button = QPushButton("Remove Device")
@@ -140,8 +275,115 @@ class SmartHomeGUI(QMainWindow):
         layout.addWidget(self.monitoring_label)
 
         self.monitoring_text = QTextEdit()
+        self.monitoring_text.setReadOnly(True)
         layout.addWidget(self.monitoring_text)
 
+        self.energy_label = QLabel()
+        layout.addWidget(self.energy_label)
+
+        self.light_brightness_label = QLabel("Smart Light Brightness:")
+        layout.addWidget(self.light_brightness_label)
+
+        self.light_brightness_slider = QSlider(Qt.Horizontal)
+        self.light_brightness_slider.setRange(0, 100)
+        self.light_brightness_slider.sliderMoved.connect(self.set_light_brightness)
+        layout.addWidget(self.light_brightness_slider)
+
+        self.thermostat_label = QLabel("Thermostat Temperature:")
+        layout.addWidget(self.thermostat_label)
+
+        self.thermostat_slider = QSlider(Qt.Horizontal)
+        self.thermostat_slider.setRange(*THERMOSTAT_SLIDER_RANGE)
+        self.thermostat_slider.setEnabled(False)
+        self.thermostat_slider.sliderMoved.connect(self.set_thermostat_temperature)
+        layout.addWidget(self.thermostat_slider)
+
+        self.show_security_status_button = QPushButton("Show Security Status")
+        self.show_security_status_button.setEnabled(False)
+        self.show_security_status_button.clicked.connect(self.show_security_status)
+        layout.addWidget(self.show_security_status_button)
+
+        self.devices_label = QLabel("All Devices:")
+        layout.addWidget(self.devices_label)
+
+        # Every device in one table; only the visible rows are queried and painted
+        self.device_table_view = QTableView()
+        self.device_table_view.setModel(self.device_table_model)
+        self.device_table_delegate = DeviceItemDelegate(self.device_table_view)
+        self.device_table_view.setItemDelegate(self.device_table_delegate)
+        self.device_table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.device_table_view.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+        self.device_table_view.setWordWrap(False)
+        self.device_table_view.verticalHeader().hide()
+        self.device_table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.device_table_view.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.device_table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.device_table_view.clicked.connect(self.schedule_status_update)
+        self.device_table_delegate.closeEditor.connect(self.schedule_status_update)
+        layout.addWidget(self.device_table_view)
+
+        self.device_room_textfield = QLineEdit()
+        self.device_room_textfield.setPlaceholderText("Room")
+        layout.addWidget(self.device_room_textfield)
+
+        self.device_tags_textfield = QLineEdit()
+        self.device_tags_textfield.setPlaceholderText("Tags, separated by commas")
+        layout.addWidget(self.device_tags_textfield)
+
+        self.set_room_and_tags_button = QPushButton("Set Room and Tags of Selected Devices")
+        self.set_room_and_tags_button.clicked.connect(self.set_selected_room_and_tags)
+        layout.addWidget(self.set_room_and_tags_button)
+
+        # Room controls update every matching device in one bulk operation
+        self.group_control_label = QLabel("Room Control:")
+        layout.addWidget(self.group_control_label)
+
+        self.group_room_textfield = QLineEdit()
+        self.group_room_textfield.setPlaceholderText("Room (empty for every room)")
+        self.group_room_textfield.textChanged.connect(self.update_energy_label)
+        layout.addWidget(self.group_room_textfield)
+
+        self.group_type_dropdown = QComboBox()
+        self.group_type_dropdown.addItems(list(GROUP_TYPE_NAMES))
+        layout.addWidget(self.group_type_dropdown)
+
+        self.group_on_button = QPushButton("Turn On")
+        self.group_on_button.clicked.connect(lambda: self.command_group(status=True))
+        layout.addWidget(self.group_on_button)
+
+        self.group_off_button = QPushButton("Turn Off")
+        self.group_off_button.clicked.connect(lambda: self.command_group(status=False))
+        layout.addWidget(self.group_off_button)
+
+        self.group_brightness_slider = QSlider(Qt.Horizontal)
+        self.group_brightness_slider.setRange(0, 100)
+        self.group_brightness_slider.sliderReleased.connect(
+            lambda: self.command_group(brightness=float(self.group_brightness_slider.value())))
+        layout.addWidget(self.group_brightness_slider)
+
+        if self.scheduler:
+            self.schedule_time_textfield = QLineEdit()
+            self.schedule_time_textfield.setPlaceholderText("Time for the room command (HH:MM)")
+            layout.addWidget(self.schedule_time_textfield)
+
+            self.schedule_days_dropdown = QComboBox()
+            self.schedule_days_dropdown.addItems(list(SCHEDULE_DAYS))
+            layout.addWidget(self.schedule_days_dropdown)
+
+            self.schedule_on_button = QPushButton("Schedule Turn On")
+            self.schedule_on_button.clicked.connect(lambda: self.schedule_group_command(status=True))
+            layout.addWidget(self.schedule_on_button)
+
+            self.schedule_off_button = QPushButton("Schedule Turn Off")
+            self.schedule_off_button.clicked.connect(lambda: self.schedule_group_command(status=False))
+            layout.addWidget(self.schedule_off_button)
+
+        if metrics.enabled:
+            self.metrics_label = QLabel("Metrics:")
+            layout.addWidget(self.metrics_label)
+            self.metrics_panel = MetricsPanel()
+            layout.addWidget(self.metrics_panel)
+
         layout.setContentsMargins(20, 20, 20, 20)
         self.central_widget.setLayout(layout)
 
@@ -155,42 +397,38 @@ class SmartHomeGUI(QMainWindow):
             return
 
         # Check if the device ID already exists for the given device type
-        existing_ids = [device.get_id() for device in self.automation_system.get_devices() if
-                        isinstance(device, SmartLight) and device_type == "Smart Light"
-                        or isinstance(device, Thermostat) and device_type == "Thermostat"
-                        or isinstance(device, SecurityCamera) and device_type == "Security Camera"]
-        if device_id in existing_ids:
+        if self.automation_system.has_device(DEVICE_TYPE_NAMES[device_type], device_id):
             self.show_message("Error", f"Device with ID '{device_id}' already exists for the selected device type.")
             return
 
         if device_type == "Smart Light":
             self.smart_light = SmartLight(id=device_id, status=False, brightness=0.0)
             try:
-                self.automation_system.add_device(self.smart_light)
-                self.update_remove_device_dropdown()
+                with metrics.timer(ADD_DEVICE_METRIC):
+                    self.automation_system.add_device(self.smart_light)
                 self.show_message("Successful Operation", "Smart Light added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Smart Light: {str(e)}")
-            self.update_device_status()
+            self.schedule_status_update()
         elif device_type == "Thermostat":
             self.thermostat = Thermostat(id=device_id, status=False, temperature=0.0)
             try:
-                self.automation_system.add_device(self.thermostat)
-                self.update_remove_device_dropdown()
+                with metrics.timer(ADD_DEVICE_METRIC):
+                    self.automation_system.add_device(self.thermostat)
                 self.show_message("Success", "Thermostat added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Thermostat: {str(e)}")
-            self.update_device_status()
+            self.schedule_status_update()
         elif device_type == "Security Camera":
             self.security_camera = SecurityCamera(id=device_id, status=False,
                                                   security_status="Click 'Show Security Status' to get the status")
             try:
-                self.automation_system.add_device(self.security_camera)
-                self.update_remove_device_dropdown()
+                with metrics.timer(ADD_DEVICE_METRIC):
+                    self.automation_system.add_device(self.security_camera)
                 self.show_message("Success", "Security Camera added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Security Camera: {str(e)}")
-            self.update_device_status()
+            self.schedule_status_update()
 
     def show_message(self, title, message):
         """Show a message box with the given title and message."""
@@ -200,170 +438,297 @@ class SmartHomeGUI(QMainWindow):
         msg_box.exec_()
 
     def update_remove_device_dropdown(self):
-        """Update the remove device dropdown with the list of devices in the smart home system."""
-        self.remove_device_dropdown.clear()
-        self.remove_device_dropdown.addItem("Select Device to Remove")
-
-        for device in self.automation_system.get_devices():
-            if isinstance(device, SmartLight):
-                item_text = f"SmartLight#{device.get_id()}"
-            elif isinstance(device, SecurityCamera):
-                item_text = f"SecurityCamera#{device.get_id()}"
-            elif isinstance(device, Thermostat):
-                item_text = f"Thermostat#{device.get_id()}"
-            else:
-                item_text = device.get_id()
-            self.remove_device_dropdown.addItem(item_text, userData=device.get_id())
+        """Reload the remove device dropdown and device table with the devices in the smart home system.
+
+        Both follow additions and removals on their own; a full reload is only
+        needed when the device models are first attached to the automation system.
+        """
+        devices = self.automation_system.get_devices()
+        self.device_list_model.reset(devices)
+        self.device_table_model.reset(devices)
+        self.remove_device_dropdown.setCurrentIndex(-1)
+
+    def set_selected_room_and_tags(self):
+        """Assign the entered room and tags to the devices selected in the device table."""
+        rows = sorted({index.row() for index in self.device_table_view.selectionModel().selectedRows()})
+        if not rows:
+            self.show_message("Error", "No device selected.")
+            return
+        # Rows of devices whose removal hasn't been flushed to the table yet have no device
+        devices = [device for device in map(self.device_table_model.device, rows) if device is not None]
+        if not devices:
+            return
+        room = self.device_room_textfield.text().strip() or None
+        tags = [tag.strip() for tag in self.device_tags_textfield.text().split(",") if tag.strip()]
+        for device in devices:
+            self.automation_system.set_device_room(device, room)
+            self.automation_system.set_device_tags(device, tags)
+
+    def command_group(self, **attributes):
+        """Set attributes on every device of the room and type chosen in the room controls."""
+        room = self.group_room_textfield.text().strip() or None
+        device_type = GROUP_TYPE_NAMES[self.group_type_dropdown.currentText()]
+        if not self.automation_system.command_group(room=room, device_type=device_type, **attributes):
+            self.show_message("Error", "No matching devices in the selected room.")
+            return
+        self.schedule_status_update()
+
+    def schedule_group_command(self, **attributes):
+        """Schedule the room control command to recur at the entered time on the chosen days."""
+        try:
+            recurrence = DailyAt(self.schedule_time_textfield.text().strip(),
+                                 SCHEDULE_DAYS[self.schedule_days_dropdown.currentText()])
+        except ValueError:
+            self.show_message("Error", "Enter the time as HH:MM.")
+            return
+        group = DeviceGroup(room=self.group_room_textfield.text().strip() or None,
+                            device_type=GROUP_TYPE_NAMES[self.group_type_dropdown.currentText()])
+        self.scheduler.schedule(group, attributes, recurrence=recurrence)
+        self.show_message("Success", f"Room command scheduled at {recurrence.as_json()['at']}.")
+
+    def run_scheduled_actions(self):
+        """Fire the scheduled actions that are due and refresh the dashboard if any device changed."""
+        if self.scheduler.advance():
+            self.schedule_status_update()
 
     def remove_selected_device(self):
         """Remove the selected device from the smart home system."""
         selected_device_index = self.remove_device_dropdown.currentIndex()
-        if selected_device_index != 0:
+        if selected_device_index >= 0:
             device_id = self.remove_device_dropdown.itemData(selected_device_index)
+            device_type = self.remove_device_dropdown.itemData(selected_device_index, DEVICE_TYPE_ROLE)
             if device_id:
 
-                if self.smart_light and self.smart_light.get_id() == device_id:
+                if device_type == "SmartLight" and self.smart_light and self.smart_light.get_id() == device_id:
                     self.smart_light = None
 
-                elif self.thermostat and self.thermostat.get_id() == device_id:
+                elif device_type == "Thermostat" and self.thermostat and self.thermostat.get_id() == device_id:
                     self.thermostat = None
 
-                elif self.security_camera and self.security_camera.get_id() == device_id:
+                elif (device_type == "SecurityCamera" and self.security_camera
+                      and self.security_camera.get_id() == device_id):
                     self.security_camera = None
 
-                self.automation_system.remove_device(device_id)
-                self.update_remove_device_dropdown()
-                self.update_device_status()
-
-    def update_brightness_slider(self):
-        """Update the brightness slider based on the status of the smart light."""
-        current_value = self.light_brightness_slider.value()
-        if self.smart_light.status:
-            if current_value < 100:
-                new_value = current_value + 1
-                self.light_brightness_slider.setValue(new_value)
-            else:
-                self.toggle_timer.stop()
-        else:
-            if current_value > 0:
-                new_value = current_value - 1
-                self.light_brightness_slider.setValue(new_value)
-            else:
-                self.toggle_timer.stop()
-        self.update_device_status()
-
-    def update_device_status(self):
-        """Update the status of devices on the monitoring dashboard."""
+                self.automation_system.remove_device(device_id, device_type)
+                self.remove_device_dropdown.setCurrentIndex(-1)
+                self.schedule_status_update()
+
+    def start_brightness_fade(self, light=None):
+        """Fade a smart light towards full brightness if it is on, or towards 0 if it is off.
+
+        Args:
+            light: The smart light to fade; defaults to the light shown on the dashboard.
+        """
+        light = light or self.smart_light
+        if light:
+            self.animation_clock.start(("brightness", light.get_id()),
+                                       lambda: self.update_brightness_slider(light))
+
+    def fade_switched_light(self):
+        """Fade the dashboard's light in or out if it was switched since the last update.
+
+        Only a light switched on from zero brightness, or off from full brightness, is
+        faded, so a command that sets the status and the brightness together keeps its
+        brightness.
+        """
+        rendered = self.rendered_device_states.get(0)
+        light = self.smart_light
+        if not light or not rendered or rendered[0] is not light or rendered[2] == light.status:
+            return
+        if int(light.brightness) == (0 if light.status else 100):
+            self.start_brightness_fade(light)
+
+    def update_brightness_slider(self, light):
+        """Advance the brightness fade of a smart light by one step.
+
+        Returns:
+            True while the light has not reached its target brightness.
+        """
+        current_value = int(light.brightness)
+        target_value = 100 if light.status else 0
+        if current_value == target_value:
+            return False
+        light.brightness = current_value + 1 if current_value < target_value else current_value - 1
+        self.automation_system.mark_device_changed(light, "brightness")
+        if light is self.smart_light:
+            self.light_brightness_slider.setValue(int(light.brightness))
+            self.schedule_status_update()
+        return light.brightness != target_value
+
+    def set_light_brightness(self, value):
+        """Set the brightness of the smart light shown on the dashboard from its slider."""
         if self.smart_light:
-            light_status = "ON" if self.smart_light.status else "OFF"
-            light_brightness = self.light_brightness_slider.value()
-        else:
-            light_status = "N/A"
-            light_brightness = 0
+            self.animation_clock.stop(("brightness", self.smart_light.get_id()))
+            self.automation_system.update_device(self.smart_light, brightness=float(value))
+            self.schedule_status_update()
 
+    def set_thermostat_temperature(self, value):
+        """Set the temperature of the thermostat shown on the dashboard from its slider."""
         if self.thermostat:
-            thermostat_status = "ON" if self.thermostat.status else "OFF"
-            thermostat_temperature = self.thermostat_slider.value()
-        else:
-            thermostat_status = "N/A"
-            thermostat_temperature = 0
+            self.automation_system.update_device(self.thermostat, temperature=float(value))
+            self.schedule_status_update()
 
-        if self.security_camera:
-            security_camera_status = "ON" if self.security_camera.status else "OFF"
-            security_status = self.security_camera.security_status if self.security_camera.status else "Unable to get the security status, the camera is OFF"
-        else:
-            security_camera_status = "N/A"
-            security_status = "N/A"
+    def schedule_status_update(self):
+        """Refresh the monitoring panel at the end of the current frame."""
+        self.refresh_scheduler.request(self.update_device_status)
+
+    @metrics.timed("homemate_dashboard_refresh_seconds", "Duration of a dashboard status refresh.")
+    def update_device_status(self):
+        """Update the status of devices on the monitoring dashboard.
 
+        Only the lines of devices whose state changed since the previous update are
+        re-rendered, and the slider stylesheet is only reapplied when the slider is
+        enabled or disabled.
+        """
         self.show_security_status_button.setEnabled(self.security_camera.status if self.security_camera else False)
         self.thermostat_slider.setEnabled(self.thermostat.status if self.thermostat else False)
-        self.light_brightness_slider.setEnabled(self.smart_light.status if self.smart_light else False)
-
-        if self.smart_light and self.smart_light.status:
-            # Slider is enabled
-            self.light_brightness_slider.setEnabled(True)
-            self.light_brightness_slider.setStyleSheet(
-                """
-               QSlider {
-                   height: 20px; 
-               }
-               QSlider::groove:horizontal {
-                   background-color: #e0e0e0; 
-                   border: 1px solid #cccccc; 
-                   height: 4px;
-                   margin: 2px 0; 
-               }
-               QSlider::handle:horizontal {
-                   background-color: green; 
-                   border: 1px solid #cccccc; 
-                   width: 16px; 
-                   margin: -7px 0; 
-                   border-radius: 8px; 
-               }
-               """
-            )
-        else:
-            self.light_brightness_slider.setEnabled(False)
-            self.light_brightness_slider.setStyleSheet(
-                """
-                QSlider {
-                    height: 20px; /* Height of the slider track */
-                }
-                QSlider::groove:horizontal {
-                    background-color: #e0e0e0; 
-                    border: 1px solid #cccccc;
-                    height: 4px; 
-                    margin: 2px 0;
-                }
-                QSlider::handle:horizontal {
-                    background-color: gray; 
-                    border: 1px solid #cccccc; 
-                    width: 16px; 
-                    margin: -7px 0; 
-                    border-radius: 8px; 
-                }
-                """
-            )
-
-        status_text = (
-            f"Smart Light: {light_status} (Brightness: {light_brightness})\n"
-            f"Thermostat: {thermostat_status} (Thermostat Temperature: {thermostat_temperature}℃)\n"
-            f"Security Camera: {security_camera_status}\n"
-            f"Security Status: {security_status}"
-        )
-        self.monitoring_text.setPlainText(status_text)
+        self.set_light_slider_enabled(bool(self.smart_light and self.smart_light.status))
+        self.fade_switched_light()
+
+        if self.monitoring_text.document().blockCount() != STATUS_LINE_COUNT:
+            self.monitoring_text.setPlainText("\n" * (STATUS_LINE_COUNT - 1))
+            self.rendered_device_states = {}
+
+        # Bulk commands and the API change devices without moving their sliders
+        if self.smart_light and not self.light_brightness_slider.isSliderDown():
+            self.light_brightness_slider.setValue(int(self.smart_light.brightness))
+        if self.thermostat and not self.thermostat_slider.isSliderDown():
+            self.thermostat_slider.setValue(int(self.thermostat.temperature))
+
+        light_brightness = self.light_brightness_slider.value() if self.smart_light else 0
+        self.update_status_lines(0, self.device_panel_state(self.smart_light, light_brightness),
+                                 self.light_status_lines)
+        thermostat_temperature = self.thermostat_slider.value() if self.thermostat else 0
+        self.update_status_lines(1, self.device_panel_state(self.thermostat, thermostat_temperature),
+                                 self.thermostat_status_lines)
+        self.update_status_lines(2, self.device_panel_state(self.security_camera),
+                                 self.security_camera_status_lines)
+        self.update_energy_label()
+        self.device_table_model.flush_changes()
+
+    def update_energy_label(self):
+        """Show the power draw of the home and of the room entered in the room controls."""
+        text = f"Power: {self.energy_monitor.watts():,.0f} W"
+        hourly_kwh = self.energy_monitor.hourly_kwh()
+        if hourly_kwh:
+            text += f", {hourly_kwh[-1][1]:,.2f} kWh this hour"
+        room = self.group_room_textfield.text().strip()
+        if room:
+            text += f" ({room}: {self.energy_monitor.watts(room):,.0f} W)"
+        if self.energy_label.text() != text:
+            self.energy_label.setText(text)
+
+    def device_panel_state(self, device, *values):
+        """Return the state a device's monitoring lines are rendered from."""
+        if device is None:
+            return None
+        return (device, self.automation_system.get_device_version(device), device.status) + values
+
+    def update_status_lines(self, first_line, state, render):
+        """Re-render the monitoring lines starting at first_line if the state changed."""
+        if self.rendered_device_states.get(first_line, ()) == state:
+            return
+        self.rendered_device_states[first_line] = state
+        for line_number, text in enumerate(render(state), first_line):
+            block = self.monitoring_text.document().findBlockByNumber(line_number)
+            cursor = QTextCursor(block)
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+
+    def light_status_lines(self, state):
+        if state is None:
+            return ["Smart Light: N/A (Brightness: 0)"]
+        light_status = "ON" if state[2] else "OFF"
+        return [f"Smart Light: {light_status} (Brightness: {state[3]})"]
+
+    def thermostat_status_lines(self, state):
+        if state is None:
+            return ["Thermostat: N/A (Thermostat Temperature: 0℃)"]
+        thermostat_status = "ON" if state[2] else "OFF"
+        return [f"Thermostat: {thermostat_status} (Thermostat Temperature: {state[3]}℃)"]
+
+    def security_camera_status_lines(self, state):
+        if state is None:
+            return ["Security Camera: N/A", "Security Status: N/A"]
+        security_camera_status = "ON" if state[2] else "OFF"
+        security_status = state[0].security_status if state[2] else "Unable to get the security status, the camera is OFF"
+        return [f"Security Camera: {security_camera_status}", f"Security Status: {security_status}"]
+
+    def set_light_slider_enabled(self, enabled):
+        """Enable or disable the brightness slider, restyling it only when the state flips."""
+        if enabled == self.light_slider_enabled:
+            return
+        self.light_slider_enabled = enabled
+        self.light_brightness_slider.setEnabled(enabled)
+        self.light_brightness_slider.setStyleSheet(
+            LIGHT_SLIDER_ENABLED_STYLE if enabled else LIGHT_SLIDER_DISABLED_STYLE)
+
+    def closeEvent(self, event):
+        """Write pending device changes before the dashboard closes."""
+        if self.event_bridge:
+            self.event_bridge.close()
+        if self.lag_monitor:
+            self.lag_monitor.stop()
+        if self.persistence_subscription:
+            # Hand the store every change still queued on the bus before closing it
+            self.persistence_subscription.close()
+        if self.device_store:
+            self.device_store.close()
+        super().closeEvent(event)
 
     def show_security_status(self):
         """Show the security status of the security camera."""
         if self.security_camera:
             self.security_camera.set_random_security_status()
-            self.update_device_status()
-
-
-# Example usage:
-# Replace the following lines with your actual smart home system initialization
-class AutomationSystem:
-    def __init__(self):
-        self.devices = []
-
-    def add_device(self, device):
-        self.devices.append(device)
-
-    def remove_device(self, device_id):
-        self.devices = [device for device in self.devices if device.get_id() != device_id]
-
-    def get_devices(self):
-        return self.devices
+            self.automation_system.mark_device_changed(self.security_camera, "security_status")
+            self.schedule_status_update()
 
 
 # Create a QApplication instance and run the event loop
-import sys
-from PyQt5.QtWidgets import QApplication
-
-app = QApplication(sys.argv)
-
-automation_system = AutomationSystem()
-gui = SmartHomeGUI(automation_system)
-gui.show()
-
-sys.exit(app.exec_())
+if __name__ == "__main__":
+    import sys
+    import time
+    from PyQt5.QtWidgets import QApplication
+    from simulation import SimulationEngine, SIMULATE_ENV
+
+    app = QApplication(sys.argv)
+
+    automation_system = AutomationSystem()
+    simulation_rate = float(os.environ.get(SIMULATE_ENV) or 0)
+    if simulation_rate:
+        # Registered first, so the engine mirrors the loaded fleet and every device added later
+        simulation_engine = SimulationEngine()
+        automation_system.add_listener(simulation_engine)
+    device_store = DeviceStore()
+    # Restore the saved fleet before publishing changes, so loading doesn't queue writes
+    device_store.load_into(automation_system)
+    event_bus = EventBus()
+    event_bus.start()
+    automation_system.add_listener(EventPublisher(event_bus))
+    scheduler = Scheduler(automation_system)
+    gui = SmartHomeGUI(automation_system, device_store, event_bus, scheduler)
+    telemetry_store = TelemetryStore()
+    event_bus.subscribe(replay_to(TelemetryRecorder(telemetry_store)), name="telemetry")
+    gui.show()
+
+    if simulation_rate:
+        # Ticks run on the GUI thread, so published values never race the dashboard's own changes
+        def simulate():
+            global last_tick
+            now = time.perf_counter()
+            simulation_engine.step(now - last_tick)
+            last_tick = now
+            if simulation_engine.publish(automation_system.mark_device_changed):
+                gui.schedule_status_update()
+
+        last_tick = time.perf_counter()
+        simulation_timer = QTimer()
+        simulation_timer.setInterval(int(1000 / simulation_rate))
+        simulation_timer.timeout.connect(simulate)
+        simulation_timer.start()
+
+    exit_code = app.exec_()
+    event_bus.stop()
+    scheduler.close()
+    telemetry_store.close()
+    sys.exit(exit_code)
@@ -0,0 +1,274 @@
+"""Lightweight counters and latency histograms for the hot paths of HomeMate.
+
+Metrics are only collected when the ``HOMEMATE_METRICS`` environment variable is
+set to a non-empty value other than 0 when this module is first imported. When it
+is not, ``timed`` returns the decorated function unchanged and ``timer`` and
+``increment`` return immediately, so instrumented code runs at full speed.
+
+Collected metrics can be rendered in the Prometheus text format or as JSON.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter, deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+METRICS_ENV = "HOMEMATE_METRICS"
+
+# Frame length in milliseconds above which the stacks sampled during the frame are saved
+PROFILE_SLOW_FRAME_ENV = "HOMEMATE_PROFILE_SLOW_MS"
+PROFILE_DIR_ENV = "HOMEMATE_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Upper bounds of the latency histogram buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Interval between stack samples of the profiled thread in seconds
+SAMPLE_INTERVAL = 0.002
+
+enabled = os.environ.get(METRICS_ENV, "") not in ("", "0")
+
+
+class Counter:
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def as_json(self):
+        return {"type": self.kind, "help": self.help, "value": self.value}
+
+    def prometheus_lines(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Distribution of observed values, e.g. latencies in seconds, in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        """Initialize an empty Histogram.
+
+        Args:
+            name: Metric name.
+            help: One-line description.
+            buckets: Increasing upper bounds of the buckets; values above the last
+                one are only counted in the implicit +Inf bucket.
+        """
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the q-quantile, or None without observations."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_json(self):
+        return {"type": self.kind, "help": self.help, "count": self.count, "sum": self.sum, "max": self.max,
+                "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.counts))}
+
+    def prometheus_lines(self):
+        lines = []
+        cumulative = 0
+        for bound, count in zip([repr(bound) for bound in self.buckets] + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum!r}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name, *args):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, metric_class(name, *args))
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"Metric '{name}' is a {metric.kind}, not a {metric_class.kind}.")
+        return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def metrics(self):
+        """Return the registered metrics, sorted by name."""
+        return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def as_json(self):
+        return {metric.name: metric.as_json() for metric in self.metrics()}
+
+    def prometheus_text(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+# Registry used by timed, timer and increment
+registry = MetricsRegistry()
+
+
+def timed(name, help=""):
+    """Decorator recording the duration of every call of a function in a histogram.
+
+    Args:
+        name: Name of the histogram, by convention ending in ``_seconds``.
+        help: One-line description of the histogram.
+    """
+    def decorate(function):
+        if not enabled:
+            return function
+        histogram = registry.histogram(name, help)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _timer(histogram):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def timer(name, help=""):
+    """Return a context manager recording the duration of its with block in a histogram."""
+    if not enabled:
+        return nullcontext()
+    return _timer(registry.histogram(name, help))
+
+
+def increment(name, amount=1, help=""):
+    """Add amount to a counter."""
+    if enabled:
+        registry.counter(name, help).inc(amount)
+
+
+class StackSampler:
+    """Background thread recording the Python stack of one thread at a fixed interval.
+
+    Samples are kept for a limited time, so the stacks of any recent time window,
+    such as a slow frame, can be saved in the collapsed format read by flame graph
+    tools. Sampling needs no tracing hooks in the sampled thread.
+    """
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL, history=10.0):
+        """Initialize a StackSampler; call start() to begin sampling.
+
+        Args:
+            thread_id: Identifier of the sampled thread; defaults to the calling thread.
+            interval: Seconds between samples.
+            history: Seconds of samples kept.
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self._samples = deque(maxlen=max(1, int(history / interval)))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self._samples.append((time.perf_counter(), ";".join(reversed(stack))))
+
+    def collapsed_stacks(self, start, end):
+        """Return the samples taken between two perf_counter times as {collapsed stack: count}."""
+        return StackCounter(stack for timestamp, stack in list(self._samples) if start <= timestamp <= end)
+
+    def save(self, start, end, directory):
+        """Write the stacks sampled between start and end to a file in directory and return its path."""
+        stacks = self.collapsed_stacks(start, end)
+        if not stacks:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"slow-frame-{time.strftime('%Y%m%d-%H%M%S')}-{int(end * 1000) % 1000:03d}.txt")
+        with open(path, "w") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,26 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class QtEventBridge(QObject):
+    """Delivers batches of EventBus events to the Qt event loop.
+
+    The bridge subscribes to the bus and re-emits every batch as the
+    ``events_received`` signal. The signal is emitted on the bus thread, so slots of
+    objects living in the GUI thread are invoked there through a queued connection
+    and never run concurrently with the widgets they update.
+    """
+    events_received = pyqtSignal(list)
+
+    def __init__(self, event_bus, parent=None):
+        """Initialize a QtEventBridge and subscribe it to the bus.
+
+        Args:
+            event_bus: The EventBus whose events are forwarded.
+            parent: The parent QObject.
+        """
+        super().__init__(parent)
+        self.subscription = event_bus.subscribe(self.events_received.emit, name="qt")
+
+    def close(self):
+        """Stop forwarding events."""
+        self.subscription.cancel()
@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+
+from PyQt5.QtCore import Qt, QObject, QTimer
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QPlainTextEdit
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Interval of the lag probe timer in milliseconds
+LAG_CHECK_INTERVAL_MS = 50
+
+# Lag histogram bucket bounds in seconds; a 60 fps frame is ~16 ms
+LAG_BUCKETS = (0.001, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Interval between refreshes of the metrics panel in milliseconds
+PANEL_REFRESH_MS = 1000
+
+
+class EventLoopLagMonitor(QObject):
+    """Measures how long the Qt event loop is kept from processing events.
+
+    A precise timer is due every interval; the time by which it fires late is the
+    time the loop spent busy in other work, and is recorded in the
+    ``homemate_qt_event_loop_lag_seconds`` histogram. If a slow frame threshold is
+    given, a StackSampler samples the GUI thread and the stacks of every frame
+    lagging by more than the threshold are saved, showing what blocked the loop.
+    """
+    def __init__(self, parent=None, interval_ms=LAG_CHECK_INTERVAL_MS, slow_frame_ms=None, profile_dir=None):
+        """Initialize an EventLoopLagMonitor; it must be created in the GUI thread.
+
+        Args:
+            parent: The parent QObject.
+            interval_ms: Interval of the probe timer in milliseconds.
+            slow_frame_ms: Lag in milliseconds above which sampled stacks are saved;
+                defaults to the ``HOMEMATE_PROFILE_SLOW_MS`` environment variable,
+                and no stacks are sampled without either.
+            profile_dir: Directory the stacks are saved to; defaults to the
+                ``HOMEMATE_PROFILE_DIR`` environment variable or ``profiles``.
+        """
+        super().__init__(parent)
+        if slow_frame_ms is None and os.environ.get(metrics.PROFILE_SLOW_FRAME_ENV):
+            slow_frame_ms = float(os.environ[metrics.PROFILE_SLOW_FRAME_ENV])
+        self.slow_frame_ms = slow_frame_ms
+        self.profile_dir = profile_dir or os.environ.get(metrics.PROFILE_DIR_ENV, metrics.DEFAULT_PROFILE_DIR)
+        self.sampler = metrics.StackSampler() if slow_frame_ms else None
+        self.interval = interval_ms / 1000
+        self.histogram = metrics.registry.histogram("homemate_qt_event_loop_lag_seconds",
+                                                    "Delay of a timer due every Qt event loop probe interval.",
+                                                    LAG_BUCKETS)
+        self._last_check = None
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.check)
+
+    def start(self):
+        self._last_check = time.perf_counter()
+        self._timer.start()
+        if self.sampler:
+            self.sampler.start()
+
+    def stop(self):
+        self._timer.stop()
+        if self.sampler:
+            self.sampler.stop()
+
+    def check(self):
+        """Record how late the probe timer fired."""
+        now = time.perf_counter()
+        lag = max(0.0, now - self._last_check - self.interval)
+        self.histogram.observe(lag)
+        if self.sampler and lag * 1000 >= self.slow_frame_ms:
+            path = self.sampler.save(self._last_check, now, self.profile_dir)
+            if path:
+                logger.warning("Event loop blocked for %.0f ms; sampled stacks saved to %s", lag * 1000, path)
+        self._last_check = now
+
+
+def metric_summary(metric):
+    """Return a one-line summary of a metric for the metrics panel."""
+    if not isinstance(metric, metrics.Histogram):
+        return f"{metric.name}: {metric.value}"
+    if not metric.count:
+        return f"{metric.name}: no observations"
+    return (f"{metric.name}: n={metric.count} mean={metric.sum / metric.count * 1000:.2f}ms "
+            f"p50<={metric.quantile(0.5) * 1000:g}ms p99<={metric.quantile(0.99) * 1000:g}ms "
+            f"max={metric.max * 1000:.2f}ms")
+
+
+class MetricsPanel(QPlainTextEdit):
+    """Read-only debug panel listing the collected metrics, refreshed while it is visible."""
+    def __init__(self, registry=None, parent=None, refresh_ms=PANEL_REFRESH_MS):
+        """Initialize a MetricsPanel.
+
+        Args:
+            registry: The MetricsRegistry shown; defaults to ``metrics.registry``.
+            parent: The parent widget.
+            refresh_ms: Interval between refreshes in milliseconds.
+        """
+        super().__init__(parent)
+        self.registry = registry or metrics.registry
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self._timer = QTimer(self)
+        self._timer.setInterval(refresh_ms)
+        self._timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        self.setPlainText("\n".join(metric_summary(metric) for metric in self.registry.metrics()))
+
+    def showEvent(self, event):
+        self.refresh()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,89 @@
+from PyQt5.QtCore import QObject, QTimer
+
+# Length of one UI frame in milliseconds (~60 frames per second)
+FRAME_INTERVAL_MS = 16
+
+
+class RefreshScheduler(QObject):
+    """Coalesces UI refresh requests into one batched repaint per frame.
+
+    Callbacks requested any number of times within the same frame window run
+    exactly once, in the order they were first requested, when the window ends.
+    """
+    def __init__(self, parent=None, interval_ms=FRAME_INTERVAL_MS):
+        """Initialize a RefreshScheduler.
+
+        Args:
+            parent: The parent QObject.
+            interval_ms: Length of the frame window in milliseconds.
+        """
+        super().__init__(parent)
+        self._pending = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def request(self, callback):
+        """Schedule callback to run at the end of the current frame window."""
+        self._pending[callback] = None
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Run all pending callbacks now."""
+        self._timer.stop()
+        pending = self._pending
+        self._pending = {}
+        for callback in pending:
+            callback()
+
+
+class AnimationClock(QObject):
+    """Single timer that advances every active animation once per frame.
+
+    An animation is a step function called on every tick; it returns True while the
+    animation should keep running and False once it has finished. The clock stops
+    ticking when no animations are left.
+    """
+    def __init__(self, parent=None, interval_ms=FRAME_INTERVAL_MS):
+        """Initialize an AnimationClock.
+
+        Args:
+            parent: The parent QObject.
+            interval_ms: Interval between ticks in milliseconds.
+        """
+        super().__init__(parent)
+        self._animations = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.tick)
+
+    def start(self, name, step):
+        """Start an animation, replacing any running animation with the same name.
+
+        Args:
+            name: Hashable name of the animation.
+            step: Callable advancing the animation by one tick.
+        """
+        self._animations[name] = step
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def stop(self, name):
+        """Stop the animation with the given name, if it is running."""
+        self._animations.pop(name, None)
+        if not self._animations:
+            self._timer.stop()
+
+    def is_running(self, name):
+        """Return True if the animation with the given name is running."""
+        return name in self._animations
+
+    def tick(self):
+        """Advance every active animation by one step."""
+        for name, step in list(self._animations.items()):
+            if not step():
+                self._animations.pop(name, None)
+        if not self._animations:
+            self._timer.stop()
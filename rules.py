@@ -0,0 +1,205 @@
+import operator
+
+from device_registry import RegistryListener, device_key
+
+# Comparison operators a Trigger can use; "changed" matches every change of the attribute
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "changed": lambda value, _: True,
+}
+
+# Maximum depth of rules triggered by the actions of other rules
+DEFAULT_MAX_DEPTH = 8
+
+
+class Trigger:
+    """Condition on one attribute of a device, or of every device of a type."""
+    def __init__(self, device_type, attribute, op, value=None, device_id=None):
+        """Initialize a Trigger.
+
+        Args:
+            device_type: The class name of the watched device(s).
+            attribute: Name of the watched attribute.
+            op: One of the OPERATORS.
+            value: Value the attribute is compared with.
+            device_id: ID of the watched device, or None to watch every device of the type.
+
+        Raises:
+            ValueError: If the operator is unknown.
+        """
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown trigger operator '{op}'.")
+        self.device_type = device_type
+        self.device_id = device_id
+        self.attribute = attribute
+        self.op = op
+        self.value = value
+        self._compare = OPERATORS[op]
+
+    def matches(self, device):
+        """Return True if the watched attribute of the device satisfies the condition.
+
+        A device without the attribute, or whose value can't be compared with the
+        trigger's, doesn't match.
+        """
+        value = getattr(device, self.attribute, None)
+        if value is None:
+            return False
+        try:
+            return bool(self._compare(value, self.value))
+        except TypeError:
+            return False
+
+
+class SetAttribute:
+    """Action setting an attribute on the triggering device or on a set of target devices."""
+    def __init__(self, attribute, value, targets=None):
+        """Initialize a SetAttribute action.
+
+        Args:
+            attribute: Name of the attribute to set.
+            value: The new value.
+            targets: Callable returning the devices to update when given the registry,
+                such as ``devices_of_type("SmartLight")``; None updates the device that
+                triggered the rule.
+        """
+        self.attribute = attribute
+        self.value = value
+        self.targets = targets
+
+    def apply(self, registry, device):
+        targets = [device] if self.targets is None else self.targets(registry)
+        targets = [target for target in targets if getattr(target, self.attribute, None) != self.value]
+        if targets:
+            registry.update_many(targets, **{self.attribute: self.value})
+
+
+class Clamp:
+    """Action keeping a numeric attribute of the triggering device within [low, high]."""
+    def __init__(self, attribute, low, high):
+        """Initialize a Clamp action.
+
+        Args:
+            attribute: Name of the numeric attribute.
+            low: Lowest allowed value.
+            high: Highest allowed value.
+        """
+        self.attribute = attribute
+        self.low = low
+        self.high = high
+
+    def apply(self, registry, device):
+        value = getattr(device, self.attribute, None)
+        if value is None:
+            return
+        clamped = min(max(value, self.low), self.high)
+        if clamped != value:
+            registry.update(device, **{self.attribute: clamped})
+
+
+def devices_of_type(device_type):
+    """Return an action target selecting every device of the given type."""
+    return lambda registry: registry.devices_of_type(device_type)
+
+
+def devices_by_key(*keys):
+    """Return an action target selecting the devices with the given (device_type, device_id) keys."""
+    def select(registry):
+        return [device for device in (registry.get(*key) for key in keys) if device is not None]
+    return select
+
+
+class Rule:
+    """Named automation rule: when the trigger matches, run the actions in order."""
+    def __init__(self, name, trigger, actions):
+        """Initialize a Rule.
+
+        Args:
+            name: Unique name of the rule.
+            trigger: The Trigger watched by the rule.
+            actions: Actions run when the trigger matches.
+        """
+        self.name = name
+        self.trigger = trigger
+        self.actions = list(actions)
+
+
+class RuleEngine(RegistryListener):
+    """Evaluates automation rules when the devices they watch change.
+
+    Rules are indexed by the (device type, device ID, attribute) they watch, with
+    type-wide rules stored under a device ID of None. A state change therefore only
+    evaluates the rules that depend on it, however many rules are registered.
+    Actions change devices through the registry, so they can trigger further rules
+    up to a maximum depth.
+    """
+    def __init__(self, registry, max_depth=DEFAULT_MAX_DEPTH):
+        """Initialize a RuleEngine and start listening to the registry.
+
+        Args:
+            registry: The DeviceRegistry whose changes trigger rules.
+            max_depth: Maximum depth of rules triggered by other rules' actions.
+        """
+        self.registry = registry
+        self.max_depth = max_depth
+        self.evaluations = 0
+        self._rules = {}
+        self._index = {}
+        self._watched_attributes = {}
+        self._depth = 0
+        registry.add_listener(self)
+
+    def add_rule(self, rule):
+        """Register a rule, replacing any rule with the same name."""
+        self.remove_rule(rule.name)
+        self._rules[rule.name] = rule
+        trigger = rule.trigger
+        self._index.setdefault((trigger.device_type, trigger.device_id, trigger.attribute), []).append(rule)
+        watched = self._watched_attributes.setdefault((trigger.device_type, trigger.device_id), {})
+        watched[trigger.attribute] = watched.get(trigger.attribute, 0) + 1
+
+    def remove_rule(self, name):
+        """Unregister the rule with the given name, if any."""
+        rule = self._rules.pop(name, None)
+        if rule is None:
+            return
+        trigger = rule.trigger
+        index_key = (trigger.device_type, trigger.device_id, trigger.attribute)
+        self._index[index_key].remove(rule)
+        if not self._index[index_key]:
+            del self._index[index_key]
+        watched = self._watched_attributes[(trigger.device_type, trigger.device_id)]
+        watched[trigger.attribute] -= 1
+        if not watched[trigger.attribute]:
+            del watched[trigger.attribute]
+        if not watched:
+            del self._watched_attributes[(trigger.device_type, trigger.device_id)]
+
+    def rules(self):
+        """Return every registered rule."""
+        return list(self._rules.values())
+
+    def device_changed(self, device, attributes):
+        if self._depth >= self.max_depth:
+            return
+        device_type, device_id = device_key(device)
+        if not attributes:
+            # Unknown change: consider every attribute watched on this device
+            attributes = (set(self._watched_attributes.get((device_type, device_id), ()))
+                          | set(self._watched_attributes.get((device_type, None), ())))
+        self._depth += 1
+        try:
+            for attribute in attributes:
+                for index_key in ((device_type, device_id, attribute), (device_type, None, attribute)):
+                    for rule in self._index.get(index_key, ()):
+                        self.evaluations += 1
+                        if rule.trigger.matches(device):
+                            for action in rule.actions:
+                                action.apply(self.registry, device)
+        finally:
+            self._depth -= 1
@@ -0,0 +1,126 @@
+import math
+
+# Device attributes commands can set, with the types their values are converted to
+ATTRIBUTE_TYPES = {"status": bool, "brightness": float, "temperature": float, "security_status": str}
+
+BRIGHTNESS_RANGE = (0.0, 100.0)
+
+
+def coerce_attributes(attributes):
+    """Return attribute values converted to the types devices store, validating all of them first.
+
+    Statuses must be booleans (or 0 and 1), brightness and temperature finite
+    numbers, with brightness between 0 and 100, and security statuses strings.
+
+    Raises:
+        ValueError: If an attribute is unknown or a value has the wrong type or range.
+    """
+    coerced = {}
+    for name, value in attributes.items():
+        expected = ATTRIBUTE_TYPES.get(name)
+        if expected is None:
+            raise ValueError(f"Unknown attribute '{name}'.")
+        if expected is bool:
+            if value not in (True, False) or not isinstance(value, (bool, int)):
+                raise ValueError(f"{name} must be true or false.")
+        elif expected is float:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{name} must be a number.")
+            if name == "brightness" and not BRIGHTNESS_RANGE[0] <= value <= BRIGHTNESS_RANGE[1]:
+                raise ValueError(f"brightness must be between {BRIGHTNESS_RANGE[0]:g} and {BRIGHTNESS_RANGE[1]:g}.")
+        elif not isinstance(value, str):
+            raise ValueError(f"{name} must be a string.")
+        coerced[name] = expected(value)
+    return coerced
+
+
+class DeviceGroup:
+    """Selection of devices by room, type, tag or ID; criteria left as None match every device."""
+    def __init__(self, room=None, device_type=None, tag=None, device_id=None):
+        """Initialize a DeviceGroup.
+
+        Args:
+            room: Name of the room the devices are assigned to.
+            device_type: The class name of the devices.
+            tag: Tag the devices carry.
+            device_id: ID of a single device; requires device_type.
+        """
+        self.room = room
+        self.device_type = device_type
+        self.tag = tag
+        self.device_id = device_id
+
+    def devices(self, registry):
+        """Return the registered devices in the group.
+
+        The smallest of the room, tag and type indexes is scanned, so the cost
+        depends on the size of the group rather than of the fleet.
+        """
+        if self.device_id is not None:
+            device = registry.get(self.device_type, self.device_id)
+            return [device] if device is not None and self.contains(registry, device) else []
+        candidates = []
+        if self.room is not None:
+            candidates.append(registry.devices_in_room(self.room))
+        if self.tag is not None:
+            candidates.append(registry.devices_with_tag(self.tag))
+        if self.device_type is not None:
+            candidates.append(registry.devices_of_type(self.device_type))
+        if not candidates:
+            return list(registry)
+        devices = min(candidates, key=len)
+        return [device for device in devices if self.contains(registry, device)]
+
+    def contains(self, registry, device):
+        """Return True if a registered device belongs to the group."""
+        return ((self.device_type is None or type(device).__name__ == self.device_type)
+                and (self.room is None or registry.room(device) == self.room)
+                and (self.tag is None or self.tag in registry.tags(device)))
+
+    def as_json(self):
+        return {"room": self.room, "type": self.device_type, "tag": self.tag, "id": self.device_id}
+
+
+class GroupCommand:
+    """Attribute values to set on every device of a group that has those attributes."""
+    def __init__(self, group, **attributes):
+        """Initialize a GroupCommand.
+
+        Args:
+            group: The DeviceGroup the command applies to.
+            **attributes: New attribute values, e.g. ``status=True, brightness=40``.
+
+        Raises:
+            ValueError: If an attribute is unknown or a value is invalid; see coerce_attributes.
+        """
+        self.group = group
+        self.attributes = coerce_attributes(attributes)
+
+    def apply(self, registry):
+        """Update the group's devices with one bulk registry update and return them."""
+        devices = [device for device in self.group.devices(registry)
+                   if all(hasattr(device, name) for name in self.attributes)]
+        return registry.update_many(devices, **self.attributes)
+
+    def as_json(self):
+        return dict(self.group.as_json(), set=self.attributes)
+
+
+class Scene:
+    """Named list of group commands applied together, e.g. "Movie night"."""
+    def __init__(self, name, commands):
+        """Initialize a Scene.
+
+        Args:
+            name: Unique name of the scene.
+            commands: GroupCommands applied in order when the scene is activated.
+        """
+        self.name = name
+        self.commands = list(commands)
+
+    def apply(self, registry):
+        """Apply every command of the scene and return the number of device updates."""
+        return sum(len(command.apply(registry)) for command in self.commands)
+
+    def as_json(self):
+        return {"name": self.name, "commands": [command.as_json() for command in self.commands]}
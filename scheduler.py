@@ -0,0 +1,380 @@
+import json
+import time
+from datetime import date, datetime, timedelta
+
+from database import ConnectionPool, DEFAULT_DB_PATH
+from device_registry import device_key
+from scenes import DeviceGroup, coerce_attributes
+
+# Seconds per wheel tick; actions fire at most this late
+DEFAULT_TICK = 1.0
+
+# Slot bits of each wheel level, finest first; together they span 2**32 ticks
+WHEEL_BITS = (8, 6, 6, 6, 6)
+
+# Seconds between writes of queued schedule changes
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+WEEKENDS = (5, 6)
+EVERY_DAY = tuple(range(7))
+
+
+class Every:
+    """Recurrence at a fixed interval."""
+    def __init__(self, seconds):
+        """Initialize an Every recurrence.
+
+        Raises:
+            ValueError: If the interval is not positive.
+        """
+        if seconds <= 0:
+            raise ValueError("A recurrence interval must be positive.")
+        self.seconds = seconds
+
+    def next_due(self, due, now):
+        """Return the first time after now that is a whole number of intervals after due."""
+        return due + ((now - due) // self.seconds + 1) * self.seconds
+
+    def as_json(self):
+        return {"every": self.seconds}
+
+
+class DailyAt:
+    """Recurrence at a local time of day on some days of the week, e.g. 23:00 on weekdays."""
+    def __init__(self, at, weekdays=EVERY_DAY):
+        """Initialize a DailyAt recurrence.
+
+        Args:
+            at: Local time as "HH:MM".
+            weekdays: Days it recurs on, Monday being 0.
+
+        Raises:
+            ValueError: If the time or a weekday is invalid.
+        """
+        self.time = datetime.strptime(at, "%H:%M").time()
+        self.weekdays = tuple(sorted(set(weekdays)))
+        if not self.weekdays or not set(self.weekdays) <= set(EVERY_DAY):
+            raise ValueError("Weekdays must be a non-empty subset of 0 (Monday) to 6 (Sunday).")
+
+    def next_due(self, due, now):
+        """Return the first matching local time after now."""
+        today = date.fromtimestamp(now)
+        for days in range(8):
+            candidate = datetime.combine(today + timedelta(days=days), self.time)
+            if candidate.weekday() in self.weekdays and candidate.timestamp() > now:
+                return candidate.timestamp()
+        raise AssertionError("A weekly recurrence always matches within 8 days.")
+
+    def as_json(self):
+        return {"at": self.time.strftime("%H:%M"), "weekdays": list(self.weekdays)}
+
+
+def recurrence_from_json(data):
+    """Return the recurrence described by the JSON of Every or DailyAt, or None."""
+    if not data:
+        return None
+    if "every" in data:
+        return Every(data["every"])
+    return DailyAt(data["at"], data.get("weekdays", EVERY_DAY))
+
+
+class TimerWheel:
+    """Hierarchical timer wheel holding entries due at integer ticks.
+
+    Level 0 has one slot per tick for the next 256 ticks; every further level has
+    64 slots, each covering a whole turn of the level below. Inserting and
+    cancelling an entry is a dictionary operation on one slot. Advancing a tick
+    takes the entries of one level-0 slot, and every 256 ticks the next slot of
+    level 1 is cascaded down, so each entry is moved at most once per level.
+    Entries due beyond the span of the wheel are parked in the last slot they
+    fit and re-inserted when they come round.
+    """
+    def __init__(self, current_tick=0, bits=WHEEL_BITS):
+        """Initialize an empty TimerWheel.
+
+        Args:
+            current_tick: Tick the wheel starts at; entries due at it fire on the next advance.
+            bits: Number of slot bits of each level, finest first.
+        """
+        self.current_tick = current_tick
+        self.bits = bits
+        self.shifts = [sum(bits[:level]) for level in range(len(bits))]
+        self.levels = [[{} for _ in range(1 << level_bits)] for level_bits in bits]
+        self.span = 1 << sum(bits)
+        self._slots = {}
+
+    def insert(self, entry_id, due_tick, payload):
+        """Add or replace an entry due at a tick; entries due in the past fire on the next advance."""
+        self.cancel(entry_id)
+        self._place(entry_id, due_tick, payload)
+
+    def _place(self, entry_id, due_tick, payload):
+        delta = due_tick - self.current_tick
+        if delta < 0:
+            slot = self.levels[0][self.current_tick & ((1 << self.bits[0]) - 1)]
+        else:
+            delta = min(delta, self.span - 1)
+            level = 0
+            while delta >= 1 << (self.shifts[level] + self.bits[level]):
+                level += 1
+            position = min(due_tick, self.current_tick + delta)
+            slot = self.levels[level][(position >> self.shifts[level]) & ((1 << self.bits[level]) - 1)]
+        slot[entry_id] = (due_tick, payload)
+        self._slots[entry_id] = slot
+
+    def cancel(self, entry_id):
+        """Remove an entry; return True if it was pending."""
+        slot = self._slots.pop(entry_id, None)
+        if slot is None:
+            return False
+        del slot[entry_id]
+        return True
+
+    def advance(self, to_tick):
+        """Advance the wheel up to and including to_tick and return the due (entry_id, payload) pairs."""
+        due = []
+        while self.current_tick <= to_tick:
+            if not self._slots:
+                # Nothing pending: jump straight to the target
+                self.current_tick = to_tick + 1
+                break
+            index = self.current_tick & ((1 << self.bits[0]) - 1)
+            if index == 0:
+                self._cascade(1)
+            slot = self.levels[0][index]
+            if slot:
+                entries = list(slot.items())
+                slot.clear()
+                for entry_id, (due_tick, payload) in entries:
+                    del self._slots[entry_id]
+                    if due_tick > self.current_tick:
+                        # Parked beyond the span of the wheel
+                        self._place(entry_id, due_tick, payload)
+                    else:
+                        due.append((entry_id, payload))
+            self.current_tick += 1
+        return due
+
+    def _cascade(self, level):
+        if level == len(self.bits):
+            return
+        index = (self.current_tick >> self.shifts[level]) & ((1 << self.bits[level]) - 1)
+        if index == 0:
+            self._cascade(level + 1)
+        slot = self.levels[level][index]
+        entries = list(slot.items())
+        slot.clear()
+        for entry_id, (due_tick, payload) in entries:
+            self._place(entry_id, due_tick, payload)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._slots
+
+
+class ScheduledAction:
+    """Attribute values applied to a device group at a due time, optionally recurring."""
+    def __init__(self, action_id, due, group, attributes, recurrence=None):
+        """Initialize a ScheduledAction.
+
+        Args:
+            action_id: Unique integer ID.
+            due: Epoch time in seconds the action is due at.
+            group: DeviceGroup the attributes are applied to.
+            attributes: Attribute values, e.g. ``{"temperature": 18.0}``.
+            recurrence: Every, DailyAt or None for a one-off action.
+        """
+        self.action_id = action_id
+        self.due = due
+        self.group = group
+        self.attributes = attributes
+        self.recurrence = recurrence
+
+    def as_json(self):
+        return {"id": self.action_id, "due": self.due, "group": self.group.as_json(), "set": self.attributes,
+                "recurrence": self.recurrence.as_json() if self.recurrence else None}
+
+
+class Scheduler:
+    """Timed device actions for a whole home, driven by a single clock.
+
+    Pending actions live in a TimerWheel, so scheduling and cancelling are O(1)
+    however many actions are pending. ``advance`` fires every due action at once:
+    actions setting the same attribute values are merged into one bulk registry
+    update. Recurring actions are rescheduled after firing; actions that came due
+    while the application was not running fire once on the first advance.
+
+    Pending actions are persisted in the ``scheduled_actions`` table of the smart
+    home database. Changes are queued and written in one transaction per flush
+    interval of ``advance`` calls and on ``close``. Like the automation system, a
+    Scheduler must only be used from one thread.
+    """
+    def __init__(self, automation_system, db_path=DEFAULT_DB_PATH, tick=DEFAULT_TICK,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, clock=time.time):
+        """Open the schedule table and load the pending actions.
+
+        Args:
+            automation_system: The automation system actions are applied to.
+            db_path: Path of the SQLite database file, or None to keep schedules in memory only.
+            tick: Seconds per wheel tick.
+            flush_interval: Minimum seconds between writes of queued changes.
+            clock: Callable returning the current epoch time in seconds.
+        """
+        self.automation_system = automation_system
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.wheel = TimerWheel(self._tick_of(clock()))
+        self.fired = 0
+        self._next_id = 1
+        self._pending_writes = {}
+        self._last_flush = clock()
+        self.pool = ConnectionPool(db_path, size=1) if db_path else None
+        if self.pool:
+            self.create_schedule_table()
+            self.load()
+
+    def create_schedule_table(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scheduled_actions (
+                    id INTEGER PRIMARY KEY,
+                    due REAL NOT NULL,
+                    target TEXT NOT NULL,
+                    attributes TEXT NOT NULL,
+                    recurrence TEXT
+                )
+            ''')
+            conn.commit()
+
+    def load(self):
+        """Add every stored action to the wheel and return how many there are."""
+        with self.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, due, target, attributes, recurrence FROM scheduled_actions
+            ''').fetchall()
+        for action_id, due, target, attributes, recurrence in rows:
+            target = json.loads(target)
+            group = DeviceGroup(target.get("room"), target.get("type"), target.get("tag"), target.get("id"))
+            action = ScheduledAction(action_id, due, group, json.loads(attributes),
+                                     recurrence_from_json(json.loads(recurrence) if recurrence else None))
+            self.wheel.insert(action_id, self._tick_of(due), action)
+            self._next_id = max(self._next_id, action_id + 1)
+        return len(rows)
+
+    def _tick_of(self, timestamp):
+        return int(timestamp // self.tick)
+
+    def schedule(self, group, attributes, due=None, recurrence=None):
+        """Schedule attribute values to be applied to a device group.
+
+        Args:
+            group: DeviceGroup the attributes are applied to; use
+                ``DeviceGroup(device_type=..., device_id=...)`` for a single device.
+            attributes: Attribute values, e.g. ``{"temperature": 18.0}``.
+            due: Epoch time in seconds of the first run; defaults to the next
+                occurrence of the recurrence.
+            recurrence: Every, DailyAt or None for a one-off action.
+
+        Returns:
+            The ID of the scheduled action.
+
+        Raises:
+            ValueError: If neither due nor recurrence is given, or an attribute value is invalid.
+        """
+        if due is None:
+            if recurrence is None:
+                raise ValueError("A scheduled action needs a due time or a recurrence.")
+            due = recurrence.next_due(self.clock(), self.clock())
+        action = ScheduledAction(self._next_id, due, group, coerce_attributes(attributes), recurrence)
+        self._next_id += 1
+        self._add(action)
+        return action.action_id
+
+    def _add(self, action):
+        self.wheel.insert(action.action_id, self._tick_of(action.due), action)
+        self._pending_writes[action.action_id] = action
+
+    def cancel(self, action_id):
+        """Cancel a pending action; return True if it was pending."""
+        if not self.wheel.cancel(action_id):
+            return False
+        self._pending_writes[action_id] = None
+        return True
+
+    def pending(self):
+        """Return the number of pending actions."""
+        return len(self.wheel)
+
+    def advance(self, now=None):
+        """Fire every action due by now and reschedule the recurring ones.
+
+        Actions fire in order of due time, then of scheduling. When several of them
+        set the same attribute of a device, the device ends up with the value of the
+        last one, as if they had fired one at a time; devices are then updated in
+        one bulk update per distinct set of final values.
+
+        Returns:
+            The number of devices updated.
+        """
+        now = self.clock() if now is None else now
+        due = self.wheel.advance(self._tick_of(now))
+        updated = 0
+        if due:
+            due.sort(key=lambda entry: (entry[1].due, entry[0]))
+            # Final attribute values of every targeted device, by registry key
+            resolved = {}
+            registry = self.automation_system.registry
+            for _, action in due:
+                for device in action.group.devices(registry):
+                    if all(hasattr(device, name) for name in action.attributes):
+                        key = device_key(device)
+                        if key in resolved:
+                            resolved[key][1].update(action.attributes)
+                        else:
+                            resolved[key] = (device, dict(action.attributes))
+                if action.recurrence is None:
+                    self._pending_writes[action.action_id] = None
+                else:
+                    action.due = action.recurrence.next_due(action.due, now)
+                    self._add(action)
+            batches = {}
+            for device, attributes in resolved.values():
+                batches.setdefault(tuple(sorted(attributes.items())), []).append(device)
+            for batch_key, devices in batches.items():
+                updated += len(self.automation_system.update_devices(devices, **dict(batch_key)))
+            self.fired += len(due)
+        if self.pool and now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+        return updated
+
+    def flush(self):
+        """Write the queued schedule changes in one transaction."""
+        pending = self._pending_writes
+        self._pending_writes = {}
+        if not pending or not self.pool:
+            return
+        deletes = [(action_id,) for action_id, action in pending.items() if action is None]
+        upserts = [(action.action_id, action.due, json.dumps(action.group.as_json()), json.dumps(action.attributes),
+                    json.dumps(action.recurrence.as_json()) if action.recurrence else None)
+                   for action in pending.values() if action is not None]
+        with self.pool.connection() as conn:
+            with conn:
+                conn.executemany('''
+                    DELETE FROM scheduled_actions WHERE id = ?
+                ''', deletes)
+                conn.executemany('''
+                    INSERT OR REPLACE INTO scheduled_actions (id, due, target, attributes, recurrence)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', upserts)
+
+    def close(self):
+        """Write the queued changes and close the database."""
+        if self.pool:
+            self.flush()
+            self.pool.close()
+            self.pool = None
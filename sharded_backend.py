@@ -0,0 +1,343 @@
+import multiprocessing
+import os
+import signal
+import time
+import zlib
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from automation_system import AutomationSystem
+from compact_devices import COMPACT_DEVICE_CLASSES, KINDS
+from device_factory import create_device
+from device_registry import RegistryListener, device_key
+from simulation import DEFAULT_FADE_RATE, SECURITY_STATUSES
+
+DEFAULT_SHARD_CAPACITY = 1 << 18
+
+# Shared memory layout of a shard: (column, typecode, bytes per row); 4-byte columns first keep them aligned.
+# The kind column holds the compact_devices.KINDS code of each row, so workers know which columns to simulate
+COLUMNS = (
+    ("brightness", "f", 4),
+    ("temperature", "f", 4),
+    ("setpoint", "f", 4),
+    ("occupied", "B", 1),
+    ("kind", "B", 1),
+    ("status", "B", 1),
+    ("security_codes", "B", 1),
+)
+
+
+def shard_for(device_id, shards):
+    """Return the index of the shard a device ID is assigned to."""
+    return zlib.crc32(str(device_id).encode()) % shards
+
+
+def column_offsets(capacity):
+    """Return {column: (offset, typecode)} and the total size of a shard's shared memory."""
+    offsets = {}
+    offset = 0
+    for name, typecode, width in COLUMNS:
+        offsets[name] = (offset, typecode)
+        offset += width * capacity
+    return offsets, offset
+
+
+class SharedDeviceTable:
+    """Device state table of one shard, stored in a shared memory block.
+
+    It has the same interface as ``compact_devices.CompactDeviceTable``, so the
+    compact device classes can be backed by it, but status is one byte per row so
+    that processes never read-modify-write a shared byte. The table cannot grow
+    because other processes map the block at a fixed size.
+    """
+    def __init__(self, capacity=DEFAULT_SHARD_CAPACITY):
+        """Allocate a new shared memory block for capacity rows.
+
+        Args:
+            capacity: Maximum number of devices in the shard.
+        """
+        self.capacity = capacity
+        offsets, size = column_offsets(capacity)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        buffer = self.shm.buf
+        for name, (offset, typecode) in offsets.items():
+            width = 4 if typecode == "f" else 1
+            setattr(self, name, buffer[offset:offset + width * capacity].cast(typecode))
+        # Device IDs stay in the coordinator; workers only need the state columns
+        self.ids = [None] * capacity
+        # Workers pick statuses by code, so the simulated ones have fixed codes
+        self.security_statuses = [""] + list(SECURITY_STATUSES)
+        self._security_status_codes = {status: code for code, status in enumerate(self.security_statuses)}
+        self._next_row = 0
+        self._free_rows = []
+        self._size = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def used_rows(self):
+        """Number of rows allocated so far; the rows from here on have never held a device."""
+        return self._next_row
+
+    def allocate(self, kind, device_id):
+        """Return a cleared row for a new device of the given kind code.
+
+        Raises:
+            ValueError: If the shard is full.
+        """
+        if self._free_rows:
+            row = self._free_rows.pop()
+        elif self._next_row < self.capacity:
+            row = self._next_row
+            self._next_row += 1
+        else:
+            raise ValueError(f"Shard {self.name} is full ({self.capacity} devices).")
+        self.status[row] = 0
+        self.brightness[row] = 0.0
+        self.temperature[row] = 0.0
+        self.setpoint[row] = 0.0
+        self.security_codes[row] = 0
+        self.ids[row] = device_id
+        self.kind[row] = kind
+        self.occupied[row] = 1
+        self._size += 1
+        return row
+
+    def release(self, row):
+        """Make a row available to the next allocated device."""
+        if self.occupied is None:
+            return
+        self.occupied[row] = 0
+        self.ids[row] = None
+        self._free_rows.append(row)
+        self._size -= 1
+
+    def get_status(self, row):
+        return bool(self.status[row])
+
+    def set_status(self, row, status):
+        self.status[row] = 1 if status else 0
+
+    def security_status_code(self, security_status):
+        """Return the code of a security status string, adding it to the table if it is new."""
+        code = self._security_status_codes.get(security_status)
+        if code is None:
+            if len(self.security_statuses) == 256:
+                raise ValueError("A SharedDeviceTable holds at most 256 distinct security statuses.")
+            code = len(self.security_statuses)
+            self.security_statuses.append(security_status)
+            self._security_status_codes[security_status] = code
+        return code
+
+    def close(self):
+        """Release the views of the block and free it."""
+        for name, _, _ in COLUMNS:
+            getattr(self, name).release()
+            setattr(self, name, None)
+        self.shm.close()
+        self.shm.unlink()
+
+    def __len__(self):
+        return self._size
+
+
+def shard_arrays(buffer, capacity):
+    """Return NumPy views of the columns of a shard's shared memory block."""
+    offsets, _ = column_offsets(capacity)
+    return {name: np.frombuffer(buffer, dtype=np.float32 if typecode == "f" else np.uint8, count=capacity,
+                                offset=offset)
+            for name, (offset, typecode) in offsets.items()}
+
+
+def step_shard(arrays, rows, rng, dt, ticks, fade_rate, drift, setpoint_gain, security_event_rate):
+    """Advance the devices in the first rows rows of a shard by ticks steps of dt seconds and return how many there are."""
+    arrays = {name: column[:rows] for name, column in arrays.items()}
+    occupied = arrays["occupied"].astype(bool)
+    kind, status = arrays["kind"], arrays["status"].astype(bool)
+    lights = np.flatnonzero(occupied & (kind == KINDS["SmartLight"]))
+    thermostats = np.flatnonzero(occupied & (kind == KINDS["Thermostat"]))
+    heating = thermostats[status[thermostats]]
+    cameras = np.flatnonzero(occupied & (kind == KINDS["SecurityCamera"]) & status)
+    brightness, temperature = arrays["brightness"], arrays["temperature"]
+    target = np.where(status[lights], np.float32(100.0), np.float32(0.0))
+    max_change = np.float32(fade_rate * dt)
+    gain = np.float32(min(1.0, setpoint_gain * dt))
+    for _ in range(ticks):
+        brightness[lights] += np.clip(target - brightness[lights], -max_change, max_change)
+        temperature[thermostats] += rng.normal(0.0, drift * np.sqrt(dt), thermostats.size).astype(np.float32)
+        temperature[heating] += (arrays["setpoint"][heating] - temperature[heating]) * gain
+        if cameras.size:
+            events = cameras[rng.random(cameras.size) < security_event_rate * dt]
+            arrays["security_codes"][events] = rng.integers(1, len(SECURITY_STATUSES) + 1, events.size)
+    return int(lights.size + thermostats.size + np.count_nonzero(occupied & (kind == KINDS["SecurityCamera"])))
+
+
+def run_shard(shm_name, capacity, connection, seed, *parameters):
+    """Worker process loop simulating the devices of one shard in place.
+
+    Commands arrive on the connection as ``("step", dt, ticks, rows)``, where rows
+    is the number of rows in use, or ``("stop",)``; every step is answered with the
+    number of simulated devices.
+    """
+    # Ctrl+C reaches the whole process group; the coordinator stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = shard_arrays(shm.buf, capacity)
+    rng = np.random.default_rng(seed)
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == "stop":
+                break
+            _, dt, ticks, rows = command
+            connection.send(step_shard(arrays, rows, rng, dt, ticks, *parameters))
+    finally:
+        # The views must be gone before the block can be unmapped
+        del arrays
+        shm.close()
+
+
+class SetpointTracker(RegistryListener):
+    """Makes the temperature set on a shard-backed thermostat through the coordinator its setpoint.
+
+    Workers change temperatures without notifying the registry, so every
+    temperature change it announces comes from a user, a rule or the API.
+    """
+    def device_changed(self, device, attributes):
+        if type(device).__name__ == "Thermostat" and (not attributes or "temperature" in attributes):
+            device.table.setpoint[device.row] = device.temperature
+
+
+class ShardedAutomationSystem(AutomationSystem):
+    """Automation system whose device state is partitioned across worker processes.
+
+    Devices are assigned to shards by the CRC32 of their ID. Each shard's state
+    lives in a SharedDeviceTable that the coordinator (this object) and one worker
+    process map, so the coordinator reads and writes device state directly while
+    ``step`` advances every shard's simulation in parallel without pickling device
+    state. Devices added are copied into shard-backed compact devices, which are
+    what ``get_device`` and ``get_devices`` return. ``remove_device`` releases the
+    row of a removed device after every registry listener has seen the removal;
+    the handle the registry held keeps a copy of the device, other handles of it
+    become invalid.
+
+    Registry listeners are notified of additions, removals and changes made
+    through the coordinator; values changed by the workers are read live and are
+    not announced. Workers read-modify-write the shared columns while they step,
+    so device state must not be written through the coordinator during ``step``.
+    """
+    def __init__(self, shards=None, capacity_per_shard=DEFAULT_SHARD_CAPACITY, seed=None,
+                 fade_rate=DEFAULT_FADE_RATE, drift=0.05, setpoint_gain=0.2, security_event_rate=0.01):
+        """Create the shards and start one worker process per shard.
+
+        Args:
+            shards: Number of shards; defaults to the CPU count.
+            capacity_per_shard: Maximum number of devices per shard.
+            seed: Seed of the workers' random number generators.
+            fade_rate: Brightness points per second a light fades by.
+            drift: Standard deviation of the thermostat temperature drift per sqrt(second).
+            setpoint_gain: Fraction of the distance to the setpoint a thermostat covers per second while on.
+            security_event_rate: Expected security events per camera per second.
+        """
+        super().__init__()
+        self.add_listener(SetpointTracker())
+        self.shards = shards or os.cpu_count() or 1
+        self.tables = [SharedDeviceTable(capacity_per_shard) for _ in range(self.shards)]
+        self._device_classes = [{name: partial(device_class, table=table)
+                                 for name, device_class in COMPACT_DEVICE_CLASSES.items()}
+                                for table in self.tables]
+        # Spawn rather than fork so workers don't inherit the Qt application state
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._workers = []
+        seeds = np.random.SeedSequence(seed).spawn(self.shards)
+        for table, shard_seed in zip(self.tables, seeds):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=run_shard, name=f"shard-{len(self._workers)}", daemon=True,
+                                     args=(table.name, table.capacity, worker_connection, shard_seed,
+                                           fade_rate, drift, setpoint_gain, security_event_rate))
+            worker.start()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def add_device(self, device):
+        """Copy a device into its shard and register the shard-backed copy.
+
+        Returns:
+            The shard-backed device.
+
+        Raises:
+            ValueError: If a device with the same type and ID is already registered,
+                or the shard is full.
+        """
+        device_type, device_id = device_key(device)
+        if self.registry.contains(device_type, device_id):
+            raise ValueError(f"Device '{device_type}#{device_id}' is already registered.")
+        shard = shard_for(device_id, self.shards)
+        shard_device = create_device(device_type, device_id, status=bool(device.status),
+                                     brightness=getattr(device, "brightness", None),
+                                     temperature=getattr(device, "temperature", None),
+                                     security_status=getattr(device, "security_status", None),
+                                     device_classes=self._device_classes[shard])
+        table = self.tables[shard]
+        table.setpoint[shard_device.row] = table.temperature[shard_device.row]
+        self.registry.add(shard_device)
+        return shard_device
+
+    def remove_device(self, device_id, device_type=None):
+        """Remove a device and release its shard row once every registry listener has seen the removal."""
+        removed = super().remove_device(device_id, device_type)
+        for device in removed:
+            device.release()
+        return removed
+
+    def add_devices(self, devices):
+        """Copy many devices into their shards; see add_device."""
+        count = 0
+        for device in devices:
+            self.add_device(device)
+            count += 1
+        return count
+
+    def shard_sizes(self):
+        """Return the number of devices in each shard."""
+        return [len(table) for table in self.tables]
+
+    def step(self, dt, ticks=1):
+        """Advance every shard by ticks steps of dt seconds, in parallel, and wait for all of them.
+
+        Returns:
+            The number of devices simulated.
+        """
+        for connection, table in zip(self._connections, self.tables):
+            connection.send(("step", dt, ticks, table.used_rows))
+        return sum(connection.recv() for connection in self._connections)
+
+    def run(self, rate_hz, duration):
+        """Step the shards in real time for duration seconds at rate_hz ticks per second."""
+        interval = 1.0 / rate_hz
+        start = last = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            self.step(now - last)
+            last = now
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+
+    def close(self):
+        """Stop the workers and free the shared memory; the shard-backed devices become unusable."""
+        for connection in self._connections:
+            connection.send(("stop",))
+        for worker in self._workers:
+            worker.join()
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        self._workers = []
+        for table in self.tables:
+            table.close()
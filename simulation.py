@@ -0,0 +1,272 @@
+import threading
+import time
+
+import numpy as np
+
+from device_registry import RegistryListener, device_key
+
+# Security statuses a simulated camera can report, indexed by status code
+SECURITY_STATUSES = ("All Clear", "Motion Detected", "Intrusion Detected")
+
+# Brightness points per second a light fades by
+DEFAULT_FADE_RATE = 60.0
+
+DEFAULT_SETPOINT = 21.0
+
+# Environment variable that makes the dashboard simulate its devices, set to the tick rate in Hz
+SIMULATE_ENV = "HOMEMATE_SIMULATE"
+
+# Published attribute of each device type, and the decimals it is compared at (None for exact codes)
+PUBLISHED_ATTRIBUTES = {"SmartLight": ("brightness", 0), "Thermostat": ("temperature", 1),
+                        "SecurityCamera": ("security_status", None)}
+
+
+class DeviceBatch:
+    """Structure-of-arrays state of every simulated device of one type.
+
+    Each field is a NumPy array indexed by row. Removing a device moves the last row
+    into its place, so the populated rows are always ``0..size-1`` and every step
+    operates on contiguous slices.
+    """
+    def __init__(self, fields, capacity=1024):
+        """Initialize an empty DeviceBatch.
+
+        Args:
+            fields: Mapping of field name to (dtype, default value).
+            capacity: Initial number of rows allocated.
+        """
+        self.fields = fields
+        self.size = 0
+        self.keys = []
+        self.devices = []
+        self.rows = {}
+        self.arrays = {name: np.full(capacity, default, dtype) for name, (dtype, default) in fields.items()}
+
+    def add(self, key, device=None, **values):
+        """Add a row for a device and return its index.
+
+        Args:
+            key: The ``(device_type, device_id)`` key of the device.
+            device: The device object mirrored by the row, or None for a purely
+                simulated device.
+            **values: Initial field values; missing fields use their defaults.
+        """
+        if key in self.rows:
+            raise ValueError(f"Device '{key[0]}#{key[1]}' is already simulated.")
+        row = self.size
+        if row == len(next(iter(self.arrays.values()))):
+            for name, values_array in self.arrays.items():
+                grown = np.full(2 * row, self.fields[name][1], values_array.dtype)
+                grown[:row] = values_array
+                self.arrays[name] = grown
+        for name, (_, default) in self.fields.items():
+            self.arrays[name][row] = values.get(name, default)
+        self.keys.append(key)
+        self.devices.append(device)
+        self.rows[key] = row
+        self.size += 1
+        return row
+
+    def remove(self, key):
+        """Remove the row of a device, if it is simulated."""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            for values_array in self.arrays.values():
+                values_array[row] = values_array[last]
+            self.keys[row] = self.keys[last]
+            self.devices[row] = self.devices[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.devices.pop()
+        self.size = last
+
+    def __getitem__(self, name):
+        """Return the populated slice of a field array; writes go to the batch."""
+        return self.arrays[name][:self.size]
+
+
+class SimulationEngine(RegistryListener):
+    """Tick-based, GUI-independent simulation of every device in the smart home.
+
+    Device state is held in one DeviceBatch per device type and advanced with
+    vectorized NumPy operations: lights fade towards full or zero brightness,
+    thermostats drift randomly and are pulled towards their setpoint while on, and
+    cameras that are on report random security events. A thermostat's setpoint is
+    the temperature last set on the device from outside the engine, e.g. by the
+    dashboard slider or the API.
+
+    Registered as a listener of the automation system, the engine mirrors devices
+    as they are added and removed and picks up changes made elsewhere. ``publish``
+    writes simulated values back to the device objects so that dashboards only have
+    to observe them. The last published value of every device is kept in a column
+    of its batch, seeded from the device when it is added, so it moves with the
+    device's row and nothing is published until the simulation changes. Devices
+    can also be simulated without device objects through ``add_simulated_device``,
+    which is how large headless fleets are run.
+    """
+    def __init__(self, seed=None, fade_rate=DEFAULT_FADE_RATE, drift=0.05, setpoint_gain=0.2,
+                 security_event_rate=0.01):
+        """Initialize a SimulationEngine.
+
+        Args:
+            seed: Seed of the random number generator.
+            fade_rate: Brightness points per second a light fades by.
+            drift: Standard deviation of the thermostat temperature drift per sqrt(second).
+            setpoint_gain: Fraction of the distance to the setpoint a thermostat covers per second while on.
+            security_event_rate: Expected security events per camera per second.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.fade_rate = fade_rate
+        self.drift = drift
+        self.setpoint_gain = setpoint_gain
+        self.security_event_rate = security_event_rate
+        self.lights = DeviceBatch({"status": (np.bool_, False), "brightness": (np.float32, 0.0),
+                                   "published": (np.float32, 0.0)})
+        self.thermostats = DeviceBatch({"status": (np.bool_, False), "temperature": (np.float32, DEFAULT_SETPOINT),
+                                        "setpoint": (np.float32, DEFAULT_SETPOINT),
+                                        "published": (np.float32, DEFAULT_SETPOINT)})
+        self.cameras = DeviceBatch({"status": (np.bool_, False), "security_status": (np.int8, 0),
+                                    "published": (np.int8, 0)})
+        self.batches = {"SmartLight": self.lights, "Thermostat": self.thermostats, "SecurityCamera": self.cameras}
+        self.elapsed = 0.0
+        self.ticks = 0
+        self._publishing = False
+
+    def add_simulated_device(self, device_type, device_id, **values):
+        """Simulate a device that has no device object, e.g. for headless load tests."""
+        batch = self.batches[device_type]
+        row = batch.add((device_type, device_id), **values)
+        self._seed_published(device_type, batch, row)
+        return row
+
+    def device_added(self, device):
+        key = device_key(device)
+        batch = self.batches.get(key[0])
+        if batch is not None:
+            values = self._device_values(device)
+            if "temperature" in values:
+                values["setpoint"] = values["temperature"]
+            row = batch.add(key, device, **values)
+            self._seed_published(key[0], batch, row)
+
+    def device_removed(self, device):
+        key = device_key(device)
+        batch = self.batches.get(key[0])
+        if batch is not None:
+            batch.remove(key)
+
+    def device_changed(self, device, attributes):
+        if self._publishing:
+            return
+        key = device_key(device)
+        batch = self.batches.get(key[0])
+        row = batch.rows.get(key) if batch is not None else None
+        if row is None:
+            return
+        values = self._device_values(device)
+        if "temperature" in values and "setpoint" in batch.fields and (not attributes or "temperature" in attributes):
+            values["setpoint"] = values["temperature"]
+        for name, value in values.items():
+            batch.arrays[name][row] = value
+        self._seed_published(key[0], batch, row)
+
+    def _seed_published(self, device_type, batch, row):
+        """Record the simulated value of a row as published, since the device already has it."""
+        name, decimals = PUBLISHED_ATTRIBUTES[device_type]
+        value = batch.arrays[name][row]
+        batch.arrays["published"][row] = value if decimals is None else np.round(value, decimals)
+
+    def _device_values(self, device):
+        values = {"status": bool(device.status)}
+        if getattr(device, "brightness", None) is not None:
+            values["brightness"] = device.brightness
+        if getattr(device, "temperature", None) is not None:
+            values["temperature"] = device.temperature
+        if getattr(device, "security_status", None) in SECURITY_STATUSES:
+            values["security_status"] = SECURITY_STATUSES.index(device.security_status)
+        return values
+
+    def step(self, dt):
+        """Advance every simulated device by dt seconds."""
+        lights = self.lights
+        if lights.size:
+            brightness = lights["brightness"]
+            target = np.where(lights["status"], np.float32(100.0), np.float32(0.0))
+            max_change = np.float32(self.fade_rate * dt)
+            brightness += np.clip(target - brightness, -max_change, max_change)
+
+        thermostats = self.thermostats
+        if thermostats.size:
+            temperature = thermostats["temperature"]
+            temperature += self.rng.normal(0.0, self.drift * np.sqrt(dt), thermostats.size).astype(np.float32)
+            on = thermostats["status"]
+            gain = np.float32(min(1.0, self.setpoint_gain * dt))
+            temperature[on] += (thermostats["setpoint"][on] - temperature[on]) * gain
+
+        cameras = self.cameras
+        if cameras.size:
+            events = np.flatnonzero(cameras["status"] & (self.rng.random(cameras.size) < self.security_event_rate * dt))
+            if events.size:
+                cameras["security_status"][events] = self.rng.integers(0, len(SECURITY_STATUSES), events.size)
+
+        self.elapsed += dt
+        self.ticks += 1
+
+    def publish(self, mark_changed):
+        """Write simulated values that changed since the last publish back to the device objects.
+
+        Temperatures are compared at 0.1℃ resolution so that drift below what the
+        dashboard displays does not generate updates.
+
+        Args:
+            mark_changed: Callable notified as ``mark_changed(device, attribute)``
+                for every device updated, e.g. ``automation_system.mark_device_changed``.
+
+        Returns:
+            The number of device attributes updated.
+        """
+        updated = 0
+        self._publishing = True
+        try:
+            for device_type, batch in self.batches.items():
+                name, decimals = PUBLISHED_ATTRIBUTES[device_type]
+                values = batch[name] if decimals is None else np.round(batch[name], decimals)
+                published = batch["published"]
+                changed = np.flatnonzero(values != published)
+                published[changed] = values[changed]
+                for row in changed.tolist():
+                    device = batch.devices[row]
+                    if device is None:
+                        continue
+                    value = values[row].item()
+                    setattr(device, name, SECURITY_STATUSES[value] if name == "security_status" else value)
+                    mark_changed(device, name)
+                    updated += 1
+        finally:
+            self._publishing = False
+        return updated
+
+    def run(self, rate_hz, duration=None, stop_event=None, on_tick=None):
+        """Step the simulation in real time until the duration passes or stop_event is set.
+
+        Args:
+            rate_hz: Ticks per second.
+            duration: Seconds to run for, or None to run until stopped.
+            stop_event: threading.Event that ends the loop when set.
+            on_tick: Optional callable invoked after every tick, e.g. to publish.
+        """
+        stop_event = stop_event or threading.Event()
+        interval = 1.0 / rate_hz
+        start = last = time.perf_counter()
+        while not stop_event.is_set():
+            now = time.perf_counter()
+            if duration is not None and now - start >= duration:
+                break
+            self.step(now - last)
+            last = now
+            if on_tick is not None:
+                on_tick()
+            stop_event.wait(max(0.0, interval - (time.perf_counter() - now)))
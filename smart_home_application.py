@@ -1,10 +1,10 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit, QMessageBox
-from PyQt5.QtGui import QIcon, QPixmap
 from PyQt5.QtCore import Qt
-from smart_home.monitoring_dashboard import SmartHomeGUI
-from smart_home.central_automation_system import CentralAutomationSystem
+from assets import assets, LOGO_WIDTH
 from database import DatabaseManager
+from async_database import AsyncDatabase
+from credentials import SessionCache
 
 class CustomMessageBox(QMessageBox):
     """Custom QMessageBox with styled buttons."""
@@ -40,6 +40,15 @@ class SmartHomeApplication:
     def __init__(self):
         self.db_manager = DatabaseManager()  # Connect to the database
         self.app = QApplication(sys.argv)
+        # Run database queries off the GUI thread
+        self.async_db = AsyncDatabase(self.db_manager)
+        self.async_db.authentication_finished.connect(self.authentication_finished)
+        self.async_db.registration_finished.connect(self.registration_finished)
+        self.async_db.database_error.connect(self.database_error)
+        self.app.aboutToQuit.connect(self.async_db.shutdown)
+        self.app.aboutToQuit.connect(self.db_manager.close)
+        self.sessions = SessionCache()
+        self.session_token = None
         self.login_window = QWidget()
         self.registration_window = QWidget()
         self.dashboard = None  # Initialize dashboard as None
@@ -49,14 +58,14 @@ class SmartHomeApplication:
 
     def setup_login_window(self):
         self.login_window.setWindowTitle("HomeMate - Make Your Life Easier")
-        self.login_window.setWindowIcon(QIcon('C:/Users/milan/Desktop/SmartHomeApplication/R.png'))
+        self.login_window.setWindowIcon(assets.icon('R.png'))
         self.login_window.setStyleSheet("background-color: #f2f2f2;")
 
         layout = QVBoxLayout()
 
         # Logo
         logo_label = QLabel()
-        logo_pixmap = QPixmap('C:/Users/milan/Desktop/SmartHomeApplication/R.png')
+        logo_pixmap = assets.pixmap('R.png', width=LOGO_WIDTH)
         logo_label.setPixmap(logo_pixmap)
         logo_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(logo_label, 30)
@@ -82,10 +91,10 @@ class SmartHomeApplication:
         layout.addWidget(self.password_textfield)
 
         # Login button
-        login_button = QPushButton("Login")
-        login_button.clicked.connect(self.login_clicked)
-        login_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
-        layout.addWidget(login_button)
+        self.login_button = QPushButton("Login")
+        self.login_button.clicked.connect(self.login_clicked)
+        self.login_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        layout.addWidget(self.login_button)
 
         # Registration button
         register_button = QPushButton("Register")
@@ -97,7 +106,7 @@ class SmartHomeApplication:
 
     def setup_registration_window(self):
         self.registration_window.setWindowTitle("HomeMate - Registration")
-        self.registration_window.setWindowIcon(QIcon('C:/Users/milan/Desktop/SmartHomeApplication/R.png'))
+        self.registration_window.setWindowIcon(assets.icon('R.png'))
         self.registration_window.setStyleSheet("background-color: #f2f2f2;")
 
         layout = QVBoxLayout()
@@ -130,10 +139,10 @@ class SmartHomeApplication:
         layout.addWidget(self.confirm_password_textfield)
 
         # Register button
-        register_button = QPushButton("Register")
-        register_button.clicked.connect(self.register_clicked)
-        register_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
-        layout.addWidget(register_button)
+        self.register_button = QPushButton("Register")
+        self.register_button.clicked.connect(self.register_clicked)
+        self.register_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        layout.addWidget(self.register_button)
 
         # Back to login button
         back_button = QPushButton("Back to Login")
@@ -147,19 +156,32 @@ class SmartHomeApplication:
         username = self.username_textfield.text()
         password = self.password_textfield.text()
 
-        # Perform login authentication
-        authenticated = self.db_manager.authenticate(username, password)
+        # Perform login authentication on a database worker thread
+        self.login_button.setEnabled(False)
+        self.async_db.authenticate(username, password)
+
+    def authentication_finished(self, username, authenticated):
+        self.login_button.setEnabled(True)
         if authenticated:
-            # If login is successful, load the dashboard
+            # If login is successful, start a session and load the dashboard
+            self.session_token = self.sessions.create(username)
             self.load_dashboard()
         else:
             CustomMessageBox("Login Failed", "Invalid username or password. Please try again.").exec_()
 
     def load_dashboard(self):
+        # A verified session lets the dashboard be reopened without hashing the password again
+        if self.sessions.validate(self.session_token) is None:
+            self.show_login()
+            return
         # Close login window
         self.login_window.close()
         # Initialize and display the dashboard
-        self.dashboard = SmartHomeGUI(CentralAutomationSystem())
+        if self.dashboard is None:
+            # The dashboard modules are only needed after a successful login
+            from smart_home.monitoring_dashboard import SmartHomeGUI
+            from smart_home.central_automation_system import CentralAutomationSystem
+            self.dashboard = SmartHomeGUI(CentralAutomationSystem())
         self.dashboard.show()
 
     def register_clicked(self):
@@ -172,13 +194,23 @@ class SmartHomeApplication:
             CustomMessageBox("Registration Failed", "Passwords do not match. Please try again.").exec_()
             return
 
-        # Register user
-        registration_successful = self.db_manager.register_user(username, password)
+        # Register user on a database worker thread
+        self.register_button.setEnabled(False)
+        self.async_db.register_user(username, password)
+
+    def registration_finished(self, username, registration_successful):
+        self.register_button.setEnabled(True)
         if registration_successful:
+            self.session_token = self.sessions.create(username)
             self.load_dashboard()  # Load dashboard after successful registration
         else:
             CustomMessageBox("Registration Failed", "Username already exists. Please choose a different username.").exec_()
 
+    def database_error(self, message):
+        self.login_button.setEnabled(True)
+        self.register_button.setEnabled(True)
+        CustomMessageBox("Database Error", f"Could not reach the database: {message}").exec_()
+
     def show_registration(self):
         self.login_window.hide()  # Hide login window
         self.registration_window.show()  # Show registration window
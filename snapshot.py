@@ -0,0 +1,281 @@
+"""Snapshots of the complete state of a smart home in a compact columnar file.
+
+Usage:
+    python snapshot.py info SNAPSHOT
+"""
+import argparse
+import json
+import mmap
+import struct
+import zlib
+
+import numpy as np
+
+from device_factory import DEVICE_CLASSES, STATE_ATTRIBUTES, create_devices
+from device_registry import device_key
+
+SNAPSHOT_MAGIC = b"HMSNAP\x00\x01"
+SNAPSHOT_VERSION = 1
+
+# Column blobs start at multiples of this, so uncompressed columns can be viewed in place
+COLUMN_ALIGNMENT = 8
+
+# Separator of the device IDs in the "ids" column
+ID_SEPARATOR = "\x00"
+
+# Per-device columns and their on-disk dtypes; optional values use NaN or code 0 for None.
+# Values are stored as float64 so a restored device has exactly the value it was saved with;
+# the header records each column's dtype, so snapshots written with float32 columns still load.
+COLUMN_DTYPES = {
+    "type": "<u1",
+    "status": "<u1",
+    "brightness": "<f8",
+    "temperature": "<f8",
+    "security_status": "<u2",
+    "room": "<u4",
+    "tags": "<u4",
+    "ids": "<u1",
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a file is not a readable snapshot."""
+
+
+def _encode(value, table, codes):
+    """Return the code of a value in a table of distinct values, adding it if it is new; None is code 0."""
+    if value is None:
+        return 0
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(table) + 1
+        table.append(value)
+    return code
+
+
+def save_snapshot(automation_system, path, compress=False):
+    """Write the devices of an automation system, with their rooms and tags, to a snapshot file.
+
+    Args:
+        automation_system: The automation system to save.
+        path: Path of the snapshot file.
+        compress: Whether to compress the columns with zlib; compressed snapshots
+            are smaller but cannot be memory-mapped.
+
+    Returns:
+        The number of devices saved.
+
+    Raises:
+        ValueError: If a device ID contains a NUL character.
+    """
+    devices = automation_system.get_devices()
+    count = len(devices)
+    type_names, type_codes = [], {}
+    security_statuses, security_codes = [], {}
+    rooms, room_codes = [], {}
+    tag_sets, tag_codes = [], {}
+    columns = {name: np.zeros(count, dtype) for name, dtype in COLUMN_DTYPES.items() if name != "ids"}
+    ids = []
+    for row, device in enumerate(devices):
+        device_type, device_id = device_key(device)
+        device_id = str(device_id)
+        if ID_SEPARATOR in device_id:
+            raise ValueError(f"Device ID {device_id!r} contains a NUL character.")
+        ids.append(device_id)
+        columns["type"][row] = _encode(device_type, type_names, type_codes)
+        columns["status"][row] = bool(device.status)
+        brightness = getattr(device, "brightness", None)
+        columns["brightness"][row] = np.nan if brightness is None else brightness
+        temperature = getattr(device, "temperature", None)
+        columns["temperature"][row] = np.nan if temperature is None else temperature
+        columns["security_status"][row] = _encode(getattr(device, "security_status", None), security_statuses,
+                                                  security_codes)
+        columns["room"][row] = _encode(automation_system.get_device_room(device), rooms, room_codes)
+        tags = automation_system.get_device_tags(device)
+        columns["tags"][row] = _encode(tuple(sorted(tags)) if tags else None, tag_sets, tag_codes)
+    columns["ids"] = np.frombuffer(ID_SEPARATOR.join(ids).encode(), np.uint8)
+
+    blobs = {}
+    for name, values in columns.items():
+        data = values.tobytes()
+        blobs[name] = (zlib.compress(data, 6) if compress else data, len(data))
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "count": count,
+        "compression": "zlib" if compress else None,
+        "tables": {"type": type_names, "security_status": security_statuses, "room": rooms,
+                   "tags": [list(tags) for tags in tag_sets]},
+        "columns": {},
+    }
+    # Column offsets depend on the header length, so lay the columns out until it stops changing
+    header_bytes = b""
+    while True:
+        offset = _align(len(SNAPSHOT_MAGIC) + 4 + len(header_bytes))
+        for name, (data, raw_size) in blobs.items():
+            header["columns"][name] = {"dtype": COLUMN_DTYPES[name], "offset": offset, "size": len(data),
+                                       "raw_size": raw_size}
+            offset = _align(offset + len(data))
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+        if encoded == header_bytes:
+            break
+        header_bytes = encoded
+
+    with open(path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for name, (data, _) in blobs.items():
+            file.write(b"\x00" * (header["columns"][name]["offset"] - file.tell()))
+            file.write(data)
+    return count
+
+
+def _align(offset):
+    return (offset + COLUMN_ALIGNMENT - 1) // COLUMN_ALIGNMENT * COLUMN_ALIGNMENT
+
+
+class Snapshot:
+    """Read access to a snapshot file.
+
+    Uncompressed columns are NumPy views of a memory map of the file, so opening
+    a snapshot reads only the header and columns are paged in as they are used.
+    """
+    def __init__(self, path):
+        """Open a snapshot file.
+
+        Raises:
+            SnapshotError: If the file is not a snapshot or has an unsupported version.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"'{path}' is empty.")
+        if self._map[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            self.close()
+            raise SnapshotError(f"'{path}' is not a HomeMate snapshot.")
+        header_length, = struct.unpack_from("<I", self._map, len(SNAPSHOT_MAGIC))
+        start = len(SNAPSHOT_MAGIC) + 4
+        self.header = json.loads(self._map[start:start + header_length])
+        if self.header["version"] != SNAPSHOT_VERSION:
+            self.close()
+            raise SnapshotError(f"Unsupported snapshot version {self.header['version']}.")
+        self.count = self.header["count"]
+        self.tables = self.header["tables"]
+        self._columns = {}
+
+    def column(self, name):
+        """Return a per-device column as a NumPy array."""
+        values = self._columns.get(name)
+        if values is None:
+            info = self.header["columns"][name]
+            if self.header["compression"] == "zlib":
+                data = zlib.decompress(self._map[info["offset"]:info["offset"] + info["size"]])
+                values = np.frombuffer(data, info["dtype"])
+            else:
+                values = np.frombuffer(self._map, info["dtype"], info["raw_size"] // np.dtype(info["dtype"]).itemsize,
+                                       info["offset"])
+            self._columns[name] = values
+        return values
+
+    def device_ids(self):
+        """Return the list of device IDs, in row order."""
+        if not self.count:
+            return []
+        return self.column("ids").tobytes().decode().split(ID_SEPARATOR)
+
+    def devices(self, device_classes=DEVICE_CLASSES):
+        """Construct every device of the snapshot.
+
+        Args:
+            device_classes: Mapping of type name to device class, e.g.
+                ``compact_devices.COMPACT_DEVICE_CLASSES``.
+
+        Returns:
+            A list of devices in row order.
+        """
+        ids = self.device_ids()
+        types = self.column("type")
+        statuses = self.column("status")
+        value_columns = {"brightness": self.column("brightness"), "temperature": self.column("temperature")}
+        security_statuses = [None] + self.tables["security_status"]
+        devices = [None] * self.count
+        for code, device_type in enumerate(self.tables["type"], 1):
+            rows = np.flatnonzero(types == code)
+            if not rows.size:
+                continue
+            rows_list = rows.tolist()
+            attribute, _ = STATE_ATTRIBUTES.get(device_type, (None, None))
+            if attribute in value_columns:
+                # NaN, the only value not equal to itself, marks a device without the attribute
+                values = [None if value != value else value for value in value_columns[attribute][rows].tolist()]
+            else:
+                values = [security_statuses[value] for value in self.column("security_status")[rows].tolist()]
+            typed_devices = create_devices(device_type, [ids[row] for row in rows_list],
+                                           statuses[rows].astype(bool).tolist(), values, device_classes)
+            for row, device in zip(rows_list, typed_devices):
+                devices[row] = device
+        return devices
+
+    def close(self):
+        self._columns = {}
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def restore_snapshot(path, automation_system, device_classes=DEVICE_CLASSES):
+    """Add every device of a snapshot, with its room and tags, to an automation system.
+
+    Devices are constructed in bulk and registered in one ``add_devices`` call,
+    and their rooms and tags are assigned with one bulk call each, without going
+    through the dashboard.
+
+    Args:
+        path: Path of the snapshot file.
+        automation_system: The automation system to restore into.
+        device_classes: Mapping of type name to device class used to construct the devices.
+
+    Returns:
+        The number of devices restored.
+
+    Raises:
+        SnapshotError: If the file is not a readable snapshot.
+        ValueError: If a device of the snapshot is already registered.
+    """
+    with Snapshot(path) as snapshot:
+        devices = snapshot.devices(device_classes)
+        rooms = [None] + snapshot.tables["room"]
+        tag_sets = [None] + snapshot.tables["tags"]
+        room_codes = snapshot.column("room")
+        tag_codes = snapshot.column("tags")
+        assigned_rooms = np.flatnonzero(room_codes).tolist()
+        assigned_tags = np.flatnonzero(tag_codes).tolist()
+        room_codes = room_codes[assigned_rooms].tolist()
+        tag_codes = tag_codes[assigned_tags].tolist()
+    automation_system.add_devices(devices)
+    automation_system.set_devices_rooms([devices[row] for row in assigned_rooms], [rooms[code] for code in room_codes])
+    automation_system.set_devices_tags([devices[row] for row in assigned_tags], [tag_sets[code] for code in tag_codes])
+    return len(devices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("snapshot")
+    args = parser.parse_args()
+    with Snapshot(args.snapshot) as snapshot:
+        types = np.bincount(snapshot.column("type"), minlength=len(snapshot.tables["type"]) + 1)
+        print(f"{snapshot.count} devices, compression: {snapshot.header['compression'] or 'none'}")
+        for code, name in enumerate(snapshot.tables["type"], 1):
+            print(f"  {name}: {types[code]}")
+        print(f"  {len(snapshot.tables['room'])} rooms, {len(snapshot.tables['tags'])} distinct tag sets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from urllib.parse import quote
+
+from device_registry import RegistryListener, device_key
+
+DEFAULT_TELEMETRY_DIR = 'telemetry'
+
+# Raw samples kept in memory per series before they are flushed to disk
+DEFAULT_BUFFER_CAPACITY = 1024
+
+# Seconds between background flushes of buffered samples and rollups
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Pre-aggregated rollup resolutions in seconds (1 minute and 1 hour)
+ROLLUP_RESOLUTIONS = (60, 3600)
+
+ROLLUP_COLUMNS = ('bucket', 'min', 'max', 'sum', 'count')
+
+# File of the raw (timestamp, value) rows of a series
+RAW_FILE = 'raw.bin'
+
+# Device attributes recorded by TelemetryRecorder
+RECORDED_METRICS = ('status', 'brightness', 'temperature')
+
+_DOUBLE = struct.Struct('<d')
+
+
+class RingBuffer:
+    """Bounded buffer of (timestamp, value) samples backed by typed arrays.
+
+    The arrays grow as samples arrive, up to the capacity, and are freed by
+    ``clear``, so an idle buffer takes no memory.
+    """
+    def __init__(self, capacity=DEFAULT_BUFFER_CAPACITY):
+        """Initialize an empty RingBuffer.
+
+        Args:
+            capacity: Maximum number of samples held.
+        """
+        self.capacity = capacity
+        self.timestamps = array('d')
+        self.values = array('d')
+        self._start = 0
+        self._length = 0
+
+    def append(self, timestamp, value):
+        """Add a sample, overwriting the oldest one if the buffer is full."""
+        if self._length < self.capacity:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            self._length += 1
+            return
+        self.timestamps[self._start] = timestamp
+        self.values[self._start] = value
+        self._start = (self._start + 1) % self.capacity
+
+    def columns(self):
+        """Return the buffered samples, oldest first, as (timestamps, values) arrays."""
+        end = self._start + self._length
+        if end <= self.capacity:
+            return self.timestamps[self._start:end], self.values[self._start:end]
+        end -= self.capacity
+        return (self.timestamps[self._start:] + self.timestamps[:end],
+                self.values[self._start:] + self.values[:end])
+
+    def clear(self):
+        """Drop every buffered sample and free the arrays."""
+        del self.timestamps[:]
+        del self.values[:]
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+
+class _Series:
+    """In-memory state of one (device, metric) series."""
+    def __init__(self, path, buffer_capacity):
+        self.path = path
+        self.buffer = RingBuffer(buffer_capacity)
+        # Samples of buffers that filled up, waiting to be written, as (timestamps, values) arrays
+        self.full_buffers = []
+        self.last_timestamp = float('-inf')
+        # Open rollup bucket per resolution: [bucket, min, max, sum, count]
+        self.open_buckets = {}
+        # Completed rollup buckets not yet written to disk, per resolution
+        self.closed_buckets = {resolution: [] for resolution in ROLLUP_RESOLUTIONS}
+        # Start of the last rollup bucket on disk per resolution; it is rewritten in place while open
+        self.written_buckets = {}
+
+    def load(self):
+        """Pick up the latest sample and reopen the last rollup bucket of each resolution from disk."""
+        last = _read_last(os.path.join(self.path, RAW_FILE), 2)
+        if last is not None:
+            self.last_timestamp = last[0]
+        for resolution in ROLLUP_RESOLUTIONS:
+            row = _read_last(_rollup_path(self.path, resolution), len(ROLLUP_COLUMNS))
+            if row is not None:
+                self.open_buckets[resolution] = row
+                self.written_buckets[resolution] = row[0]
+
+    def pending_samples(self):
+        """Return the samples not written yet, oldest first, as (timestamps, values) arrays."""
+        timestamps, values = array('d'), array('d')
+        for chunk_timestamps, chunk_values in self.full_buffers + [self.buffer.columns()]:
+            timestamps.extend(chunk_timestamps)
+            values.extend(chunk_values)
+        return timestamps, values
+
+    def pending_buckets(self, resolution):
+        """Return copies of the rollup buckets of a resolution whose current state isn't on disk."""
+        buckets = list(self.closed_buckets[resolution])
+        if resolution in self.open_buckets:
+            buckets.append(list(self.open_buckets[resolution]))
+        return buckets
+
+    def take_writes(self):
+        """Move the state not written yet out of the series.
+
+        Returns:
+            A list of (path, rows, width, overwrite_last) writes, where rows is a flat
+            array of rows of width values and overwrite_last tells whether the first
+            row replaces the last row of the file.
+        """
+        writes = []
+        timestamps, values = self.pending_samples()
+        if timestamps:
+            rows = array('d', [0.0]) * (2 * len(timestamps))
+            rows[0::2] = timestamps
+            rows[1::2] = values
+            writes.append((os.path.join(self.path, RAW_FILE), rows, 2, False))
+            self.full_buffers = []
+            self.buffer.clear()
+        for resolution in ROLLUP_RESOLUTIONS:
+            buckets = self.pending_buckets(resolution)
+            if not buckets:
+                continue
+            # The first bucket may have been written while it was open; update that row
+            overwrite_last = self.written_buckets.get(resolution) == buckets[0][0]
+            rows = array('d', [value for bucket in buckets for value in bucket])
+            writes.append((_rollup_path(self.path, resolution), rows, len(ROLLUP_COLUMNS), overwrite_last))
+            self.written_buckets[resolution] = buckets[-1][0]
+            self.closed_buckets[resolution] = []
+        return writes
+
+
+class TelemetryStore:
+    """Append-only history of device readings with 1 minute and 1 hour rollups.
+
+    Recent raw samples are kept in per-series ring buffers and flushed to disk as
+    rows of float64 values, so a series takes three files: its raw samples and
+    one per rollup resolution. Rollups (min, max, sum, count) are maintained
+    incrementally as samples arrive and are flushed the same way; the still open
+    bucket is written as the last row and rewritten in place until it closes,
+    which also lets a reopened store continue it. A background thread flushes the
+    series that changed every flush interval, and a series is also flushed as
+    soon as its buffer is full. Flushes take the pending state under the lock but
+    write it after releasing it, so recording never waits for the disk. Range
+    queries binary-search the sorted timestamp or bucket column on disk, so their
+    cost depends on the size of the result rather than the length of the history.
+    """
+    def __init__(self, directory=DEFAULT_TELEMETRY_DIR, buffer_capacity=DEFAULT_BUFFER_CAPACITY,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Initialize a TelemetryStore and start the flush thread.
+
+        Args:
+            directory: Directory the columnar files are written to.
+            buffer_capacity: Raw samples buffered per series before they are flushed.
+            flush_interval: Seconds between background flushes, or None to only flush
+                full buffers and on ``flush`` and ``close``.
+        """
+        self.directory = directory
+        self.buffer_capacity = buffer_capacity
+        self.flush_interval = flush_interval
+        self._series = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        # Held while state moves from memory to disk, so queries see all of it in one place or the other
+        self._io_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        if flush_interval is not None:
+            self._thread = threading.Thread(target=self._run, name="telemetry-store", daemon=True)
+            self._thread.start()
+
+    def _series_path(self, device_type, device_id, metric):
+        return os.path.join(self.directory, quote(f'{device_type}#{device_id}#{metric}', safe=''))
+
+    def _get_series(self, device_type, device_id, metric):
+        key = (device_type, device_id, metric)
+        series = self._series.get(key)
+        if series is None:
+            series = _Series(self._series_path(device_type, device_id, metric), self.buffer_capacity)
+            series.load()
+            self._series[key] = series
+        return series
+
+    def record(self, device_type, device_id, metric, value, timestamp=None):
+        """Record a reading.
+
+        Args:
+            device_type: The class name of the device.
+            device_id: The ID of the device.
+            metric: Name of the recorded attribute.
+            value: The numeric reading.
+            timestamp: Seconds since the epoch; defaults to now. Timestamps earlier than
+                the series' latest sample are clamped to keep the series sorted.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        value = float(value)
+        with self._lock:
+            series = self._get_series(device_type, device_id, metric)
+            self._dirty.add(series)
+            timestamp = max(timestamp, series.last_timestamp)
+            series.last_timestamp = timestamp
+            series.buffer.append(timestamp, value)
+            full = len(series.buffer) == self.buffer_capacity
+            if full:
+                series.full_buffers.append(series.buffer.columns())
+                series.buffer.clear()
+            for resolution in ROLLUP_RESOLUTIONS:
+                bucket = timestamp - timestamp % resolution
+                current = series.open_buckets.get(resolution)
+                if current is not None and current[0] == bucket:
+                    current[1] = min(current[1], value)
+                    current[2] = max(current[2], value)
+                    current[3] += value
+                    current[4] += 1
+                else:
+                    if current is not None:
+                        series.closed_buckets[resolution].append(current)
+                    series.open_buckets[resolution] = [bucket, value, value, value, 1]
+        if full:
+            self._write_series([series])
+
+    def flush(self):
+        """Write the buffered samples and rollup buckets of every changed series to disk."""
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+        self._write_series(dirty)
+
+    def _write_series(self, series_list):
+        with self._io_lock:
+            with self._lock:
+                writes = [(series.path, series.take_writes()) for series in series_list]
+            for path, series_writes in writes:
+                if series_writes:
+                    os.makedirs(path, exist_ok=True)
+                for file_path, rows, width, overwrite_last in series_writes:
+                    _write_rows(file_path, rows, width, overwrite_last)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread and write everything to disk."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def query(self, device_type, device_id, metric, start, end, resolution=None):
+        """Return the readings of a series within [start, end].
+
+        Args:
+            device_type: The class name of the device.
+            device_id: The ID of the device.
+            metric: Name of the recorded attribute.
+            start: Start of the range, in seconds since the epoch.
+            end: End of the range, in seconds since the epoch.
+            resolution: None for raw samples, or one of ROLLUP_RESOLUTIONS for
+                pre-aggregated buckets.
+
+        Returns:
+            A list of (timestamp, value) tuples for raw samples, or of
+            (bucket_start, min, max, mean) tuples for rollups.
+
+        Raises:
+            ValueError: If the resolution is not a supported rollup resolution.
+        """
+        if resolution is not None and resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unsupported rollup resolution {resolution}; use one of {ROLLUP_RESOLUTIONS}.")
+        with self._io_lock:
+            with self._lock:
+                # Unknown series are read from disk as they are, without being opened
+                series = self._series.get((device_type, device_id, metric))
+                path = series.path if series is not None else self._series_path(device_type, device_id, metric)
+                if resolution is None:
+                    file_path, width = os.path.join(path, RAW_FILE), 2
+                    pending = list(series.pending_samples()) if series is not None else [array('d'), array('d')]
+                else:
+                    file_path, width = _rollup_path(path, resolution), len(ROLLUP_COLUMNS)
+                    buckets = series.pending_buckets(resolution) if series is not None else []
+                    pending = [array('d', [bucket[column] for bucket in buckets]) for column in range(width)]
+            columns = _read_range(file_path, width, start, end)
+            if resolution is not None and buckets and columns[0] and columns[0][-1] == buckets[0][0]:
+                # The last row on disk is an earlier state of the first pending bucket
+                for column in columns:
+                    column.pop()
+        first = bisect_left(pending[0], start)
+        last = bisect_right(pending[0], end)
+        for column, values in zip(columns, pending):
+            column.extend(values[first:last])
+        if resolution is None:
+            return list(zip(*columns))
+        return [(bucket, low, high, total / count) for bucket, low, high, total, count in zip(*columns)]
+
+
+class TelemetryRecorder(RegistryListener):
+    """Records the numeric state of devices into a TelemetryStore whenever they change."""
+    def __init__(self, store):
+        """Initialize a TelemetryRecorder.
+
+        Args:
+            store: The TelemetryStore readings are recorded into.
+        """
+        self.store = store
+
+    def device_added(self, device):
+        self.device_changed(device, ())
+
+    def device_changed(self, device, attributes):
+        device_type, device_id = device_key(device)
+        timestamp = time.time()
+        for metric in attributes or RECORDED_METRICS:
+            value = getattr(device, metric, None)
+            if metric in RECORDED_METRICS and value is not None:
+                self.store.record(device_type, device_id, metric, value, timestamp)
+
+
+def _rollup_path(path, resolution):
+    return os.path.join(path, f'{resolution}.bin')
+
+
+def _write_rows(path, rows, width, overwrite_last):
+    """Append rows to a file, starting over its last row if overwrite_last is set."""
+    with open(path, 'r+b' if overwrite_last else 'ab') as file:
+        if overwrite_last:
+            file.seek(-8 * width, os.SEEK_END)
+        rows.tofile(file)
+
+
+def _read_last(path, width):
+    """Return the last row of a file of float64 rows, or None if the file is missing or empty."""
+    try:
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() < 8 * width:
+                return None
+            file.seek(-8 * width, os.SEEK_END)
+            row = array('d')
+            row.fromfile(file, width)
+            return row.tolist()
+    except FileNotFoundError:
+        return None
+
+
+def _read_range(path, width, start, end):
+    """Read, as columns, the rows of a file whose first (sorted) value lies within [start, end]."""
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return [array('d') for _ in range(width)]
+    with file:
+        file.seek(0, os.SEEK_END)
+        count = file.tell() // (8 * width)
+        first = _bisect_file(file, width, count, start, right=False)
+        last = _bisect_file(file, width, count, end, right=True)
+        rows = array('d')
+        file.seek(first * 8 * width)
+        rows.fromfile(file, (last - first) * width)
+    return [rows[column::width] for column in range(width)]
+
+
+def _bisect_file(file, width, count, value, right):
+    """Binary search a file of float64 rows, sorted by their first value, without reading all of it."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        file.seek(middle * 8 * width)
+        current = _DOUBLE.unpack(file.read(8))[0]
+        if current < value or (right and current == value):
+            low = middle + 1
+        else:
+            high = middle
+    return low
@@ -0,0 +1 @@
+"""Stand-ins for the smart_home device classes, used when the package is not installed."""
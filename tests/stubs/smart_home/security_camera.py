@@ -0,0 +1,14 @@
+import random
+
+
+class SecurityCamera:
+    def __init__(self, id, status=False, security_status=""):
+        self.id = id
+        self.status = status
+        self.security_status = security_status
+
+    def get_id(self):
+        return self.id
+
+    def set_random_security_status(self):
+        self.security_status = random.choice(("All Clear", "Motion Detected", "Intrusion Detected"))
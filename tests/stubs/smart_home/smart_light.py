@@ -0,0 +1,8 @@
+class SmartLight:
+    def __init__(self, id, status=False, brightness=0.0):
+        self.id = id
+        self.status = status
+        self.brightness = brightness
+
+    def get_id(self):
+        return self.id
@@ -0,0 +1,8 @@
+class Thermostat:
+    def __init__(self, id, status=False, temperature=0.0):
+        self.id = id
+        self.status = status
+        self.temperature = temperature
+
+    def get_id(self):
+        return self.id
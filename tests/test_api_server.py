@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from api_server import ApiServer
+from automation_system import AutomationSystem
+from device_factory import create_device
+from device_search import DeviceSearchIndex
+
+
+@pytest.fixture
+def server():
+    automation_system = AutomationSystem()
+    automation_system.add_device(create_device("SmartLight", "a", status=True, brightness=40.0))
+    return ApiServer(automation_system, search_index=DeviceSearchIndex(automation_system.registry))
+
+
+def request(server, method, path, body=None, query=None):
+    status, payload, _ = server.respond(method, path, query or {}, {},
+                                        json.dumps(body).encode() if body is not None else b"")
+    return status, json.loads(payload)
+
+
+@pytest.mark.parametrize("room", [5, {"name": "kitchen"}, ["kitchen"]])
+def test_update_rejects_a_room_that_is_not_a_string(server, room):
+    items = [{"type": "SmartLight", "id": "a", "brightness": 80}, {"type": "SmartLight", "id": "a", "room": room}]
+    status, payload = request(server, "PATCH", "/devices", items)
+    assert status == 400
+    device = server.automation_system.get_device("SmartLight", "a")
+    assert device.brightness == 40.0
+    assert server.automation_system.get_device_room(device) is None
+
+
+def test_update_assigns_rooms(server):
+    status, payload = request(server, "PATCH", "/devices", [{"type": "SmartLight", "id": "a", "room": "Kitchen"}])
+    assert (status, payload["updated"]) == (200, 1)
+    status, payload = request(server, "GET", "/devices", query={"q": "kitchen"})
+    assert [device["id"] for device in payload["devices"]] == ["a"]
+
+
+def test_search_skips_devices_missing_from_the_registry(server):
+    server.automation_system.add_device(create_device("SmartLight", "b"))
+    # A removal the index has not seen, as when a listener before it failed
+    server.automation_system.registry.remove_listener(server.search_index)
+    server.automation_system.remove_device("a", "SmartLight")
+    status, payload = request(server, "GET", "/devices", query={"q": "smartlight"})
+    assert status == 200
+    assert [device["id"] for device in payload["devices"]] == ["b"]
+    assert payload["next_offset"] is None
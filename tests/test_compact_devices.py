@@ -0,0 +1,72 @@
+import pytest
+
+from compact_devices import CompactDeviceTable, SecurityCamera, SmartLight, Thermostat
+from device_search import DeviceSearchIndex
+from energy import EnergyMonitor
+from event_bus import DeviceRemoved, EventBus, EventPublisher
+from sharded_backend import ShardedAutomationSystem
+
+
+def test_rows_are_reused_after_release():
+    table = CompactDeviceTable(capacity=2)
+    light = SmartLight("a", status=True, brightness=40.0, table=table)
+    row = light.row
+    light.release()
+    camera = SecurityCamera("b", status=True, security_status="Motion Detected", table=table)
+    assert camera.row == row
+    assert len(table) == 1
+    assert [device.get_id() for device in table.devices()] == ["b"]
+
+
+def test_released_handle_keeps_a_copy_of_the_device():
+    table = CompactDeviceTable(capacity=2)
+    thermostat = Thermostat("t", status=True, temperature=21.5, table=table)
+    thermostat.release()
+    Thermostat("other", temperature=30.0, table=table)
+    assert (thermostat.get_id(), thermostat.status, thermostat.temperature) == ("t", True, 21.5)
+
+
+def test_handles_of_the_same_row_are_equal():
+    table = CompactDeviceTable()
+    light = SmartLight("a", table=table)
+    assert table.device(light.row) == light
+    assert hash(table.device(light.row)) == hash(light)
+
+
+def test_table_grows():
+    table = CompactDeviceTable(capacity=1)
+    rows = SmartLight.store_many(["a", "b", "c"], [True, False, True], [10.0, 20.0, 30.0], table)
+    assert table.capacity >= 3
+    assert [(device.get_id(), device.status, device.brightness) for device in map(table.device, rows)] == \
+        [("a", True, 10.0), ("b", False, 20.0), ("c", True, 30.0)]
+
+
+@pytest.fixture
+def sharded_system():
+    system = ShardedAutomationSystem(shards=1, capacity_per_shard=16, seed=1)
+    yield system
+    system.close()
+
+
+def test_sharded_removal_reaches_every_listener(sharded_system):
+    search_index = DeviceSearchIndex(sharded_system.registry)
+    energy_monitor = EnergyMonitor(sharded_system.registry, clock=lambda: 0.0)
+    bus = EventBus()
+    received = []
+    bus.subscribe(received.extend)
+    bus.start()
+    sharded_system.add_listener(EventPublisher(bus))
+    try:
+        sharded_system.add_device(SmartLight("a", status=True, brightness=50.0, table=CompactDeviceTable(1)))
+        assert energy_monitor.watts() > 0
+
+        removed = sharded_system.remove_device("a")
+
+        assert search_index.search("a") == set()
+        assert energy_monitor.watts() == 0.0
+        assert removed[0].get_id() == "a"
+    finally:
+        bus.stop()
+    removals = [event for event in received if isinstance(event, DeviceRemoved)]
+    assert [(event.device_type, event.device_id, event.device.get_id()) for event in removals] == \
+        [("SmartLight", "a", "a")]
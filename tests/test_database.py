@@ -0,0 +1,28 @@
+from credentials import CredentialVerifier
+from database import DatabaseManager
+
+
+def make_manager(tmp_path):
+    return DatabaseManager(str(tmp_path / "users.db"), pool_size=1, hash_iterations=10,
+                           verifier=CredentialVerifier(processes=0))
+
+
+def test_dummy_hash_is_computed_on_the_first_login(tmp_path):
+    db_manager = make_manager(tmp_path)
+    try:
+        assert db_manager._dummy_hash is None
+        assert db_manager.register_user("alice", "secret")
+
+        assert not db_manager.authenticate("bob", "secret")
+        dummy_hash = db_manager._dummy_hash
+        assert dummy_hash is not None
+        assert db_manager.authenticate("alice", "secret")
+        assert not db_manager.authenticate("alice", "wrong")
+        assert db_manager._dummy_hash == dummy_hash
+    finally:
+        db_manager.close()
+
+
+def test_manager_whose_init_failed_can_be_collected():
+    db_manager = DatabaseManager.__new__(DatabaseManager)
+    db_manager.__del__()
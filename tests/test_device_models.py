@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from automation_system import AutomationSystem
+from device_factory import create_device
+from device_list_model import DeviceListModel
+from device_table_model import DeviceTableModel, STATUS_COLUMN, VALUE_COLUMN
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def automation_system(app):
+    automation_system = AutomationSystem()
+    automation_system.add_devices([create_device("SmartLight", str(i)) for i in range(10)])
+    return automation_system
+
+
+def test_table_announces_each_run_of_changed_rows(automation_system):
+    model = DeviceTableModel(automation_system)
+    model.reset(automation_system.registry)
+    automation_system.add_listener(model)
+    emitted = []
+    model.dataChanged.connect(lambda first, last: emitted.append((first.row(), first.column(),
+                                                                  last.row(), last.column())))
+
+    for device_id in ("1", "2", "3", "7"):
+        automation_system.update_device(automation_system.get_device("SmartLight", device_id), brightness=50.0)
+    model.flush_changes()
+
+    assert sorted(emitted) == [(1, STATUS_COLUMN, 3, VALUE_COLUMN), (7, STATUS_COLUMN, 7, VALUE_COLUMN)]
+
+
+@pytest.mark.parametrize("model_class", [DeviceListModel, DeviceTableModel])
+def test_removed_rows_are_removed_together_per_run(automation_system, model_class):
+    model = model_class(automation_system) if model_class is DeviceTableModel else model_class()
+    model.reset(automation_system.registry)
+    automation_system.add_listener(model)
+    removed = []
+    model.rowsRemoved.connect(lambda parent, first, last: removed.append((first, last)))
+
+    for device_id in ("2", "3", "4", "8"):
+        automation_system.remove_device(device_id, "SmartLight")
+    assert removed == []
+    model.remove_pending_rows()
+
+    assert removed == [(8, 8), (2, 4)]
+    assert [model.data(model.index(row, 0)) for row in range(model.rowCount())] == [
+        f"SmartLight#{i}" for i in (0, 1, 5, 6, 7, 9)]
+
+
+@pytest.mark.parametrize("model_class", [DeviceListModel, DeviceTableModel])
+def test_filter_narrows_rows_and_applies_to_added_devices(automation_system, model_class):
+    model = model_class(automation_system) if model_class is DeviceTableModel else model_class()
+    model.reset(automation_system.registry)
+    automation_system.add_listener(model)
+
+    model.set_filter("#1")
+    automation_system.add_device(create_device("SmartLight", "12"))
+    automation_system.add_device(create_device("SmartLight", "20"))
+
+    assert [model.data(model.index(row, 0)) for row in range(model.rowCount())] == ["SmartLight#1", "SmartLight#12"]
@@ -0,0 +1,93 @@
+import pytest
+
+from device_factory import create_device
+from device_registry import DeviceRegistry, RegistryListener
+
+
+class RecordingListener(RegistryListener):
+    def __init__(self):
+        self.events = []
+
+    def device_added(self, device):
+        self.events.append(("added", device.get_id()))
+
+    def device_removed(self, device):
+        self.events.append(("removed", device.get_id()))
+
+    def device_changed(self, device, attributes):
+        self.events.append(("changed", device.get_id(), tuple(attributes)))
+
+
+@pytest.fixture
+def registry():
+    registry = DeviceRegistry()
+    registry.add_many([create_device("SmartLight", "a", status=True), create_device("SmartLight", "b"),
+                       create_device("Thermostat", "t", temperature=20.0)])
+    return registry
+
+
+def ids(devices):
+    return sorted(device.get_id() for device in devices)
+
+
+def test_type_and_status_indexes_follow_changes(registry):
+    light = registry.get("SmartLight", "b")
+    registry.set_status(light, True)
+    registry.update_many([registry.get("SmartLight", "a")], status=False)
+
+    assert ids(registry.devices_of_type("SmartLight")) == ["a", "b"]
+    assert ids(registry.devices_with_status(True)) == ["b"]
+    assert ids(registry.devices_with_status(False)) == ["a", "t"]
+
+    registry.remove("Thermostat", "t")
+    assert registry.types() == ["SmartLight"]
+    assert ids(registry.devices_with_status(False)) == ["a"]
+
+
+def test_room_and_tag_indexes_follow_assignments_and_removal(registry):
+    a, b = registry.get("SmartLight", "a"), registry.get("SmartLight", "b")
+    registry.set_room(a, "kitchen")
+    registry.set_rooms([b], ["kitchen"])
+    registry.set_tags(a, ["night", "outdoor"])
+    registry.set_room(b, "hall")
+
+    assert ids(registry.devices_in_room("kitchen")) == ["a"]
+    assert registry.rooms() == ["hall", "kitchen"]
+    assert ids(registry.devices_with_tag("night")) == ["a"]
+
+    registry.remove("SmartLight", "a")
+    assert registry.rooms() == ["hall"]
+    assert registry.devices_with_tag("night") == []
+    assert registry.devices_in_room("kitchen") == []
+
+
+def test_add_many_rejects_duplicates_without_adding_any(registry):
+    with pytest.raises(ValueError):
+        registry.add_many([create_device("SmartLight", "c"), create_device("SmartLight", "a")])
+    assert not registry.contains("SmartLight", "c")
+    assert len(registry) == 3
+
+
+def test_versions_and_listeners(registry):
+    listener = RecordingListener()
+    registry.add_listener(listener)
+    light = registry.get("SmartLight", "a")
+
+    registry.update(light, brightness=30.0)
+    registry.update_many([light, registry.get("SmartLight", "b")], brightness=60.0)
+    registry.remove("SmartLight", "b")
+
+    assert registry.version(light) == 2
+    assert light.brightness == 60.0
+    assert registry.version(create_device("SmartLight", "b")) is None
+    assert listener.events == [("changed", "a", ("brightness",)), ("changed", "a", ("brightness",)),
+                               ("changed", "b", ("brightness",)), ("removed", "b")]
+
+
+def test_page_slices_in_registration_order(registry):
+    devices, total = registry.page(1, 5)
+    assert [device.get_id() for device in devices] == ["b", "t"]
+    assert total == 3
+    devices, total = registry.page(0, 1, device_type="Thermostat")
+    assert [device.get_id() for device in devices] == ["t"]
+    assert total == 1
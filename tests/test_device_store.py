@@ -0,0 +1,27 @@
+import logging
+
+from automation_system import AutomationSystem
+from device_registry import device_key
+from device_store import DeviceStore
+
+
+def test_load_into_skips_unknown_device_types(tmp_path, caplog):
+    store = DeviceStore(db_path=str(tmp_path / "devices.db"))
+    try:
+        with store.pool.connection() as conn:
+            conn.executemany('''
+                INSERT INTO devices (device_type, device_id, status, brightness, temperature, security_status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [("SmartLight", "light-1", 1, 40.0, None, None),
+                  ("Doorbell", "bell-1", 0, None, None, None)])
+            conn.commit()
+        automation_system = AutomationSystem()
+
+        with caplog.at_level(logging.WARNING, logger="device_store"):
+            loaded = store.load_into(automation_system)
+
+        assert loaded == 1
+        assert [device_key(device) for device in automation_system.registry] == [("SmartLight", "light-1")]
+        assert "bell-1" in caplog.text
+    finally:
+        store.close()
@@ -0,0 +1,50 @@
+from event_bus import DeviceAdded, DeviceChanged, DeviceRemoved, EventBus, coalesce
+
+
+def changed(device_id, *attributes):
+    return DeviceChanged("SmartLight", device_id, None, frozenset(attributes))
+
+
+def test_coalesce_keeps_the_net_effect_per_device():
+    pending = {}
+    for event in [changed("a", "status"), changed("a", "brightness"), DeviceAdded("SmartLight", "b", None),
+                  changed("b", "status"), changed("c", "status"), DeviceRemoved("SmartLight", "c", None)]:
+        coalesce(pending, event)
+
+    assert list(pending.values()) == [changed("a", "status", "brightness"), DeviceAdded("SmartLight", "b", None),
+                                      DeviceRemoved("SmartLight", "c", None)]
+
+
+def test_bus_delivers_a_coalesced_batch_to_every_subscriber():
+    bus = EventBus()
+    batches = []
+    bus.subscribe(batches.append, name="first")
+    second = []
+
+    async def record(events):
+        second.extend(events)
+
+    bus.subscribe(record)
+    for brightness in range(100):
+        bus.publish(changed("a", "brightness"))
+    bus.publish_many([changed("a", "status"), changed("b", "status")])
+    bus.start()
+    bus.stop()
+
+    assert batches == [[changed("a", "brightness", "status"), changed("b", "status")]]
+    assert second == batches[0]
+
+
+def test_closed_subscription_gets_the_events_published_before_it_closed():
+    bus = EventBus()
+    bus.start()
+    try:
+        received = []
+        subscription = bus.subscribe(received.extend)
+        bus.publish(changed("a", "status"))
+        subscription.close()
+        bus.publish(changed("b", "status"))
+    finally:
+        bus.stop()
+
+    assert received == [changed("a", "status")]
@@ -0,0 +1,25 @@
+from automation_system import AutomationSystem
+from device_factory import create_device
+from rules import Clamp, Rule, RuleEngine, SetAttribute, Trigger
+
+
+def test_rules_skip_devices_without_the_watched_attribute():
+    automation_system = AutomationSystem()
+    light = create_device("SmartLight", "a", status=True, brightness=40.0)
+    camera = create_device("SecurityCamera", "c", status=True)
+    automation_system.add_devices([light, camera])
+    engine = RuleEngine(automation_system.registry)
+    engine.add_rule(Rule("dim", Trigger("SmartLight", "brightness", ">", 80), [SetAttribute("brightness", 80)]))
+    engine.add_rule(Rule("clamp", Trigger("SecurityCamera", "brightness", "changed"), [Clamp("brightness", 0, 50)]))
+
+    automation_system.mark_device_changed(camera, "brightness")
+    automation_system.update_device(light, brightness=95.0)
+
+    assert light.brightness == 80
+    assert not hasattr(camera, "brightness")
+
+
+def test_trigger_does_not_match_incomparable_values():
+    light = create_device("SmartLight", "a", brightness=40.0)
+    assert not Trigger("SmartLight", "brightness", "<", "bright").matches(light)
+    assert Trigger("SmartLight", "brightness", "<", 50).matches(light)
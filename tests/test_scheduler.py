@@ -0,0 +1,88 @@
+import random
+
+from automation_system import AutomationSystem
+from device_factory import create_device
+from scenes import DeviceGroup
+from scheduler import Every, Scheduler, TimerWheel
+
+
+def test_timer_wheel_fires_entries_at_their_tick():
+    wheel = TimerWheel(bits=(2, 2, 2))
+    due_ticks = {entry_id: random.Random(entry_id).randrange(200) for entry_id in range(100)}
+    for entry_id, due_tick in due_ticks.items():
+        wheel.insert(entry_id, due_tick, entry_id)
+    wheel.cancel(7)
+
+    fired = {}
+    for tick in range(200):
+        for entry_id, payload in wheel.advance(tick):
+            assert entry_id == payload
+            fired[entry_id] = tick
+
+    assert fired == {entry_id: due_tick for entry_id, due_tick in due_ticks.items() if entry_id != 7}
+    assert len(wheel) == 0
+
+
+def test_timer_wheel_fires_past_entries_on_the_next_advance_and_replaces_entries():
+    wheel = TimerWheel(current_tick=10)
+    wheel.insert("late", 3, "late")
+    wheel.insert("moved", 50, "first")
+    wheel.insert("moved", 12, "second")
+
+    assert wheel.advance(10) == [("late", "late")]
+    assert wheel.advance(11) == []
+    assert wheel.advance(12) == [("moved", "second")]
+    assert wheel.advance(100) == []
+    assert not wheel.cancel("moved")
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(db_path=None):
+    automation_system = AutomationSystem()
+    automation_system.add_devices([create_device("SmartLight", str(i)) for i in range(3)]
+                                  + [create_device("Thermostat", "t", temperature=20.0)])
+    for device_id in ("0", "1"):
+        automation_system.set_device_room(automation_system.get_device("SmartLight", device_id), "kitchen")
+    clock = Clock(1000.0)
+    return Scheduler(automation_system, db_path=db_path, clock=clock), automation_system, clock
+
+
+def test_due_actions_resolve_in_firing_order_and_update_in_bulk():
+    scheduler, automation_system, clock = make_scheduler()
+    scheduler.schedule(DeviceGroup(device_type="SmartLight"), {"brightness": 10}, due=1005.0)
+    scheduler.schedule(DeviceGroup(room="kitchen"), {"brightness": 80}, due=1006.0)
+    scheduler.schedule(DeviceGroup(room="kitchen"), {"temperature": 18}, due=1006.0)
+
+    assert scheduler.advance(1004.0) == 0
+    assert scheduler.advance(1010.0) == 3
+    brightness = [automation_system.get_device("SmartLight", str(i)).brightness for i in range(3)]
+    assert brightness == [80, 80, 10]
+    assert automation_system.get_device("Thermostat", "t").temperature == 20.0
+    assert scheduler.pending() == 0
+
+
+def test_recurring_actions_are_rescheduled_and_persisted(tmp_path):
+    db_path = str(tmp_path / "schedule.db")
+    scheduler, automation_system, clock = make_scheduler(db_path)
+    action_id = scheduler.schedule(DeviceGroup(device_type="Thermostat", device_id="t"), {"temperature": 18},
+                                   recurrence=Every(60))
+    cancelled = scheduler.schedule(DeviceGroup(device_type="Thermostat"), {"status": True}, due=1030.0)
+    scheduler.cancel(cancelled)
+
+    assert scheduler.advance(1065.0) == 1
+    assert automation_system.get_device("Thermostat", "t").temperature == 18
+    scheduler.close()
+
+    scheduler, automation_system, clock = make_scheduler(db_path)
+    assert scheduler.pending() == 1
+    assert action_id in scheduler.wheel
+    assert scheduler.advance(1119.0) == 0
+    assert scheduler.advance(1120.0) == 1
+    scheduler.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from automation_system import AutomationSystem
+from device_factory import create_device
+from device_registry import device_key
+from snapshot import Snapshot, SnapshotError, restore_snapshot, save_snapshot
+
+
+def device_state(automation_system, device):
+    return (device_key(device), bool(device.status), getattr(device, "brightness", None),
+            getattr(device, "temperature", None), getattr(device, "security_status", None),
+            automation_system.get_device_room(device), sorted(automation_system.get_device_tags(device) or ()))
+
+
+def fleet_state(automation_system):
+    return sorted(device_state(automation_system, device) for device in automation_system.registry)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_snapshot_round_trip(tmp_path, compress):
+    automation_system = AutomationSystem()
+    light = create_device("SmartLight", "hall light", status=True, brightness=33.333333333)
+    thermostat = create_device("Thermostat", "t-1", temperature=21.123456789)
+    camera = create_device("SecurityCamera", "cam", status=True, security_status="Motion Detected")
+    automation_system.add_devices([light, thermostat, camera, create_device("SmartLight", "spare")])
+    automation_system.set_device_room(light, "hall")
+    automation_system.set_device_room(camera, "hall")
+    automation_system.set_device_tags(camera, ["outdoor", "night"])
+    path = str(tmp_path / "home.snap")
+
+    assert save_snapshot(automation_system, path, compress=compress) == 4
+    restored = AutomationSystem()
+    assert restore_snapshot(path, restored) == 4
+
+    assert fleet_state(restored) == fleet_state(automation_system)
+    assert restored.get_device("Thermostat", "t-1").temperature == 21.123456789
+
+
+def test_reading_a_file_that_is_not_a_snapshot_fails(tmp_path):
+    path = tmp_path / "home.snap"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
@@ -0,0 +1,67 @@
+import threading
+
+import telemetry
+from telemetry import TelemetryStore
+
+
+def make_store(tmp_path, **kwargs):
+    return TelemetryStore(directory=str(tmp_path / "telemetry"), flush_interval=None, **kwargs)
+
+
+def test_rollups_aggregate_samples_per_bucket(tmp_path):
+    store = make_store(tmp_path, buffer_capacity=4)
+    for timestamp, value in [(0, 10), (30, 20), (59, 30), (60, 5), (3599, 1), (3600, 7)]:
+        store.record("SmartLight", "a", "brightness", value, timestamp)
+
+    assert store.query("SmartLight", "a", "brightness", 0, 60) == [(0, 10), (30, 20), (59, 30), (60, 5)]
+    assert store.query("SmartLight", "a", "brightness", 0, 3600, resolution=60) == [
+        (0, 10, 30, 20), (60, 5, 5, 5), (3540, 1, 1, 1), (3600, 7, 7, 7)]
+    assert store.query("SmartLight", "a", "brightness", 0, 3600, resolution=3600) == [
+        (0, 1, 30, 66 / 5), (3600, 7, 7, 7)]
+    store.close()
+
+
+def test_reopened_store_continues_the_open_bucket(tmp_path):
+    store = make_store(tmp_path)
+    store.record("Thermostat", "t", "temperature", 20, 100)
+    store.record("Thermostat", "t", "temperature", 22, 110)
+    store.close()
+
+    store = make_store(tmp_path)
+    store.record("Thermostat", "t", "temperature", 30, 115)
+    store.record("Thermostat", "t", "temperature", 25, 170)
+    assert store.query("Thermostat", "t", "temperature", 0, 200) == [(100, 20), (110, 22), (115, 30), (170, 25)]
+    store.flush()
+    assert store.query("Thermostat", "t", "temperature", 0, 200, resolution=60) == [
+        (60, 20, 30, 24), (120, 25, 25, 25)]
+    store.close()
+
+    store = make_store(tmp_path)
+    assert store.query("Thermostat", "t", "temperature", 0, 200, resolution=3600) == [(0, 20, 30, 97 / 4)]
+    store.close()
+
+
+def test_recording_does_not_wait_for_a_flush_writing_to_disk(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.record("SmartLight", "a", "brightness", 10, 0)
+    writing = threading.Event()
+    release = threading.Event()
+    write_rows = telemetry._write_rows
+
+    def slow_write_rows(*args):
+        writing.set()
+        release.wait(5)
+        write_rows(*args)
+
+    monkeypatch.setattr(telemetry, "_write_rows", slow_write_rows)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    try:
+        assert writing.wait(5)
+        store.record("SmartLight", "a", "brightness", 20, 1)
+        assert flusher.is_alive()
+    finally:
+        release.set()
+        flusher.join()
+    assert store.query("SmartLight", "a", "brightness", 0, 1) == [(0, 10), (1, 20)]
+    store.close()